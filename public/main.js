@@ -13,6 +13,7 @@ document.addEventListener('DOMContentLoaded', () => {
     initTagInput();
     initSubmitForm();
     loadEntries();
+    initLiveUpdates();
 });
 
 // ==================== 模态框控制 ====================
@@ -178,6 +179,65 @@ async function loadEntries() {
     }
 }
 
+// ==================== 实时更新 ====================
+function initLiveUpdates() {
+    if (!window.EventSource) {
+        return;
+    }
+
+    const source = new EventSource('/api/stream');
+    let connected = false;
+
+    // 服务端定期结束连接（或重启）后浏览器会自动重连，重连后补拉断开期间的变更
+    source.addEventListener('open', () => {
+        if (connected) {
+            loadEntries();
+        }
+        connected = true;
+    });
+
+    source.addEventListener('entries', (event) => {
+        applyEntryDeltas(JSON.parse(event.data));
+    });
+
+    // 积压过多或服务端要求时，重新拉取完整列表
+    source.addEventListener('reset', () => loadEntries());
+}
+
+function applyEntryDeltas(deltas) {
+    let needsReload = false;
+
+    deltas.forEach(delta => {
+        const index = allEntries.findIndex(entry => entry.id === delta.id);
+
+        if (delta.status && delta.status !== 'approved') {
+            // 被撤销批准的条目从列表中移除
+            if (index !== -1) {
+                allEntries.splice(index, 1);
+            }
+            return;
+        }
+
+        if (index === -1) {
+            // 新批准的条目需要完整数据
+            needsReload = true;
+            return;
+        }
+
+        Object.assign(allEntries[index], delta);
+    });
+
+    if (needsReload) {
+        loadEntries();
+        return;
+    }
+
+    // 与服务端一致：分数降序，同分按 id 升序
+    allEntries.sort((a, b) => (b.score - a.score) || (a.id < b.id ? -1 : a.id > b.id ? 1 : 0));
+    renderEntries();
+    renderLeaderboard();
+}
+
 // ==================== 渲染条目列表 ====================
 function renderEntries() {
     const container = document.getElementById('entries-list');
@@ -297,8 +357,8 @@ async function vote(entryId) {
                 voteCountEl.textContent = result.data.votes;
             }
 
-            // 重新加载数据以更新分数和排行榜
-            await loadEntries();
+            // 本地更新分数和排行榜（其他人的投票通过 /api/stream 推送）
+            applyEntryDeltas([{ id: entryId, votes: result.data.votes, score: result.data.score }]);
 
             showToast('👟 踩一脚成功！', 'success');
         } else {
@@ -342,6 +402,10 @@ async function toggleLike(entryId) {
             if (likeCountEl) {
                 likeCountEl.textContent = result.data.likes;
             }
+            const likedEntry = allEntries.find(entry => entry.id === entryId);
+            if (likedEntry) {
+                likedEntry.likes = result.data.likes;
+            }
 
             // 更新按钮状态
             if (result.data.action === 'liked') {
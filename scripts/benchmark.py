@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+API 热点路径基准测试
+
+在进程内通过 httpx.ASGITransport 驱动 FastAPI 应用（手动运行 lifespan），
+使用临时 SQLite 数据库（或 --db-url 指定的空库）预置数据，测量各场景的吞吐量与延迟分位数。
+
+用法：
+    # 运行并写入结果
+    python scripts/benchmark.py run --entries 1000 --votes 20000 --likes 5000 -o bench.json
+
+    # 与基线比较（任一场景退化超过阈值时退出码为 1）
+    python scripts/benchmark.py compare baseline.json bench.json --threshold 0.15
+    python scripts/benchmark.py run -o bench.json --baseline baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# 场景名 -> 说明
+SCENARIOS = {
+    "entries": "GET /api/entries（完整排行榜，前端默认请求）",
+    "entries_page": "GET /api/entries?sort=votes&limit=50（数据库分页路径）",
+    "vote": "POST /api/vote（随机条目 / 随机 IP）",
+    "like": "POST /api/like（随机条目 / 随机 IP）",
+    "submit": "POST /api/submit",
+    "reload": "POST /api/reload 增量（无变化文件）并等待任务完成",
+    "reload_full": "POST /api/reload?full=true 并等待任务完成",
+}
+
+# 重新加载类场景的请求数上限（每次都会遍历全部 YAML）
+RELOAD_REQUESTS = 5
+
+# compare 检查的指标：吞吐量越低越差，延迟越高越差
+REGRESSION_METRICS = (("throughput", -1), ("p50_ms", 1), ("p99_ms", 1))
+
+# ==================== 数据准备 ====================
+
+def seed_database(db_url: str, spec) -> None:
+    """使用 generate_dataset 批量写入条目、投票与点赞，并重建计数与排行榜快照"""
+    from generate_dataset import insert_dataset
+    from server.models import get_engine, create_tables
+
+    engine = get_engine(db_url)
+    create_tables(engine)
+    insert_dataset(engine, spec)
+    engine.dispose()
+
+
+# ==================== 测量 ====================
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """最近秩百分位数"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> dict:
+    values = sorted(latencies)
+    ms = lambda v: round(v * 1000, 3)  # noqa: E731
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "throughput": round(len(values) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": ms(sum(values) / len(values)) if values else 0.0,
+        "p50_ms": ms(percentile(values, 50)),
+        "p90_ms": ms(percentile(values, 90)),
+        "p99_ms": ms(percentile(values, 99)),
+        "max_ms": ms(values[-1]) if values else 0.0,
+    }
+
+
+async def run_scenario(
+    send: Callable[[int], Awaitable[bool]],
+    requests: int,
+    concurrency: int
+) -> dict:
+    """以固定并发执行 requests 次 send(i)，send 返回是否成功"""
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            start = time.perf_counter()
+            ok = await send(i)
+            latencies.append(time.perf_counter() - start)
+            if not ok:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+async def run_benchmark(args, admin_token: str) -> Dict[str, dict]:
+    """启动应用并依次运行所选场景"""
+    import httpx
+    from generate_dataset import entry_id
+    from server.app import app
+
+    rng = random.Random(args.seed)
+    entry_ids = [entry_id(i) for i in range(args.entries)]
+    headers = {"X-Admin-Token": admin_token}
+    results: Dict[str, dict] = {}
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+
+            def random_ip() -> Dict[str, str]:
+                return {"X-Forwarded-For": f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}"}
+
+            async def wait_job(job_id: str) -> bool:
+                while True:
+                    job = (await client.get(f"/api/jobs/{job_id}", headers=headers)).json()["data"]
+                    if job["status"] in ("succeeded", "failed"):
+                        return job["status"] == "succeeded"
+                    await asyncio.sleep(0.005)
+
+            async def entries(i):
+                return (await client.get("/api/entries")).status_code == 200
+
+            async def entries_page(i):
+                return (await client.get("/api/entries", params={"sort": "votes", "limit": 50})).status_code == 200
+
+            async def vote(i):
+                r = await client.post("/api/vote", json={"entry_id": rng.choice(entry_ids)}, headers=random_ip())
+                return r.status_code in (200, 400)  # 400：随机 IP 碰撞导致的重复投票
+
+            async def like(i):
+                r = await client.post("/api/like", json={"entry_id": rng.choice(entry_ids)}, headers=random_ip())
+                return r.status_code == 200
+
+            async def submit(i):
+                r = await client.post("/api/submit", json={
+                    "title": f"Submitted {args.seed}-{i}-{rng.random()}",
+                    "owner": "bench",
+                    "repo_url": "https://example.com/submitted",
+                    "last_commit": "2024-01-01",
+                    "summary": "Submitted during the benchmark run.",
+                    "tags": ["bench"],
+                })
+                return r.status_code == 200
+
+            def reload(full: bool):
+                async def send(i):
+                    r = await client.post("/api/reload", params={"full": str(full).lower()}, headers=headers)
+                    return r.status_code == 202 and await wait_job(r.json()["data"]["job_id"])
+                return send
+
+            senders = {
+                "entries": entries,
+                "entries_page": entries_page,
+                "vote": vote,
+                "like": like,
+                "submit": submit,
+                "reload": reload(False),
+                "reload_full": reload(True),
+            }
+
+            for name in args.scenarios:
+                reloading = name.startswith("reload")
+                if reloading:
+                    # 预热：首次导入建立文件清单
+                    await senders["reload_full"](0)
+                else:
+                    # 预热：加载进程内索引、建立连接，不计入结果
+                    await run_scenario(senders[name], args.warmup, args.concurrency)
+                requests = min(args.requests, RELOAD_REQUESTS) if reloading else args.requests
+                concurrency = 1 if reloading else args.concurrency
+                results[name] = await run_scenario(senders[name], requests, concurrency)
+                r = results[name]
+                print(f"⏱️  {name:<13} {r['throughput']:>9.1f} req/s  "
+                      f"p50 {r['p50_ms']:>8.2f} ms  p99 {r['p99_ms']:>8.2f} ms  errors {r['errors']}")
+    return results
+
+
+# ==================== 比较 ====================
+
+def compare(baseline: dict, current: dict, threshold: float) -> List[str]:
+    """
+    比较两次结果
+
+    Returns:
+        退化说明列表（为空表示没有超过阈值的退化）
+    """
+    regressions = []
+    for name, result in current["scenarios"].items():
+        base = baseline["scenarios"].get(name)
+        if not base:
+            continue
+        for metric, direction in REGRESSION_METRICS:
+            old, new = base.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old * direction
+            marker = "❌" if change > threshold else "✅"
+            print(f"{marker} {name:<13} {metric:<10} {old:>10.2f} -> {new:>10.2f} ({change * direction:+.1%})")
+            if change > threshold:
+                regressions.append(f"{name}.{metric} {old} -> {new}")
+    return regressions
+
+
+def load_results(path) -> dict:
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+# ==================== 命令行 ====================
+
+def cmd_run(args) -> int:
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        print(f"❌ 未知场景: {', '.join(unknown)}（可选: {', '.join(SCENARIOS)}）")
+        return 2
+
+    output = Path(args.output).resolve() if args.output else None
+    baseline = Path(args.baseline).resolve() if args.baseline else None
+    workdir = Path(tempfile.mkdtemp(prefix="conch-bench-"))
+    db_url = args.db_url or f"sqlite:///{workdir / 'bench.db'}"
+    admin_token = "bench-admin-token"
+
+    # 应用在导入时读取配置，必须在导入 server.app 之前设置
+    os.environ["DB_URL"] = db_url
+    os.environ["ADMIN_TOKEN"] = admin_token
+    # 应用在仓库目录下导入，./storage 下的相对路径全部改到临时目录，避免压测写入工作区
+    os.environ.setdefault("METRICS_DIR", str(workdir / "metrics"))
+    os.environ.setdefault("JOBS_DIR", str(workdir / "jobs"))
+    os.environ.setdefault("ASSETS_DIR", str(workdir / "assets"))
+    os.environ.setdefault("PROFILE_LOG", str(workdir / "slow_requests.log"))
+    # 压测流量远超限流额度，默认关闭限流以测量接口本身
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+    print(f"🗄️  数据库 URL: {db_url}")
+    print(f"🌱 预置数据: {args.entries} 条目 / {args.votes} 投票 / {args.likes} 点赞 (seed={args.seed})")
+    started = time.perf_counter()
+    # 生成器在导入时读取配置，同样要在设置环境变量之后导入；条目全部为已审核，投票场景不会命中 404
+    from generate_dataset import DatasetSpec, write_yaml
+    spec = DatasetSpec(
+        entries=args.entries, votes=args.votes, likes=args.likes, seed=args.seed,
+        pending_ratio=0, rejected_ratio=0
+    )
+    seed_database(db_url, spec)
+    if any(name.startswith("reload") for name in args.scenarios):
+        write_yaml(spec, workdir / "data" / "entries")
+    print(f"✅ 预置完成，用时 {time.perf_counter() - started:.1f} 秒")
+
+    # 导入应用后再切换目录：静态文件目录按仓库解析，reload 读取临时目录中的 data/entries
+    os.chdir(ROOT)
+    import server.app  # noqa: F401
+    os.chdir(workdir)
+
+    scenarios = asyncio.run(run_benchmark(args, admin_token))
+
+    from server.settings import settings
+    results = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "dialect": db_url.split(":", 1)[0],
+            "entries": args.entries,
+            "votes": args.votes,
+            "likes": args.likes,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "write_behind": settings.WRITE_BEHIND,
+        },
+        "scenarios": scenarios,
+    }
+    if output:
+        output.write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"📝 结果已写入 {output}")
+
+    if baseline:
+        regressions = compare(load_results(baseline), results, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} 项退化超过 {args.threshold:.0%}")
+            return 1
+        print(f"\n✨ 没有超过 {args.threshold:.0%} 的退化")
+    return 0
+
+
+def cmd_compare(args) -> int:
+    regressions = compare(load_results(args.baseline), load_results(args.current), args.threshold)
+    if regressions:
+        print(f"\n❌ {len(regressions)} 项退化超过 {args.threshold:.0%}")
+        return 1
+    print(f"\n✨ 没有超过 {args.threshold:.0%} 的退化")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="API 热点路径基准测试")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="运行基准测试")
+    run.add_argument("--entries", type=int, default=1000, help="预置条目数（默认 1000）")
+    run.add_argument("--votes", type=int, default=20000, help="预置投票数（默认 20000）")
+    run.add_argument("--likes", type=int, default=5000, help="预置点赞数（默认 5000）")
+    run.add_argument("--requests", type=int, default=500, help="每个场景的请求数（默认 500）")
+    run.add_argument("--concurrency", type=int, default=20, help="并发数（默认 20）")
+    run.add_argument("--warmup", type=int, default=20, help="每个场景不计入结果的预热请求数（默认 20）")
+    run.add_argument("--scenarios", type=lambda s: s.split(","), default=list(SCENARIOS),
+                     help=f"逗号分隔的场景（默认全部: {','.join(SCENARIOS)}）")
+    run.add_argument("--seed", type=int, default=42, help="随机种子（默认 42）")
+    run.add_argument("--db-url", help="使用指定的空数据库（默认临时 SQLite）")
+    run.add_argument("-o", "--output", help="结果 JSON 路径")
+    run.add_argument("--baseline", help="与基线结果比较")
+    run.add_argument("--threshold", type=float, default=0.15, help="退化阈值（默认 0.15 即 15%%）")
+    run.set_defaults(func=cmd_run)
+
+    cmp = sub.add_parser("compare", help="比较两次结果")
+    cmp.add_argument("baseline", help="基线结果 JSON")
+    cmp.add_argument("current", help="本次结果 JSON")
+    cmp.add_argument("--threshold", type=float, default=0.15, help="退化阈值（默认 0.15 即 15%%）")
+    cmp.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
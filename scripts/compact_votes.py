@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+压缩原始投票
+
+- 超过保留天数的原始投票按 (条目, 日期) 汇总进 vote_daily_totals 后删除
+- 可选先归档为 votes-YYYY-MM-DD.csv.gz
+- 服务默认每 VOTE_COMPACT_INTERVAL 秒自动执行；关闭自动压缩时可用 cron 调用本脚本（可重复执行）
+"""
+import argparse
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from server.models import get_engine, create_tables, get_session_factory
+from server.rollup import compact_votes
+from server.settings import settings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="把超过保留期的原始投票汇总进 vote_daily_totals")
+    parser.add_argument("--retention-days", type=int, default=settings.VOTE_RETENTION_DAYS,
+                        help=f"原始投票保留天数，不含今天（默认 {settings.VOTE_RETENTION_DAYS}）")
+    parser.add_argument("--archive-dir", default=settings.VOTE_ARCHIVE_DIR,
+                        help="归档目录（默认 VOTE_ARCHIVE_DIR，为空则直接删除）")
+    args = parser.parse_args()
+
+    print(f"🗄️  数据库 URL: {settings.DB_URL}")
+
+    engine = get_engine(settings.DB_URL)
+    # 确保汇总表存在（旧库自动迁移）
+    create_tables(engine)
+    db = get_session_factory(engine)()
+
+    try:
+        result = compact_votes(
+            db,
+            args.retention_days,
+            archive_dir=Path(args.archive_dir) if args.archive_dir else None,
+            progress=lambda day, count: print(f"🗜️  {day}: {count} 票")
+        )
+        print(f"✨ 完成！压缩 {result['days']} 天、{result['votes']} 条原始投票（截止 {result['cutoff']} 之前）")
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+生成规模测试数据集
+
+- db 模式：批量写入 entries / votes / likes，然后回填计数字段并重建排行榜快照；
+- yaml 模式：在目录中生成条目 YAML 文件（仅条目，不含投票与点赞）。
+
+分布：
+- 条目热度服从 Zipf 分布（随机打乱名次），投票与点赞均按热度抽样；
+- 投票跨越 --days 天，越近的日子投票越多；同一 IP 可以在不同日子投票，
+  ip_hash 与线上一致按日轮换（sha256(ip + SECRET_KEY + 日期)）；
+- 标签按流行度抽样 1-4 个，last_commit 既有近期活跃也有多年停更，少量条目为待审核 / 已拒绝。
+
+相同的 --seed 与 --as-of 生成完全相同的数据（SQLite 与 PostgreSQL 一致），
+便于基准测试复现（scripts/benchmark.py 使用本模块预置数据）。
+
+用法：
+    python scripts/generate_dataset.py --entries 100000 --votes 20000000 --likes 2000000
+    python scripts/generate_dataset.py --mode yaml --entries 5000 --output-dir /tmp/entries
+"""
+import argparse
+import bisect
+import hashlib
+import random
+import sys
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from server.settings import settings  # noqa: E402
+
+# 生成条目的 ID 前缀（--reset 只删除该前缀的数据）
+ID_PREFIX = "gen-"
+
+TAGS = [
+    "web", "app", "ai", "tool", "cli", "game", "data", "infra", "edu", "music",
+    "mobile", "bot", "blockchain", "iot", "devops", "security", "design", "api", "ml", "editor",
+]
+
+WORDS = [
+    "Quantum", "Pixel", "Nebula", "Turbo", "Echo", "Atlas", "Nova", "Zen", "Orbit", "Flux",
+    "Lens", "Forge", "Pulse", "Drift", "Vault", "Sketch", "Relay", "Spark", "Harbor", "Loom",
+]
+
+
+@dataclass
+class DatasetSpec:
+    """数据集规模与分布参数"""
+    entries: int = 1000
+    votes: int = 20000
+    likes: int = 5000
+    days: int = 365
+    zipf: float = 1.1
+    seed: int = 42
+    as_of: Optional[date] = None
+    pending_ratio: float = 0.03
+    rejected_ratio: float = 0.01
+    secret: str = ""
+
+    def __post_init__(self):
+        self.as_of = self.as_of or date.today()
+        self.secret = self.secret or settings.SECRET_KEY
+
+
+def entry_id(index: int) -> str:
+    """第 index 个生成条目的 ID"""
+    return f"{ID_PREFIX}{index:06d}"
+
+
+def ip_hash(ip: str, secret: str, salt: str = "") -> str:
+    """与 server.app.hash_ip 相同的 IP 哈希"""
+    return hashlib.sha256(f"{ip}{secret}{salt}".encode()).hexdigest()
+
+
+def _zipf_cum_weights(n: int, s: float) -> List[float]:
+    total = 0.0
+    cum = []
+    for rank in range(1, n + 1):
+        total += 1.0 / rank ** s
+        cum.append(total)
+    return cum
+
+
+class Popularity:
+    """条目热度：Zipf 名次随机分配给条目"""
+
+    def __init__(self, rng: random.Random, n: int, s: float):
+        self.cum = _zipf_cum_weights(n, s)
+        self.by_rank = list(range(n))
+        rng.shuffle(self.by_rank)
+        self.total = self.cum[-1] if self.cum else 0.0
+
+    def sample(self, rng: random.Random) -> int:
+        """按热度抽取一个条目下标"""
+        return self.by_rank[bisect.bisect(self.cum, rng.random() * self.total)]
+
+
+# ==================== 条目 ====================
+
+def generate_entries(spec: DatasetSpec) -> Iterator[dict]:
+    """逐个生成条目字段（不含计数）"""
+    from server.models import ApprovalStatus
+
+    rng = random.Random(spec.seed)
+    tag_weights = _zipf_cum_weights(len(TAGS), 1.0)
+    owners = max(1, spec.entries // 5)
+    owner_weights = _zipf_cum_weights(owners, 1.2)
+
+    for i in range(spec.entries):
+        # 30% 近 90 天仍有提交，其余指数分布的停更时长（最长约 6 年）
+        if rng.random() < 0.3:
+            stale_days = rng.randint(0, 90)
+        else:
+            stale_days = min(2200, 90 + int(rng.expovariate(1 / 400)))
+        tags = sorted({TAGS[bisect.bisect(tag_weights, rng.random() * tag_weights[-1])]
+                       for _ in range(rng.randint(1, 4))})
+        roll = rng.random()
+        if roll < spec.rejected_ratio:
+            status = ApprovalStatus.REJECTED
+        elif roll < spec.rejected_ratio + spec.pending_ratio:
+            status = ApprovalStatus.PENDING
+        else:
+            status = ApprovalStatus.APPROVED
+        owner = bisect.bisect(owner_weights, rng.random() * owner_weights[-1])
+        title = f"{rng.choice(WORDS)} {rng.choice(WORDS)} {i}"
+
+        yield {
+            "id": entry_id(i),
+            "title": title,
+            "owner": f"owner{owner}",
+            "repo_url": f"https://example.com/owner{owner}/{entry_id(i)}",
+            "last_commit": spec.as_of - timedelta(days=stale_days),
+            "summary": f"{title}：规模测试生成的样例条目，计划很宏大，进度停在了第一个里程碑。",
+            "tags": ",".join(tags),
+            "status": status,
+            "submitted_at": datetime.combine(spec.as_of, datetime.min.time())
+            - timedelta(minutes=rng.randint(0, 2 * 365 * 24 * 60)),
+        }
+
+
+# ==================== 投票与点赞 ====================
+
+def _daily_volumes(rng: random.Random, total: int, days: int) -> List[int]:
+    """各天投票数（越近越多，±20% 波动），总和为 total"""
+    weights = [(1 + d / days) * rng.uniform(0.8, 1.2) for d in range(days)]
+    scale = total / sum(weights)
+    volumes = [int(w * scale) for w in weights]
+    for d in range(total - sum(volumes)):
+        volumes[-1 - d % days] += 1
+    return volumes
+
+
+def generate_votes(spec: DatasetSpec) -> Iterator[Tuple[int, date, str]]:
+    """
+    逐天生成投票 (条目下标, 投票日期, ip_hash)
+
+    同一天内 (条目, IP) 不重复；IP 池在各天之间共享，哈希按日轮换。
+    """
+    if not spec.entries or not spec.votes:
+        return
+    rng = random.Random(spec.seed + 1)
+    popularity = Popularity(random.Random(spec.seed), spec.entries, spec.zipf)
+    volumes = _daily_volumes(rng, spec.votes, spec.days)
+    pool = max(10_000, 2 * max(volumes))
+
+    for offset, volume in enumerate(volumes):
+        day = spec.as_of - timedelta(days=spec.days - offset)
+        salt = day.isoformat()
+        seen = set()
+        hashes: Dict[int, str] = {}
+        for _ in range(volume):
+            for _attempt in range(8):
+                key = (popularity.sample(rng), rng.randrange(pool))
+                if key not in seen:
+                    break
+            else:
+                continue  # 极热门条目当天 IP 已用尽，跳过这一票
+            seen.add(key)
+            ip = key[1]
+            if ip not in hashes:
+                hashes[ip] = ip_hash(f"10.{ip >> 16 & 255}.{ip >> 8 & 255}.{ip & 255}", spec.secret, salt)
+            yield key[0], day, hashes[ip]
+
+
+def generate_likes(spec: DatasetSpec) -> Iterator[Tuple[int, str]]:
+    """生成点赞 (条目下标, ip_hash)，(条目, IP) 全局不重复"""
+    if not spec.entries or not spec.likes:
+        return
+    rng = random.Random(spec.seed + 2)
+    popularity = Popularity(random.Random(spec.seed), spec.entries, spec.zipf)
+    pool = max(10_000, spec.likes)
+    seen = set()
+    for _ in range(spec.likes):
+        for _attempt in range(8):
+            key = (popularity.sample(rng), rng.randrange(pool))
+            if key not in seen:
+                break
+        else:
+            continue
+        seen.add(key)
+        ip = key[1]
+        yield key[0], ip_hash(f"10.{ip >> 16 & 255}.{ip >> 8 & 255}.{ip & 255}", spec.secret)
+
+
+# ==================== 写入 ====================
+
+def _chunks(rows: Iterator, size: int) -> Iterator[list]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _bulk_insert(conn, table, columns: Tuple[str, ...], rows: List[tuple]) -> None:
+    """
+    批量插入元组行
+
+    SQLite 直接使用驱动的 executemany（比逐行构造字典快数倍，日期需预先格式化为字符串）；
+    其他数据库走 SQLAlchemy Core，由 insertmanyvalues 合并为多行 INSERT。
+    """
+    if conn.dialect.name == "sqlite":
+        placeholders = ", ".join("?" for _ in columns)
+        conn.exec_driver_sql(
+            f"INSERT INTO {table.name} ({', '.join(columns)}) VALUES ({placeholders})", rows
+        )
+    else:
+        conn.execute(table.insert(), [dict(zip(columns, row)) for row in rows])
+
+
+def reset_generated(engine) -> None:
+    """删除此前生成的条目及其投票（含汇总）、点赞与快照"""
+    from sqlalchemy import delete
+    from server.models import Entry, Vote, VoteDailyTotal, Like, LeaderboardSnapshot
+
+    pattern = ID_PREFIX + "%"
+    with engine.begin() as conn:
+        conn.execute(delete(Vote).where(Vote.entry_id.like(pattern)))
+        conn.execute(delete(VoteDailyTotal).where(VoteDailyTotal.entry_id.like(pattern)))
+        conn.execute(delete(Like).where(Like.entry_id.like(pattern)))
+        conn.execute(delete(LeaderboardSnapshot).where(LeaderboardSnapshot.entry_id.like(pattern)))
+        conn.execute(delete(Entry).where(Entry.id.like(pattern)))
+
+
+def insert_dataset(
+    engine,
+    spec: DatasetSpec,
+    chunk_size: int = 50_000,
+    progress: Optional[Callable[[str, int], None]] = None
+) -> Dict[str, int]:
+    """
+    批量写入数据集，回填计数并重建排行榜快照
+
+    Args:
+        engine: 同步引擎（表已创建）
+        spec: 数据集参数
+        chunk_size: 每批插入行数（每批提交一次）
+        progress: 进度回调 (表名, 已写入行数)
+
+    Returns:
+        各表实际写入行数
+    """
+    from sqlalchemy import bindparam, update
+    from server.models import Entry, Vote, Like, get_session_factory
+    from server.snapshot import rebuild_snapshot
+
+    progress = progress or (lambda table, done: None)
+    counts = {"entries": 0, "votes": 0, "likes": 0}
+    vote_counts = [0] * spec.entries
+    like_counts = [0] * spec.entries
+
+    sqlite = engine.dialect.name == "sqlite"
+    with engine.connect() as conn:
+        if sqlite:
+            # 生成数据无需逐批落盘
+            conn.exec_driver_sql("PRAGMA synchronous=OFF")
+
+        for chunk in _chunks(generate_entries(spec), chunk_size):
+            conn.execute(Entry.__table__.insert(), chunk)
+            conn.commit()
+            counts["entries"] += len(chunk)
+            progress("entries", counts["entries"])
+
+        for chunk in _chunks(generate_votes(spec), chunk_size):
+            _bulk_insert(conn, Vote.__table__, ("entry_id", "vote_date", "ip_hash"), [
+                (entry_id(index), day.isoformat() if sqlite else day, hashed)
+                for index, day, hashed in chunk
+            ])
+            conn.commit()
+            for index, _, _ in chunk:
+                vote_counts[index] += 1
+            counts["votes"] += len(chunk)
+            progress("votes", counts["votes"])
+
+        created_at = datetime.combine(spec.as_of, datetime.min.time())
+        if sqlite:
+            created_at = created_at.strftime("%Y-%m-%d %H:%M:%S.%f")
+        for chunk in _chunks(generate_likes(spec), chunk_size):
+            _bulk_insert(conn, Like.__table__, ("entry_id", "ip_hash", "created_at"), [
+                (entry_id(index), hashed, created_at) for index, hashed in chunk
+            ])
+            conn.commit()
+            for index, _ in chunk:
+                like_counts[index] += 1
+            counts["likes"] += len(chunk)
+            progress("likes", counts["likes"])
+
+        # 计数已知，直接批量回填（无需 reconcile_counts 扫描投票表）
+        table = Entry.__table__
+        params = [
+            {"b_id": entry_id(i), "b_votes": vote_counts[i], "b_likes": like_counts[i]}
+            for i in range(spec.entries) if vote_counts[i] or like_counts[i]
+        ]
+        for start in range(0, len(params), chunk_size):
+            conn.execute(
+                update(table)
+                .where(table.c.id == bindparam("b_id"))
+                .values(vote_count=bindparam("b_votes"), like_count=bindparam("b_likes")),
+                params[start:start + chunk_size]
+            )
+        conn.commit()
+
+    with get_session_factory(engine)() as db:
+        counts["snapshot"] = rebuild_snapshot(db, as_of=spec.as_of)
+    return counts
+
+
+def write_yaml(spec: DatasetSpec, output_dir: Path) -> int:
+    """生成条目 YAML 文件，返回文件数"""
+    import yaml
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    count = 0
+    for entry in generate_entries(spec):
+        data = {
+            "id": entry["id"],
+            "title": entry["title"],
+            "owner": entry["owner"],
+            "repo_url": entry["repo_url"],
+            "last_commit": entry["last_commit"].isoformat(),
+            "summary": entry["summary"],
+            "tags": entry["tags"].split(","),
+        }
+        path = output_dir / f"{entry['id']}.yml"
+        path.write_text(yaml.safe_dump(data, allow_unicode=True, sort_keys=False), encoding="utf-8")
+        count += 1
+    return count
+
+
+# ==================== 命令行 ====================
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="生成规模测试数据集")
+    parser.add_argument("--mode", choices=("db", "yaml"), default="db", help="写入数据库或生成 YAML（默认 db）")
+    parser.add_argument("--entries", type=int, default=1000, help="条目数（默认 1000）")
+    parser.add_argument("--votes", type=int, default=20000, help="投票数（默认 20000）")
+    parser.add_argument("--likes", type=int, default=5000, help="点赞数（默认 5000）")
+    parser.add_argument("--days", type=int, default=365, help="投票跨越天数（默认 365）")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf 指数（默认 1.1，越大越集中）")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子（默认 42）")
+    parser.add_argument("--as-of", type=date.fromisoformat, help="基准日期 YYYY-MM-DD（默认今天；复现数据时需固定）")
+    parser.add_argument("--db-url", default=settings.DB_URL, help="数据库 URL（默认 DB_URL）")
+    parser.add_argument("--chunk-size", type=int, default=50_000, help="每批插入行数（默认 50000）")
+    parser.add_argument("--reset", action="store_true", help=f"先删除此前生成的数据（ID 前缀 {ID_PREFIX}）")
+    parser.add_argument("--output-dir", default="data/entries", help="yaml 模式的输出目录（默认 data/entries）")
+    args = parser.parse_args()
+
+    spec = DatasetSpec(
+        entries=args.entries, votes=args.votes, likes=args.likes,
+        days=args.days, zipf=args.zipf, seed=args.seed, as_of=args.as_of
+    )
+    started = time.perf_counter()
+
+    if args.mode == "yaml":
+        count = write_yaml(spec, Path(args.output_dir))
+        print(f"✨ 已生成 {count} 个 YAML 文件: {args.output_dir}（{time.perf_counter() - started:.1f} 秒）")
+        return 0
+
+    from server.models import get_engine, create_tables
+
+    print(f"🗄️  数据库 URL: {args.db_url}")
+    if args.db_url.startswith("sqlite"):
+        Path(args.db_url.replace("sqlite:///", "")).parent.mkdir(parents=True, exist_ok=True)
+    engine = get_engine(args.db_url)
+    create_tables(engine)
+    if args.reset:
+        reset_generated(engine)
+        print(f"🗑️  已删除此前生成的数据（{ID_PREFIX}*）")
+
+    last = {"table": None}
+
+    def progress(table: str, done: int):
+        if table != last["table"]:
+            last["table"] = table
+            print()
+        print(f"\r🔄 {table}: {done}", end="", flush=True)
+
+    print(f"🌱 生成 {spec.entries} 条目 / {spec.votes} 投票 / {spec.likes} 点赞 "
+          f"(seed={spec.seed}, as_of={spec.as_of})")
+    try:
+        counts = insert_dataset(engine, spec, chunk_size=args.chunk_size, progress=progress)
+    except Exception as e:
+        print(f"\n❌ 生成失败: {e}（已存在生成数据时可加 --reset）")
+        return 1
+    finally:
+        engine.dispose()
+
+    print(f"\n\n✨ 完成！条目 {counts['entries']}，投票 {counts['votes']}，点赞 {counts['likes']}，"
+          f"快照 {counts['snapshot']}（{time.perf_counter() - started:.1f} 秒）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
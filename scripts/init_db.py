@@ -2,6 +2,7 @@
 """
 数据库初始化脚本
 - 自动创建所有表结构
+- 执行未应用的迁移（补齐旧库的列与索引，见 server/migrations.py）
 - 支持 SQLite 和 PostgreSQL
 """
 
@@ -11,7 +12,8 @@ from pathlib import Path
 # 添加项目根目录到路径
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from server.models import Base, get_engine
+from server.models import Base, get_engine, create_tables
+from server.migrations import current_version
 from server.settings import settings
 
 
@@ -23,11 +25,17 @@ def init_database():
         # 获取数据库引擎
         engine = get_engine(settings.DB_URL)
 
-        # 创建所有表
-        Base.metadata.create_all(bind=engine)
+        # 创建所有表并执行迁移
+        applied = create_tables(engine)
+        for migration in applied:
+            print(f"🔄 已执行迁移 {migration.version}: {migration.description}")
+
+        with engine.connect() as conn:
+            version = current_version(conn)
 
         print("✅ 数据库初始化成功！")
         print(f"📊 已创建表: {', '.join(Base.metadata.tables.keys())}")
+        print(f"🏷️  结构版本: {version}")
 
         return True
 
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+重建条目计数字段（vote_count / like_count）
+
+- 旧数据库升级后首次回填
+- 计数与原始表不一致时纠偏（可重复执行）
+"""
+import argparse
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from server.models import get_engine, create_tables, get_session_factory
+from server.counters import reconcile_counts
+from server.snapshot import rebuild_snapshot
+from server.settings import settings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="从 votes / likes 表重建条目计数")
+    parser.add_argument("--chunk-size", type=int, default=500, help="每批处理的条目数（默认 500）")
+    args = parser.parse_args()
+
+    print(f"🗄️  数据库 URL: {settings.DB_URL}")
+
+    engine = get_engine(settings.DB_URL)
+    # 确保计数列存在（旧库自动补齐）
+    create_tables(engine)
+    db = get_session_factory(engine)()
+
+    try:
+        result = reconcile_counts(
+            db,
+            chunk_size=args.chunk_size,
+            progress=lambda done, fixed: print(f"🔄 已处理 {done} 条，本批修正 {fixed} 条")
+        )
+        # 计数变化会影响评分，重建排行榜快照
+        snapshot_count = rebuild_snapshot(db)
+    except Exception as e:
+        db.rollback()
+        print(f"❌ 重建失败: {e}")
+        return 1
+    finally:
+        db.close()
+
+    print(f"\n✨ 重建完成！共 {result['entries']} 条，修正 {result['fixed']} 条")
+    print(f"📊 排行榜快照: {snapshot_count} 条")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,16 +2,20 @@
 """Validate graveyard entries against the published schema."""
 from __future__ import annotations
 
+import argparse
 import json
 import re
 import sys
 from pathlib import Path
 from typing import List
 
-import yaml
 from jsonschema import ValidationError, validate
 
 ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from server.yaml_loader import parse_documents  # noqa: E402
+
 SCHEMA_MD = ROOT / "graveyard" / "schema.md"
 ENTRIES_DIR = ROOT / "graveyard" / "entries"
 
@@ -46,16 +50,31 @@ def detect_secrets(content: str, path: Path) -> List[str]:
     return findings
 
 
-def main() -> int:
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--workers", type=int, default=0,
+        help="YAML parser processes (0 = CPU count, 1 = serial; small sets are always parsed serially)",
+    )
+    args = parser.parse_args(argv)
+
     schema = load_schema()
     if not ENTRIES_DIR.exists():
         print("No entries directory found; nothing to validate.")
         return 0
 
     errors: List[str] = []
-    for entry_path in sorted(ENTRIES_DIR.glob("*.yml")):
-        raw = entry_path.read_text(encoding="utf-8")
-        data = yaml.safe_load(raw)
+    entry_files = [(path, path.read_bytes()) for path in sorted(ENTRIES_DIR.glob("*.yml"))]
+    documents = parse_documents(
+        [(str(path), content) for path, content in entry_files],
+        workers=args.workers,
+    )
+    for (entry_path, content), doc in zip(entry_files, documents):
+        if not doc.ok:
+            errors.append(f"YAML parse failed for {entry_path}: {doc.error}")
+            continue
+        data = doc.data
+        raw = content.decode("utf-8")
         try:
             validate(data, schema)
         except ValidationError as exc:
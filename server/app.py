@@ -1,45 +1,236 @@
 """
 FastAPI 主应用
 """
+import asyncio
 import hashlib
 import hmac
 import re
-import subprocess
+from contextlib import asynccontextmanager
 from datetime import date, datetime
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 from slugify import slugify
 
-from fastapi import FastAPI, Request, HTTPException, Header, Depends
+from fastapi import FastAPI, Request, Response, HTTPException, Header, Depends, Query
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
-from sqlalchemy import func, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, select
 
 from server.settings import settings
 from server.models import (
-    get_engine, create_tables, get_session_factory,
-    Entry, Vote, Like, ApprovalStatus
+    get_engine, create_tables, get_session_factory, get_async_engine, get_async_session_factory, dialect_insert,
+    Entry, Vote, Like, ApprovalStatus, SQLiteProfile
 )
 from server.schema import (
     EntryResponse, EntrySubmit, EntryReview,
     VoteRequest, LikeRequest, APIResponse
 )
 from server.scoring import calculate_score
+from server.leaderboard import build_leaderboard, query_entries, EntryQuery, InvalidCursor
+from server.snapshot import (
+    snapshot_rows, snapshot_upsert, snapshot_delete, rebuild_snapshot, ensure_snapshot, snapshot_checked_today
+)
+from server.counters import increment_counter
+from server.rollup import compact_votes
+from server.importer import import_directory, default_data_dir
+from server.cache import LeaderboardCache
+from server.fastjson import RawJSONResponse, fast_json_response
+from server.vote_guard import DailyVoteSet, ApprovedEntryIndex
+from server.write_behind import WriteBehindBuffer, WriteBehindError, VoteOp, LikeOp
+from server.live import LiveHub
+from server.jobs import JobRunner, run_command
+from server.metrics import MetricsRegistry, MetricsMiddleware, define_metrics, instrument_engine
+from server.profiling import QueryProfiler, ProfilingMiddleware
+from server.replicas import ReplicaSet
+from server.ratelimit import RateLimiter, RateLimitMiddleware, client_address, parse_networks
+from server.assets import AssetPipeline, asset_response
+
+# SQLite 生产配置（WAL、连接 PRAGMA、读写分离的连接池）
+sqlite_profile = SQLiteProfile(
+    synchronous=settings.SQLITE_SYNCHRONOUS,
+    mmap_size=settings.SQLITE_MMAP_SIZE,
+    cache_size=settings.SQLITE_CACHE_SIZE,
+    busy_timeout=settings.SQLITE_BUSY_TIMEOUT_MS,
+    temp_store=settings.SQLITE_TEMP_STORE,
+    read_pool_size=settings.SQLITE_READ_POOL_SIZE
+) if settings.SQLITE_PRODUCTION else None
+
+# 初始化数据库（建表与后台任务使用同步引擎，路由使用异步引擎，避免阻塞事件循环）
+sync_engine = get_engine(settings.DB_URL, sqlite_profile)
+create_tables(sync_engine)
+SyncSessionLocal = get_session_factory(sync_engine)
+engine = get_async_engine(settings.DB_URL, sqlite_profile)
+SessionLocal = get_async_session_factory(engine)
+
+# GET 路由使用只读引擎（SQLite 生产配置下为独立的只读连接池，其余情况与写引擎相同）
+if sqlite_profile is not None and settings.DB_URL.startswith("sqlite"):
+    read_engine = get_async_engine(settings.DB_URL, sqlite_profile, read_only=True)
+else:
+    read_engine = engine
+
+# 只读副本（DB_READ_URLS）：只读接口轮询使用，全部不可用时回退 read_engine
+read_replicas = ReplicaSet(
+    [get_async_engine(url, sqlite_profile, read_only=True) for url in settings.read_urls],
+    fallback=read_engine,
+    check_interval=settings.DB_REPLICA_CHECK_INTERVAL
+)
+
+# 排行榜缓存（写操作后调用 invalidate）
+leaderboard_cache = LeaderboardCache(ttl=settings.LEADERBOARD_CACHE_TTL)
+
+# 投票前置拦截（审核 / 重新加载后调用 approved_entries.invalidate）
+approved_entries = ApprovedEntryIndex(ttl=settings.APPROVED_INDEX_TTL)
+daily_votes = DailyVoteSet(max_size=settings.VOTE_DEDUPE_MAX)
+
+# 投票 / 点赞写缓冲（可选）
+write_buffer = WriteBehindBuffer(
+    SessionLocal,
+    flush_interval_ms=settings.WRITE_BEHIND_FLUSH_MS,
+    batch_size=settings.WRITE_BEHIND_BATCH_SIZE,
+    max_queue=settings.WRITE_BEHIND_QUEUE_SIZE,
+    durability=settings.WRITE_BEHIND_DURABILITY,
+    on_flush=leaderboard_cache.invalidate
+) if settings.WRITE_BEHIND else None
+
+
+# 实时分数推送（/api/stream）
+live_hub = LiveHub(
+    interval=settings.STREAM_INTERVAL,
+    max_clients=settings.STREAM_MAX_CLIENTS,
+    max_lifetime=settings.STREAM_MAX_LIFETIME
+)
+
+# 后台任务（部署、重新加载）；多 worker 时通过 JOBS_DIR 共享任务状态并跨进程串行
+job_runner = JobRunner(settings.JOBS_DIR or None)
+
+# 写接口限流（在路由与数据库会话之前拦截）
+rate_limiter = RateLimiter(max_keys=settings.RATE_LIMIT_TABLE_SIZE)
+if settings.RATE_LIMIT_ENABLED:
+    rate_limiter.add_rule("POST", "/api/vote", "vote", settings.RATE_LIMIT_VOTE)
+    rate_limiter.add_rule("POST", "/api/like", "like", settings.RATE_LIMIT_LIKE)
+    rate_limiter.add_rule("POST", "/api/submit", "submit", settings.RATE_LIMIT_SUBMIT)
+
+# 运行指标（/metrics）
+metrics = MetricsRegistry(
+    settings.METRICS_DIR if settings.METRICS_ENABLED else None,
+    flush_interval=settings.METRICS_FLUSH_INTERVAL
+)
+define_metrics(metrics)
+if settings.METRICS_ENABLED:
+    instrument_engine(engine.sync_engine, metrics, "async")
+    instrument_engine(sync_engine, metrics, "sync")
+    if read_engine is not engine:
+        instrument_engine(read_engine.sync_engine, metrics, "read")
+    for replica in read_replicas.replicas:
+        instrument_engine(replica.engine.sync_engine, metrics, replica.name)
+
+# SQL 查询剖析（可选）
+query_profiler = QueryProfiler(
+    n_plus_one=settings.PROFILE_N_PLUS_ONE,
+    slow_ms=settings.PROFILE_SLOW_MS,
+    log_path=settings.PROFILE_LOG,
+    max_bytes=settings.PROFILE_LOG_MAX_BYTES,
+    backups=settings.PROFILE_LOG_BACKUPS,
+    header=settings.PROFILE_HEADERS
+) if settings.PROFILE_QUERIES else None
+if query_profiler is not None:
+    query_profiler.instrument(engine.sync_engine)
+    query_profiler.instrument(sync_engine)
+    if read_engine is not engine:
+        query_profiler.instrument(read_engine.sync_engine)
+    for replica in read_replicas.replicas:
+        query_profiler.instrument(replica.engine.sync_engine)
+
+
+@metrics.add_collector
+def collect_app_metrics():
+    """缓存命中、推送连接数与写缓冲队列长度"""
+    yield "conch_cache_requests_total", {"cache": "leaderboard", "result": "hit"}, leaderboard_cache.hits
+    yield "conch_cache_requests_total", {"cache": "leaderboard", "result": "miss"}, leaderboard_cache.misses
+    yield "conch_cache_requests_total", {"cache": "approved_entries", "result": "hit"}, approved_entries.hits
+    yield "conch_cache_requests_total", {"cache": "approved_entries", "result": "miss"}, approved_entries.misses
+    yield "conch_stream_clients", {}, live_hub.client_count
+    for (route, scope), count in rate_limiter.rejected.items():
+        yield "conch_rate_limited_total", {"route": route, "scope": scope}, count
+    for replica in read_replicas.replicas:
+        yield "conch_db_replica_healthy", {"replica": replica.name}, int(replica.healthy)
+    if write_buffer is not None:
+        yield "conch_write_behind_queue", {}, len(write_buffer)
+
+# 部署脚本超时（秒）
+DEPLOY_TIMEOUT = 300
+
+
+def submit_compaction():
+    """提交投票压缩任务（串行执行，排队中的重复提交合并）"""
+    archive_dir = Path(settings.VOTE_ARCHIVE_DIR) if settings.VOTE_ARCHIVE_DIR else None
+
+    def compact() -> dict:
+        with SyncSessionLocal() as db:
+            return compact_votes(db, settings.VOTE_RETENTION_DAYS, archive_dir)
+
+    async def run(job):
+        job.progress = f"Compacting votes older than {settings.VOTE_RETENTION_DAYS} days"
+        result = await asyncio.to_thread(compact)
+        job.progress = f"{result['votes']} votes compacted"
+        return result
+
+    return job_runner.submit("compact", run, key="compact")
+
+
+async def compact_periodically(interval: float):
+    """启动时及之后每隔 interval 秒提交一次投票压缩"""
+    while True:
+        submit_compaction()
+        await asyncio.sleep(interval)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期：启动写缓冲与推送任务，关闭时取消后台任务并刷新剩余写入"""
+    if write_buffer is not None:
+        await write_buffer.start()
+    await live_hub.start()
+    await metrics.start()
+    await read_replicas.start()
+    compactor = None
+    if settings.VOTE_COMPACT_INTERVAL > 0:
+        compactor = asyncio.create_task(compact_periodically(settings.VOTE_COMPACT_INTERVAL))
+    yield
+    if compactor is not None:
+        compactor.cancel()
+        await asyncio.gather(compactor, return_exceptions=True)
+    await read_replicas.stop()
+    await metrics.stop()
+    await job_runner.stop()
+    await live_hub.stop()
+    if write_buffer is not None:
+        await write_buffer.stop()
+    await engine.dispose()
+    if read_engine is not engine:
+        await read_engine.dispose()
 
-# 初始化数据库
-engine = get_engine(settings.DB_URL)
-create_tables(engine)
-SessionLocal = get_session_factory(engine)
 
 # 创建 FastAPI 应用
 app = FastAPI(
     title="神奇海螺·烂尾博物馆",
     description="一个极简的烂尾项目展览馆，支持用户提交和管理员审核",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
+# 写接口限流（位于 CORS 之内，429 响应同样带 CORS 头）
+if rate_limiter.rules:
+    trusted_proxies = parse_networks(settings.TRUSTED_PROXIES)
+    app.add_middleware(
+        RateLimitMiddleware,
+        limiter=rate_limiter,
+        client_ip=lambda scope: client_address(scope, trusted_proxies)
+    )
+
 # 配置 CORS
 app.add_middleware(
     CORSMiddleware,
@@ -47,17 +238,36 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "X-DB-Queries", "X-DB-Time", "Retry-After"],
 )
 
+# SQL 查询剖析（位于 CORS 之外，预检请求也会被统计）
+if query_profiler is not None:
+    app.add_middleware(ProfilingMiddleware, profiler=query_profiler)
+
+# 请求计数、延迟与每个请求的数据库统计（最外层，包含 CORS 处理）
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, registry=metrics)
+
 
 # 依赖：数据库会话
-def get_db():
-    """获取数据库会话"""
-    db = SessionLocal()
-    try:
+async def get_db():
+    """获取异步数据库会话（写操作）"""
+    async with SessionLocal() as db:
+        yield db
+
+
+async def get_read_db():
+    """获取只读数据库会话（GET 路由，配置了副本时轮询使用副本）"""
+    async with read_replicas.session() as db:
         yield db
-    finally:
-        db.close()
+
+
+async def ensure_snapshot_fresh():
+    """跨日后由写引擎重建排行榜快照（只读会话中的 ensure_snapshot 随后直接返回）"""
+    if not snapshot_checked_today():
+        async with SessionLocal() as db:
+            await db.run_sync(ensure_snapshot)
 
 
 def get_client_ip(request: Request) -> str:
@@ -126,58 +336,87 @@ def generate_entry_id(title: str) -> str:
 
 # ==================== API 路由 ====================
 
+def rebuild_leaderboard(db: Session):
+    """重建完整排行榜并写入缓存（同步会话，经 AsyncSession.run_sync 调用）"""
+    version = leaderboard_cache.version
+    # 读取排行榜快照，一次带索引排序的查询
+    return leaderboard_cache.set(build_leaderboard(db), version)
+
+
 @app.get("/api/entries", response_model=List[EntryResponse])
 async def get_entries(
+    response: Response,
     include_pending: bool = False,
-    db: Session = Depends(get_db)
+    sort: str = Query("score", pattern="^(score|votes|likes|last_commit|submitted_at)$"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    limit: Optional[int] = Query(None, ge=1, le=200),
+    after: Optional[str] = None,
+    tag: Optional[str] = None,
+    owner: Optional[str] = None,
+    min_score: Optional[int] = Query(None, ge=0, le=100),
+    max_score: Optional[int] = Query(None, ge=0, le=100),
+    if_none_match: str = Header(None),
+    x_admin_token: str = Header(None),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
-    获取所有条目，包含实时评分
+    获取条目，包含实时评分
+
+    不带参数时返回完整排行榜（进程内缓存编码后的 JSON，支持 If-None-Match / ETag 条件请求）；
+    指定 limit 时分页返回，下一页游标放在 X-Next-Cursor 响应头中，作为 after 参数传回。
 
     Args:
         include_pending: 是否包含待审核条目（需要管理员）
+        sort: 排序字段 score/votes/likes/last_commit/submitted_at
+        order: 排序方向 asc/desc
+        limit: 每页条数（1-200，不传则返回全部）
+        after: 上一页返回的游标
+        tag: 按标签筛选
+        owner: 按所有者筛选
+        min_score: 最低烂尾指数
+        max_score: 最高烂尾指数
     """
-    # 查询已批准的条目
-    query = db.query(Entry).filter(Entry.status == ApprovalStatus.APPROVED)
+    if include_pending and x_admin_token != settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid admin token")
 
-    entries = query.all()
-    result = []
+    q = EntryQuery(
+        sort=sort, order=order, limit=limit, after=after,
+        tag=tag, owner=owner, min_score=min_score, max_score=max_score,
+        include_pending=include_pending
+    )
 
-    for entry in entries:
-        # 统计投票数和点赞数
-        vote_count = db.query(func.count(Vote.id)).filter(Vote.entry_id == entry.id).scalar()
-        like_count = db.query(func.count(Like.id)).filter(Like.entry_id == entry.id).scalar()
+    await ensure_snapshot_fresh()
 
-        # 计算评分
-        score_data = calculate_score(vote_count, entry.last_commit)
+    if not q.is_default:
+        try:
+            page, next_cursor = await db.run_sync(query_entries, q)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+        if settings.VALIDATE_RESPONSES:
+            response.headers.update(headers or {})
+            return page
+        return fast_json_response(page, headers)
 
-        result.append({
-            "id": entry.id,
-            "title": entry.title,
-            "owner": entry.owner,
-            "repo_url": entry.repo_url,
-            "last_commit": entry.last_commit,
-            "summary": entry.summary,
-            "tags": entry.tags,
-            "status": entry.status.value,
-            "days_stale": score_data['days_stale'],
-            "votes": vote_count,
-            "likes": like_count,
-            "score": score_data['total_score'],
-            "submitted_at": entry.submitted_at
-        })
+    cached = leaderboard_cache.get()
+    if cached is None:
+        cached = await db.run_sync(rebuild_leaderboard)
 
-    # 按分数降序排序
-    result.sort(key=lambda x: x['score'], reverse=True)
+    if if_none_match and cached.etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers={"ETag": cached.etag})
 
-    return result
+    if settings.VALIDATE_RESPONSES:
+        response.headers["ETag"] = cached.etag
+        return cached.data
+    # 直接返回缓存中已编码的字节
+    return RawJSONResponse(cached.body, headers={"ETag": cached.etag})
 
 
 @app.post("/api/submit")
 async def submit_entry(
     entry_data: EntrySubmit,
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     用户提交新项目（待审核）
@@ -201,8 +440,8 @@ async def submit_entry(
     )
 
     db.add(new_entry)
-    db.commit()
-    db.refresh(new_entry)
+    await db.commit()
+    leaderboard_cache.invalidate()
 
     return {
         "ok": True,
@@ -218,18 +457,18 @@ async def submit_entry(
 async def vote(
     vote_req: VoteRequest,
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     为条目投票（踩一脚，防刷：每个 IP 每天每条目最多 1 票）
-    """
-    # 检查条目是否存在且已批准
-    entry = db.query(Entry).filter(
-        Entry.id == vote_req.entry_id,
-        Entry.status == ApprovalStatus.APPROVED
-    ).first()
 
-    if not entry:
+    重复点击由进程内去重集合直接拒绝；写入使用 INSERT ... ON CONFLICT DO NOTHING，
+    并发重复投票由唯一索引 idx_unique_vote 兜底，不会出现 IntegrityError。
+    """
+    # 检查条目是否存在且已批准（进程内索引）
+    last_commit = await approved_entries.get(db, vote_req.entry_id)
+    if last_commit is None:
+        metrics.inc("conch_votes_total", result="not_found")
         return JSONResponse(
             status_code=404,
             content={"ok": False, "error": "Entry not found or not approved"}
@@ -240,38 +479,128 @@ async def vote(
     today = date.today()
     ip_hash_value = hash_ip_daily(client_ip, today)
 
-    # 检查今天是否已投票
-    existing_vote = db.query(Vote).filter(
-        Vote.entry_id == vote_req.entry_id,
-        Vote.vote_date == today,
-        Vote.ip_hash == ip_hash_value
-    ).first()
-
-    if existing_vote:
+    # 检查今天是否已投票（进程内去重集合）
+    if daily_votes.contains(vote_req.entry_id, ip_hash_value, today):
+        metrics.inc("conch_votes_total", result="duplicate")
         return JSONResponse(
             status_code=400,
             content={"ok": False, "error": "Already voted today"}
         )
 
-    # 创建投票记录
-    new_vote = Vote(
-        entry_id=vote_req.entry_id,
-        vote_date=today,
-        ip_hash=ip_hash_value
+    if write_buffer is not None:
+        # 写缓冲模式：入队后按乐观计数返回（先占位，挡住等待入队期间的并发重复投票）
+        daily_votes.add(vote_req.entry_id, ip_hash_value, today)
+        # 归还请求会话的连接：SQLite 写连接池只有一个连接，写缓冲提交批次时需要它
+        await db.commit()
+        try:
+            await write_buffer.submit(VoteOp(vote_req.entry_id, ip_hash_value, today))
+        except WriteBehindError:
+            # 未保存，撤销占位以便重试
+            daily_votes.discard(vote_req.entry_id, ip_hash_value, today)
+            metrics.inc("conch_votes_total", result="failed")
+            return JSONResponse(status_code=503, content={"ok": False, "error": "Vote not saved, please retry"})
+        metrics.inc("conch_votes_total", result="accepted")
+        vote_count = await stored_count(db, vote_req.entry_id, Entry.vote_count) \
+            + write_buffer.pending_votes(vote_req.entry_id)
+        score = calculate_score(vote_count, last_commit)['total_score']
+        live_hub.publish(vote_req.entry_id, votes=vote_count, score=score)
+        return {
+            "ok": True,
+            "data": {
+                "entry_id": vote_req.entry_id,
+                "votes": vote_count,
+                "score": score
+            }
+        }
+
+    # 创建投票记录（冲突即视为今天已投票）
+    inserted = await db.execute(
+        dialect_insert(db.bind.dialect.name, Vote)
+        .values(entry_id=vote_req.entry_id, vote_date=today, ip_hash=ip_hash_value)
+        .on_conflict_do_nothing(index_elements=['entry_id', 'vote_date', 'ip_hash'])
     )
-    db.add(new_vote)
-    db.commit()
+    if inserted.rowcount == 0:
+        await db.rollback()
+        daily_votes.add(vote_req.entry_id, ip_hash_value, today)
+        metrics.inc("conch_votes_total", result="duplicate")
+        return JSONResponse(
+            status_code=400,
+            content={"ok": False, "error": "Already voted today"}
+        )
 
-    # 重新计算分数
-    vote_count = db.query(func.count(Vote.id)).filter(Vote.entry_id == vote_req.entry_id).scalar()
-    score_data = calculate_score(vote_count, entry.last_commit)
+    # 同一事务内更新计数、取回最新值，并刷新该条目的排行榜快照
+    vote_count = (await db.execute(
+        increment_counter(vote_req.entry_id, Entry.vote_count)
+        .where(Entry.status == ApprovalStatus.APPROVED)
+        .returning(Entry.vote_count)
+    )).scalar_one_or_none()
+    if vote_count is None:
+        # 索引过期：条目已被删除或撤销批准
+        await db.rollback()
+        approved_entries.discard(vote_req.entry_id)
+        metrics.inc("conch_votes_total", result="not_found")
+        return JSONResponse(
+            status_code=404,
+            content={"ok": False, "error": "Entry not found or not approved"}
+        )
+    snapshot = snapshot_rows([(vote_req.entry_id, vote_count, last_commit)])
+    await db.execute(snapshot_upsert(db.bind.dialect.name, snapshot))
+    await db.commit()
+    # 提交成功后才记入去重集合（回滚的投票不应挡住之后的重试）
+    daily_votes.add(vote_req.entry_id, ip_hash_value, today)
+    metrics.inc("conch_votes_total", result="accepted")
+    leaderboard_cache.invalidate()
+    live_hub.publish(vote_req.entry_id, votes=vote_count, score=snapshot[0]['score'])
 
     return {
         "ok": True,
         "data": {
             "entry_id": vote_req.entry_id,
             "votes": vote_count,
-            "score": score_data['total_score']
+            "score": snapshot[0]['score']
+        }
+    }
+
+
+async def stored_count(db: AsyncSession, entry_id: str, column) -> int:
+    """读取条目已提交的计数"""
+    return (await db.execute(select(column).where(Entry.id == entry_id))).scalar_one_or_none() or 0
+
+
+async def buffered_like(like_req: LikeRequest, request: Request, db: AsyncSession):
+    """写缓冲模式下的点赞切换：状态以待写入操作为准，否则查询数据库"""
+    if await approved_entries.get(db, like_req.entry_id) is None:
+        metrics.inc("conch_likes_total", result="not_found")
+        return JSONResponse(
+            status_code=404,
+            content={"ok": False, "error": "Entry not found or not approved"}
+        )
+
+    ip_hash_value = hash_ip(get_client_ip(request))
+    liked = write_buffer.pending_like_state(like_req.entry_id, ip_hash_value)
+    if liked is None:
+        liked = (await db.execute(
+            select(Like.id).where(Like.entry_id == like_req.entry_id, Like.ip_hash == ip_hash_value)
+        )).first() is not None
+
+    # 归还请求会话的连接（见 vote），否则写缓冲提交批次时取不到写连接
+    await db.commit()
+    try:
+        await write_buffer.submit(LikeOp(like_req.entry_id, ip_hash_value, liked=not liked))
+    except WriteBehindError:
+        metrics.inc("conch_likes_total", result="failed")
+        return JSONResponse(status_code=503, content={"ok": False, "error": "Like not saved, please retry"})
+    metrics.inc("conch_likes_total", result="unliked" if liked else "liked")
+
+    like_count = await stored_count(db, like_req.entry_id, Entry.like_count) \
+        + write_buffer.pending_likes(like_req.entry_id)
+    live_hub.publish(like_req.entry_id, likes=like_count)
+    return {
+        "ok": True,
+        "data": {
+            "entry_id": like_req.entry_id,
+            "action": "unliked" if liked else "liked",
+            "likes": like_count
         }
     }
 
@@ -280,18 +609,17 @@ async def vote(
 async def like_entry(
     like_req: LikeRequest,
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     为条目点赞（每个 IP 每条目只能点赞一次）
     """
-    # 检查条目是否存在且已批准
-    entry = db.query(Entry).filter(
-        Entry.id == like_req.entry_id,
-        Entry.status == ApprovalStatus.APPROVED
-    ).first()
+    if write_buffer is not None:
+        return await buffered_like(like_req, request, db)
 
-    if not entry:
+    # 检查条目是否存在且已批准（进程内索引）
+    if await approved_entries.get(db, like_req.entry_id) is None:
+        metrics.inc("conch_likes_total", result="not_found")
         return JSONResponse(
             status_code=404,
             content={"ok": False, "error": "Entry not found or not approved"}
@@ -301,29 +629,46 @@ async def like_entry(
     client_ip = get_client_ip(request)
     ip_hash_value = hash_ip(client_ip)
 
-    # 检查是否已点赞
-    existing_like = db.query(Like).filter(
-        Like.entry_id == like_req.entry_id,
-        Like.ip_hash == ip_hash_value
-    ).first()
+    # 已点赞则取消：条件删除，删到行即说明原先已点赞
+    removed = (await db.execute(
+        delete(Like)
+        .where(Like.entry_id == like_req.entry_id, Like.ip_hash == ip_hash_value)
+        .returning(Like.id)
+    )).first()
 
-    if existing_like:
-        # 已点赞，则取消点赞
-        db.delete(existing_like)
-        db.commit()
+    if removed:
         action = "unliked"
+        delta = -1
     else:
-        # 未点赞，则添加点赞
-        new_like = Like(
-            entry_id=like_req.entry_id,
-            ip_hash=ip_hash_value
+        # 未点赞则添加；并发的重复点击由唯一索引 idx_unique_like 吸收
+        inserted = await db.execute(
+            dialect_insert(db.bind.dialect.name, Like)
+            .values(entry_id=like_req.entry_id, ip_hash=ip_hash_value)
+            .on_conflict_do_nothing(index_elements=['entry_id', 'ip_hash'])
         )
-        db.add(new_like)
-        db.commit()
         action = "liked"
-
-    # 获取最新点赞数
-    like_count = db.query(func.count(Like.id)).filter(Like.entry_id == like_req.entry_id).scalar()
+        delta = 1 if inserted.rowcount else 0
+
+    # 同一事务内更新计数并取回最新点赞数
+    like_count = (await db.execute(
+        increment_counter(like_req.entry_id, Entry.like_count, delta)
+        .where(Entry.status == ApprovalStatus.APPROVED)
+        .returning(Entry.like_count)
+    )).scalar_one_or_none()
+    if like_count is None:
+        # 索引过期：条目已被删除或撤销批准
+        await db.rollback()
+        approved_entries.discard(like_req.entry_id)
+        metrics.inc("conch_likes_total", result="not_found")
+        return JSONResponse(
+            status_code=404,
+            content={"ok": False, "error": "Entry not found or not approved"}
+        )
+    await db.commit()
+    metrics.inc("conch_likes_total", result=action)
+    if delta:
+        leaderboard_cache.invalidate()
+        live_hub.publish(like_req.entry_id, likes=like_count)
 
     return {
         "ok": True,
@@ -335,10 +680,33 @@ async def like_entry(
     }
 
 
+@app.get("/api/stream")
+async def stream_updates(request: Request):
+    """
+    实时推送条目分数变更（Server-Sent Events）
+
+    事件 entries 的数据为 [{id, votes?, likes?, score?, status?}, ...]；
+    收到 reset 时客户端应重新请求 /api/entries。
+    """
+    if live_hub.full:
+        return JSONResponse(
+            status_code=503,
+            content={"ok": False, "error": "Too many live connections"}
+        )
+    return StreamingResponse(
+        live_hub.stream(request),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # 关闭 Nginx 响应缓冲
+        }
+    )
+
+
 @app.get("/api/admin/pending")
 async def get_pending_entries(
     x_admin_token: str = Header(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     获取待审核条目（管理员）
@@ -346,9 +714,11 @@ async def get_pending_entries(
     if x_admin_token != settings.ADMIN_TOKEN:
         raise HTTPException(status_code=403, detail="Invalid admin token")
 
-    pending_entries = db.query(Entry).filter(
-        Entry.status == ApprovalStatus.PENDING
-    ).order_by(Entry.submitted_at.desc()).all()
+    pending_entries = (await db.execute(
+        select(Entry)
+        .where(Entry.status == ApprovalStatus.PENDING)
+        .order_by(Entry.submitted_at.desc())
+    )).scalars().all()
 
     result = []
     for entry in pending_entries:
@@ -372,7 +742,7 @@ async def review_entry(
     entry_id: str,
     review: EntryReview,
     x_admin_token: str = Header(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     审核条目（管理员）
@@ -380,20 +750,28 @@ async def review_entry(
     if x_admin_token != settings.ADMIN_TOKEN:
         raise HTTPException(status_code=403, detail="Invalid admin token")
 
-    entry = db.query(Entry).filter(Entry.id == entry_id).first()
+    entry = await db.get(Entry, entry_id)
     if not entry:
         raise HTTPException(status_code=404, detail="Entry not found")
 
-    # 更新审核状态
+    # 更新审核状态（同步更新排行榜快照）
     if review.action == "approve":
         entry.status = ApprovalStatus.APPROVED
+        snapshot = snapshot_rows([(entry.id, entry.vote_count, entry.last_commit)])
+        await db.execute(snapshot_upsert(db.bind.dialect.name, snapshot))
+        live_hub.publish(entry.id, status=entry.status.value, votes=entry.vote_count,
+                         likes=entry.like_count, score=snapshot[0]['score'])
     elif review.action == "reject":
         entry.status = ApprovalStatus.REJECTED
+        await db.execute(snapshot_delete(entry.id))
+        live_hub.publish(entry.id, status=entry.status.value)
 
     entry.reviewed_at = datetime.utcnow()
     entry.review_note = review.review_note
 
-    db.commit()
+    await db.commit()
+    leaderboard_cache.invalidate()
+    approved_entries.invalidate()
 
     return {
         "ok": True,
@@ -405,69 +783,73 @@ async def review_entry(
     }
 
 
-@app.post("/api/reload")
+@app.post("/api/reload", status_code=202)
 async def reload_entries(
-    x_admin_token: str = Header(None),
-    db: Session = Depends(get_db)
+    full: bool = Query(False, description="忽略文件清单，重新解析全部 YAML"),
+    x_admin_token: str = Header(None)
 ):
     """
     重新加载条目（需要管理员 Token）
-    从 YAML 文件导入，自动设为已批准状态
+    后台从 YAML 文件增量导入（只解析新增或内容变化的文件），自动设为已批准状态；
+    返回任务 ID，通过 /api/jobs/{id} 查询导入结果
     """
     if x_admin_token != settings.ADMIN_TOKEN:
         raise HTTPException(status_code=403, detail="Invalid admin token")
 
-    # 导入脚本逻辑
-    import yaml
-
-    # 确定数据目录（支持本地和 Docker）
-    data_dir = Path("/app/data/entries") if Path("/app/data/entries").exists() else Path("data/entries")
+    data_dir = default_data_dir()
     if not data_dir.exists():
         return {"ok": False, "error": "Data directory not found"}
 
-    count = 0
-    for yaml_file in data_dir.glob("*.yml"):
-        with open(yaml_file, 'r', encoding='utf-8') as f:
-            data = yaml.safe_load(f)
-
-        # 处理日期
-        if isinstance(data.get('last_commit'), str):
-            last_commit = datetime.strptime(data['last_commit'], '%Y-%m-%d').date()
-        else:
-            last_commit = data.get('last_commit')
-
-        # 处理标签
-        tags_str = ','.join(data.get('tags', [])) if data.get('tags') else None
-
-        # Upsert
-        entry = db.query(Entry).filter(Entry.id == data['id']).first()
-        if entry:
-            entry.title = data['title']
-            entry.owner = data['owner']
-            entry.repo_url = data['repo_url']
-            entry.last_commit = last_commit
-            entry.summary = data['summary']
-            entry.tags = tags_str
-            # YAML 导入的条目自动批准
-            if entry.status == ApprovalStatus.PENDING:
-                entry.status = ApprovalStatus.APPROVED
-        else:
-            entry = Entry(
-                id=data['id'],
-                title=data['title'],
-                owner=data['owner'],
-                repo_url=data['repo_url'],
-                last_commit=last_commit,
-                summary=data['summary'],
-                tags=tags_str,
-                status=ApprovalStatus.APPROVED  # YAML 导入自动批准
-            )
-            db.add(entry)
-        count += 1
-
-    db.commit()
-
-    return {"ok": True, "data": {"count": count}}
+    def import_entries(full: bool) -> dict:
+        with SyncSessionLocal() as db:
+            report = import_directory(db, data_dir, full=full, workers=settings.YAML_WORKERS)
+            if report.count or full:
+                rebuild_snapshot(db)
+        return report.to_dict()
+
+    async def run(job):
+        # 开始执行时读取参数（排队期间合并进来的全量请求会把 full 改为 True）
+        full = job.params["full"]
+        job.progress = f"Importing {data_dir}"
+        report = await asyncio.to_thread(import_entries, full)
+        if report["count"] or full:
+            leaderboard_cache.invalidate()
+            approved_entries.invalidate()
+        job.progress = f"{report['count']} entries written"
+        return report
+
+    # 重新加载串行执行，排队中的重复请求合并；合并的请求要求全量时，排队任务升级为全量
+    job, created = job_runner.submit("reload", run, key="reload")
+    job.params["full"] = job.params.get("full", False) or full
+    return {"ok": True, "data": {"job_id": job.id, "status": job.status.value, "coalesced": not created}}
+
+
+@app.post("/api/admin/compact", status_code=202)
+async def compact_old_votes(x_admin_token: str = Header(None)):
+    """
+    压缩投票（需要管理员 Token）
+    后台把超过保留期的原始投票按日汇总进 vote_daily_totals 并删除原始行；
+    返回任务 ID，通过 /api/jobs/{id} 查询压缩结果
+    """
+    if x_admin_token != settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+    job, created = submit_compaction()
+    return {"ok": True, "data": {"job_id": job.id, "status": job.status.value, "coalesced": not created}}
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str, x_admin_token: str = Header(None)):
+    """
+    查询后台任务状态、进度、退出码与输出（需要管理员 Token）
+    """
+    if x_admin_token != settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+    job = job_runner.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"ok": True, "data": job}
 
 
 def verify_github_signature(payload_body: bytes, signature_header: str) -> bool:
@@ -546,36 +928,22 @@ async def github_webhook(
             "error": "Deploy script not found"
         }
 
-    try:
-        # 异步执行部署脚本
-        result = subprocess.run(
-            ["bash", str(deploy_script)],
-            capture_output=True,
-            text=True,
-            timeout=300  # 5分钟超时
-        )
+    async def run(job):
+        await run_command(job, ["bash", str(deploy_script)], timeout=DEPLOY_TIMEOUT)
 
-        return {
-            "ok": True,
-            "data": {
-                "ref": ref,
-                "commit": payload.get('after', '')[:7],
-                "message": payload.get('head_commit', {}).get('message', ''),
-                "deploy_output": result.stdout,
-                "deploy_stderr": result.stderr,
-                "return_code": result.returncode
-            }
-        }
-    except subprocess.TimeoutExpired:
-        return {
-            "ok": False,
-            "error": "Deployment timeout (>5 minutes)"
-        }
-    except Exception as e:
-        return {
-            "ok": False,
-            "error": str(e)
+    # 后台执行，部署串行：部署进行中再次推送时排队一次，期间的后续推送合并到该次部署
+    job, created = job_runner.submit("deploy", run, key="deploy")
+    return JSONResponse(status_code=202, content={
+        "ok": True,
+        "data": {
+            "job_id": job.id,
+            "status": job.status.value,
+            "coalesced": not created,
+            "ref": ref,
+            "commit": payload.get('after', '')[:7],
+            "message": payload.get('head_commit', {}).get('message', '')
         }
+    })
 
 
 # ==================== 静态文件服务 ====================
@@ -583,22 +951,45 @@ async def github_webhook(
 # 确定静态文件目录（支持本地和 Docker）
 PUBLIC_DIR = Path("/app/public") if Path("/app/public").exists() else Path("public")
 
-# 挂载静态文件目录
-app.mount("/assets", StaticFiles(directory=str(PUBLIC_DIR)), name="assets")
+# 静态资源流水线：启动时指纹化、预压缩并常驻内存（关闭时直接读取磁盘，便于前端开发）
+assets = AssetPipeline(PUBLIC_DIR, settings.ASSETS_DIR or None).build() if settings.ASSET_PIPELINE else None
+
+
+if assets is not None:
+    # 与 StaticFiles 一致，同时支持 HEAD（响应体由服务器丢弃）
+    @app.api_route("/assets/{filename:path}", methods=["GET", "HEAD"], include_in_schema=False)
+    async def static_asset(filename: str, request: Request):
+        """静态资源（带哈希的文件名长期缓存，按 Accept-Encoding 返回压缩版本）"""
+        asset = assets.get(filename)
+        if asset is None:
+            raise HTTPException(status_code=404, detail="Not Found")
+        return asset_response(asset, request)
+else:
+    # 挂载静态文件目录
+    app.mount("/assets", StaticFiles(directory=str(PUBLIC_DIR)), name="assets")
+
+
+def html_page(name: str, request: Request) -> Optional[Response]:
+    """返回 HTML 页面（流水线开启时为改写了资源 URL 的内存副本），不存在时返回 None"""
+    if assets is not None:
+        page = assets.pages.get(name)
+        return asset_response(page, request) if page else None
+    path = PUBLIC_DIR / name
+    return FileResponse(str(path)) if path.exists() else None
 
 
 @app.get("/")
-async def index():
+async def index(request: Request):
     """返回前端页面"""
-    return FileResponse(str(PUBLIC_DIR / "index.html"))
+    return html_page("index.html", request) or JSONResponse(status_code=404, content={"error": "Page not found"})
 
 
 @app.get("/admin")
-async def admin_page():
+async def admin_page(request: Request):
     """返回管理员页面"""
-    admin_file = PUBLIC_DIR / "admin.html"
-    if admin_file.exists():
-        return FileResponse(str(admin_file))
+    page = html_page("admin.html", request)
+    if page is not None:
+        return page
     return JSONResponse(
         status_code=404,
         content={"error": "Admin page not found"}
@@ -609,3 +1000,11 @@ async def admin_page():
 async def health():
     """健康检查"""
     return {"status": "ok", "version": "2.0.0"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    """运行指标（Prometheus 文本格式，汇总所有 worker）"""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics disabled")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
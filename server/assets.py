@@ -0,0 +1,198 @@
+"""
+静态资源流水线
+
+启动时一次性处理 public/ 下的文件并常驻内存：
+- main.js / styles.css 生成带内容哈希的文件名（如 main.3f2a9c1b7d.js），以
+  Cache-Control: immutable 长期缓存，内容变化即换新 URL；
+- index.html / admin.html 中的资源 URL 改写为带哈希的文件名，HTML 本身每次协商缓存（ETag）；
+- 每个文件预先生成 gzip（以及安装了 brotli 时的 br）压缩版本，按 Accept-Encoding 选择；
+- 指定输出目录时把带哈希的文件与 .gz / .br 写到磁盘，供 Nginx gzip_static / CDN 直接使用。
+
+原文件名（/assets/main.js）仍可访问，使用短缓存，兼容已缓存的旧 HTML。
+"""
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Optional
+
+from fastapi import Request, Response
+
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖，未安装时只生成 gzip
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# 生成带哈希文件名的资源
+FINGERPRINTED = ("main.js", "styles.css")
+
+# 需要改写资源 URL 的 HTML 页面
+HTML_SHELLS = ("index.html", "admin.html")
+
+# 小于该字节数的文件不压缩（压缩收益抵不过头部开销）
+COMPRESS_MIN_SIZE = 512
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+SHORT_CACHE = "public, max-age=300"
+REVALIDATE = "no-cache"
+
+# 按优先级排列的编码
+ENCODINGS = ("br", "gzip")
+SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+
+@dataclass
+class Asset:
+    """内存中的资源：原始内容与各压缩版本"""
+    content_type: str
+    etag: str
+    cache_control: str
+    variants: Dict[str, bytes] = field(default_factory=dict)  # 编码 -> 内容，identity 为原始内容
+
+    def select(self, accept_encoding: Optional[str]) -> str:
+        """按 Accept-Encoding 选择编码（忽略 q=0 的编码）"""
+        accepted = set()
+        for part in (accept_encoding or "").lower().split(","):
+            coding, _, params = part.partition(";")
+            params = params.strip()
+            try:
+                q = float(params[2:]) if params.startswith("q=") else 1.0
+            except ValueError:
+                q = 1.0
+            if q > 0:
+                accepted.add(coding.strip())
+        for encoding in ENCODINGS:
+            if encoding in self.variants and (encoding in accepted or "*" in accepted):
+                return encoding
+        return "identity"
+
+
+def compress(data: bytes) -> Dict[str, bytes]:
+    """生成压缩版本（只保留比原文件小的）"""
+    variants = {"identity": data}
+    if len(data) < COMPRESS_MIN_SIZE:
+        return variants
+    candidates = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        candidates["br"] = brotli.compress(data, quality=11)
+    for encoding, body in candidates.items():
+        if len(body) < len(data):
+            variants[encoding] = body
+    return variants
+
+
+def fingerprint_name(name: str, data: bytes) -> str:
+    """main.js -> main.<哈希>.js"""
+    digest = hashlib.sha256(data).hexdigest()[:10]
+    stem, dot, suffix = name.rpartition(".")
+    return f"{stem}.{digest}.{suffix}" if dot else f"{name}.{digest}"
+
+
+def _etag(data: bytes) -> str:
+    return '"' + hashlib.sha1(data).hexdigest() + '"'
+
+
+def _content_type(name: str) -> str:
+    content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    # text/* 由 Starlette 补充 charset
+    if content_type in ("application/javascript", "application/json"):
+        content_type += "; charset=utf-8"
+    return content_type
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    """写入临时文件后替换（多 worker 同时启动时不会读到写了一半的文件）"""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        # mkstemp 创建的文件为 0600，改为 0644，供 Nginx 等其他用户读取
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class AssetPipeline:
+    """处理后的静态资源"""
+
+    def __init__(self, public_dir: Path, output_dir: Optional[Path] = None):
+        """
+        Args:
+            public_dir: 源目录（public/）
+            output_dir: 输出目录（None 表示只保存在内存）
+        """
+        self.public_dir = Path(public_dir)
+        self.output_dir = Path(output_dir) if output_dir else None
+        self.assets: Dict[str, Asset] = {}  # /assets/ 下的文件名 -> 资源
+        self.pages: Dict[str, Asset] = {}  # HTML 页面
+        self.urls: Dict[str, str] = {}  # 原文件名 -> 带哈希的 URL
+
+    def build(self) -> "AssetPipeline":
+        """读取、指纹化、改写 HTML、压缩，并写出到输出目录"""
+        files = {
+            path.relative_to(self.public_dir).as_posix(): path.read_bytes()
+            for path in sorted(self.public_dir.rglob("*")) if path.is_file()
+        }
+
+        for name, data in files.items():
+            if name in FINGERPRINTED:
+                hashed = fingerprint_name(name, data)
+                self.urls[name] = f"/assets/{hashed}"
+                self._add(hashed, data, IMMUTABLE)
+            self._add(name, data, SHORT_CACHE)
+
+        for name in HTML_SHELLS:
+            if name in files:
+                html = files[name].decode("utf-8")
+                for original, url in self.urls.items():
+                    html = html.replace(f"/assets/{original}", url)
+                data = html.encode("utf-8")
+                self.pages[name] = Asset(_content_type(name), _etag(data), REVALIDATE, compress(data))
+
+        if self.output_dir is not None:
+            self._write()
+        logger.info(
+            "Built %d assets (%s)", len(self.assets),
+            ", ".join(f"{name} -> {url}" for name, url in self.urls.items())
+        )
+        return self
+
+    def _add(self, name: str, data: bytes, cache_control: str) -> None:
+        self.assets[name] = Asset(_content_type(name), _etag(data), cache_control, compress(data))
+
+    def _write(self) -> None:
+        """写出带哈希的资源及其压缩版本（已存在的同名文件内容必然相同，跳过）"""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        for url in self.urls.values():
+            name = url.rsplit("/", 1)[-1]
+            for encoding, body in self.assets[name].variants.items():
+                path = self.output_dir / (name + SUFFIXES.get(encoding, ""))
+                if not path.exists():
+                    _write_atomic(path, body)
+
+    def get(self, name: str) -> Optional[Asset]:
+        return self.assets.get(name)
+
+
+def asset_response(asset: Asset, request: Request) -> Response:
+    """按 Accept-Encoding 返回资源（If-None-Match 命中时返回 304）"""
+    encoding = asset.select(request.headers.get("accept-encoding"))
+    # 各编码内容不同，强 ETag 需按编码区分
+    etag = asset.etag if encoding == "identity" else f'{asset.etag[:-1]}-{encoding}"'
+    headers = {"Cache-Control": asset.cache_control, "ETag": etag, "Vary": "Accept-Encoding"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(asset.variants[encoding], media_type=asset.content_type, headers=headers)
@@ -0,0 +1,96 @@
+"""
+进程内排行榜缓存
+
+缓存已评分、已排序的 /api/entries 结果，以数据版本号为键：
+写操作（投票、点赞、审核、提交、重新加载）调用 invalidate() 使版本号递增。
+由于 calculate_score 依赖 date.today()，缓存在本地午夜强制过期；
+多 worker 部署时各进程缓存互不可见，另设短 TTL 兜底其他进程的写入。
+
+缓存项同时保存编码后的 JSON 字节，命中时直接返回，无需再次序列化。
+"""
+import hashlib
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from server.fastjson import dumps
+
+
+@dataclass
+class CachedLeaderboard:
+    """缓存项"""
+    version: int
+    data: Any
+    body: bytes  # data 编码后的 JSON
+    etag: str
+    expires_at: float
+
+
+def seconds_until_midnight(now: Optional[datetime] = None) -> float:
+    """距本地下一个午夜的秒数"""
+    now = now or datetime.now()
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    return (midnight - now).total_seconds()
+
+
+def compute_etag(body: bytes) -> str:
+    """根据编码后的响应内容生成强 ETag（编码确定，各 worker 对相同内容给出相同 ETag）"""
+    return '"' + hashlib.sha1(body).hexdigest() + '"'
+
+
+class LeaderboardCache:
+    """带版本号的单值缓存"""
+
+    def __init__(self, ttl: float):
+        """
+        Args:
+            ttl: 最长缓存秒数（<= 0 表示禁用缓存）
+        """
+        self.ttl = ttl
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self._item: Optional[CachedLeaderboard] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def invalidate(self) -> None:
+        """数据已变更：递增版本号，旧缓存随即失效"""
+        self.version += 1
+        self._item = None
+
+    def get(self) -> Optional[CachedLeaderboard]:
+        """返回仍有效的缓存项，否则 None"""
+        item = self._item
+        if item is None or item.version != self.version or time.time() >= item.expires_at:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return item
+
+    def set(self, data: Any, version: int) -> CachedLeaderboard:
+        """
+        写入缓存
+
+        Args:
+            data: 已评分、已排序的条目列表
+            version: 开始构建时读取的版本号（构建期间若有写入，则该结果不会被命中）
+
+        Returns:
+            缓存项（禁用缓存时也返回，供返回编码结果与 ETag）
+        """
+        ttl = min(self.ttl, seconds_until_midnight()) if self.enabled else 0
+        body = dumps(data)
+        item = CachedLeaderboard(
+            version=version,
+            data=data,
+            body=body,
+            etag=compute_etag(body),
+            expires_at=time.time() + ttl
+        )
+        if self.enabled:
+            self._item = item
+        return item
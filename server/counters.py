@@ -0,0 +1,102 @@
+"""
+投票数 / 点赞数计数字段维护
+
+entries.vote_count / like_count 在 /api/vote、/api/like 的事务内增减，
+本模块负责从 votes / likes 原始表重建它们（回填或纠偏）；
+已压缩的投票从 vote_daily_totals 汇总表计入（见 server/rollup.py）。
+"""
+from typing import Callable, Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from server.models import Entry, Vote, Like
+from server.rollup import rolled_up_votes
+
+
+def increment_counter(entry_id: str, column, delta: int = 1):
+    """
+    构造原子增减条目计数的语句（UPDATE ... SET col = col + delta）
+
+    与插入 / 删除 Vote、Like 的语句在同一事务内执行。
+
+    Args:
+        entry_id: 条目 ID
+        column: Entry.vote_count 或 Entry.like_count
+        delta: 增量（可为负）
+
+    Returns:
+        Update 语句
+    """
+    return (
+        update(Entry)
+        .where(Entry.id == entry_id)
+        .values({column: column + delta})
+    )
+
+
+def _grouped_counts(db: Session, model, entry_ids: list) -> dict:
+    """统计一批条目在原始表中的行数"""
+    rows = db.execute(
+        select(model.entry_id, func.count(model.id))
+        .where(model.entry_id.in_(entry_ids))
+        .group_by(model.entry_id)
+    ).all()
+    return {entry_id: count for entry_id, count in rows}
+
+
+def reconcile_counts(
+    db: Session,
+    chunk_size: int = 500,
+    progress: Optional[Callable[[int, int], None]] = None
+) -> dict:
+    """
+    按 entry_id 分块，从 votes（含汇总表）/ likes 表重建所有条目的计数字段
+
+    每块独立提交，避免长事务锁表；可重复执行。
+
+    Args:
+        db: 数据库会话
+        chunk_size: 每块条目数
+        progress: 进度回调 (已处理条目数, 本块修正数)
+
+    Returns:
+        {'entries': 处理条目数, 'fixed': 修正条目数}
+    """
+    processed = 0
+    fixed = 0
+    last_id = None
+
+    while True:
+        query = select(Entry.id, Entry.vote_count, Entry.like_count).order_by(Entry.id).limit(chunk_size)
+        if last_id is not None:
+            query = query.where(Entry.id > last_id)
+        chunk = db.execute(query).all()
+        if not chunk:
+            break
+
+        entry_ids = [row.id for row in chunk]
+        vote_counts = _grouped_counts(db, Vote, entry_ids)
+        for entry_id, count in rolled_up_votes(db, entry_ids).items():
+            vote_counts[entry_id] = vote_counts.get(entry_id, 0) + count
+        like_counts = _grouped_counts(db, Like, entry_ids)
+
+        chunk_fixed = 0
+        for row in chunk:
+            votes = vote_counts.get(row.id, 0)
+            likes = like_counts.get(row.id, 0)
+            if row.vote_count != votes or row.like_count != likes:
+                db.query(Entry).filter(Entry.id == row.id).update(
+                    {Entry.vote_count: votes, Entry.like_count: likes},
+                    synchronize_session=False
+                )
+                chunk_fixed += 1
+        db.commit()
+
+        processed += len(chunk)
+        fixed += chunk_fixed
+        last_id = entry_ids[-1]
+        if progress:
+            progress(processed, chunk_fixed)
+
+    return {'entries': processed, 'fixed': fixed}
@@ -0,0 +1,45 @@
+"""
+JSON 快速序列化
+
+大响应（完整排行榜）直接由内部数据编码为字节，跳过 FastAPI 按 response_model 的二次校验与
+jsonable_encoder 转换：安装了 orjson 时使用 orjson（C 实现），否则回退标准库 json。
+输出与 FastAPI 默认编码一致（紧凑格式、不转义非 ASCII、日期为 ISO 8601）。
+
+编码后的字节可直接缓存（见 server/cache.py），命中缓存时无需再次序列化。
+"""
+import json
+from datetime import date, datetime
+from typing import Any, Optional
+
+from fastapi import Response
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    """标准库 json 无法直接编码的类型"""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(data: Any) -> bytes:
+    """编码为 UTF-8 JSON 字节"""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(
+        data, default=_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class RawJSONResponse(Response):
+    """内容为已编码 JSON 字节的响应"""
+    media_type = "application/json"
+
+
+def fast_json_response(data: Any, headers: Optional[dict] = None) -> Response:
+    """编码并返回 JSON 响应（不经过 response_model 校验，调用方需保证数据结构正确）"""
+    return RawJSONResponse(dumps(data), headers=headers)
@@ -0,0 +1,251 @@
+"""
+YAML 条目增量导入
+
+/api/reload 与 scripts/import_entries.py 共用。entry_sources 表记录每个文件的
+mtime、大小与 SHA-256：
+- mtime 与大小都未变的文件直接跳过（不读取）；
+- 读取后内容哈希未变的文件只更新清单；
+- 新增或内容变化的文件批量解析（见 server/yaml_loader.py）后，通过批量 upsert 写入 entries；
+- 清单中有、目录中已删除的文件仅报告（不删除条目）。
+"""
+import hashlib
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from sqlalchemy import case, delete, select
+from sqlalchemy.orm import Session
+
+from server.models import Entry, EntrySource, ApprovalStatus, dialect_insert
+from server.yaml_loader import parse_documents
+
+# 条目文件扩展名
+ENTRY_PATTERNS = ("*.yml", "*.yaml")
+
+# 必填字段
+REQUIRED_FIELDS = ('id', 'title', 'owner', 'repo_url', 'summary')
+
+# 单条 upsert 语句的行数
+UPSERT_CHUNK = 200
+
+
+@dataclass
+class ImportReport:
+    """导入结果"""
+    scanned: int = 0
+    unchanged: int = 0
+    new: List[str] = field(default_factory=list)       # 新增条目 ID
+    updated: List[str] = field(default_factory=list)   # 更新条目 ID
+    removed: List[str] = field(default_factory=list)   # 已删除的文件
+    errors: List[str] = field(default_factory=list)
+    warnings: List[str] = field(default_factory=list)
+
+    @property
+    def count(self) -> int:
+        """写入的条目数"""
+        return len(self.new) + len(self.updated)
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "scanned": self.scanned,
+            "unchanged": self.unchanged,
+            "new": self.new,
+            "updated": self.updated,
+            "removed": self.removed,
+            "errors": self.errors,
+            "warnings": self.warnings,
+        }
+
+
+def default_data_dir() -> Path:
+    """条目目录（支持本地和 Docker）"""
+    return Path("/app/data/entries") if Path("/app/data/entries").exists() else Path("data/entries")
+
+
+def list_entry_files(data_dir: Path) -> List[Path]:
+    """列出目录中的条目文件（按文件名排序）"""
+    files = {path for pattern in ENTRY_PATTERNS for path in data_dir.glob(pattern)}
+    return sorted(files, key=lambda p: p.name)
+
+
+def entry_row(data: dict, warnings: Optional[List[str]] = None, source: str = "") -> dict:
+    """
+    将 YAML 数据转换为 entries 表的行
+
+    Raises:
+        ValueError: 缺少必填字段或日期格式错误
+    """
+    if not isinstance(data, dict):
+        raise ValueError("not a mapping")
+
+    missing = [name for name in REQUIRED_FIELDS if name not in data]
+    if missing:
+        raise ValueError(f"缺少字段: {', '.join(missing)}")
+
+    # 处理日期
+    last_commit = data.get('last_commit')
+    if isinstance(last_commit, str):
+        last_commit = datetime.strptime(last_commit, '%Y-%m-%d').date()
+    elif last_commit is None:
+        # 默认 30 天前
+        last_commit = (datetime.now() - timedelta(days=30)).date()
+        if warnings is not None:
+            warnings.append(f"{source} 未指定 last_commit，使用默认值: {last_commit}")
+
+    # 处理标签
+    tags_str = ','.join(data['tags']) if data.get('tags') else None
+
+    return {
+        "id": str(data['id']),
+        "title": data['title'],
+        "owner": data['owner'],
+        "repo_url": data['repo_url'],
+        "last_commit": last_commit,
+        "summary": data['summary'],
+        "tags": tags_str,
+    }
+
+
+def upsert_entries(db: Session, rows: List[dict]) -> None:
+    """
+    批量 upsert 条目（YAML 导入的条目自动批准；已拒绝的条目保持拒绝）
+
+    Args:
+        db: 数据库会话
+        rows: entry_row 的返回值（ID 不可重复）
+    """
+    dialect_name = db.get_bind().dialect.name
+    for start in range(0, len(rows), UPSERT_CHUNK):
+        chunk = [dict(row, status=ApprovalStatus.APPROVED) for row in rows[start:start + UPSERT_CHUNK]]
+        stmt = dialect_insert(dialect_name, Entry).values(chunk)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=['id'],
+            set_={
+                "title": stmt.excluded.title,
+                "owner": stmt.excluded.owner,
+                "repo_url": stmt.excluded.repo_url,
+                "last_commit": stmt.excluded.last_commit,
+                "summary": stmt.excluded.summary,
+                "tags": stmt.excluded.tags,
+                "status": case(
+                    (Entry.status == ApprovalStatus.PENDING, stmt.excluded.status),
+                    else_=Entry.status
+                ),
+            }
+        ))
+
+
+def _upsert_manifest(db: Session, records: List[dict]) -> None:
+    """批量写入文件清单"""
+    dialect_name = db.get_bind().dialect.name
+    for start in range(0, len(records), UPSERT_CHUNK):
+        stmt = dialect_insert(dialect_name, EntrySource).values(records[start:start + UPSERT_CHUNK])
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=['path'],
+            set_={
+                "mtime": stmt.excluded.mtime,
+                "size": stmt.excluded.size,
+                "sha256": stmt.excluded.sha256,
+                "entry_id": stmt.excluded.entry_id,
+                "imported_at": stmt.excluded.imported_at,
+            }
+        ))
+
+
+def import_directory(
+    db: Session,
+    data_dir: Optional[Path] = None,
+    full: bool = False,
+    workers: int = 0
+) -> ImportReport:
+    """
+    增量导入目录中的 YAML 条目（单个事务提交）
+
+    Args:
+        db: 数据库会话
+        data_dir: 条目目录（默认 default_data_dir()）
+        full: 忽略清单，重新解析所有文件
+        workers: YAML 解析进程数（0 = CPU 核数，1 = 串行）
+
+    Returns:
+        导入结果
+
+    Raises:
+        FileNotFoundError: 目录不存在
+    """
+    data_dir = data_dir or default_data_dir()
+    if not data_dir.exists():
+        raise FileNotFoundError(f"Data directory not found: {data_dir}")
+
+    report = ImportReport()
+    manifest: Dict[str, EntrySource] = {
+        source.path: source for source in db.execute(select(EntrySource)).scalars()
+    }
+
+    files = list_entry_files(data_dir)
+    report.scanned = len(files)
+    report.removed = sorted(set(manifest) - {path.name for path in files})
+
+    now = datetime.utcnow()
+    records: List[dict] = []      # 需要写入的清单
+    parsed: Dict[str, dict] = {}  # 条目 ID -> 行
+    sources: Dict[str, str] = {}  # 条目 ID -> 文件名
+
+    pending = []  # (文件名, 原始字节, 清单记录)：新增或内容变化的文件
+    for path in files:
+        stat = path.stat()
+        known = manifest.get(path.name)
+        if not full and known and known.mtime == stat.st_mtime and known.size == stat.st_size:
+            report.unchanged += 1
+            continue
+
+        raw = path.read_bytes()
+        digest = hashlib.sha256(raw).hexdigest()
+        record = {"path": path.name, "mtime": stat.st_mtime, "size": stat.st_size,
+                  "sha256": digest, "entry_id": known.entry_id if known else None, "imported_at": now}
+
+        if not full and known and known.sha256 == digest:
+            # 仅元数据变化（如 touch / git checkout）
+            report.unchanged += 1
+            records.append(record)
+            continue
+        pending.append((path.name, raw, record))
+
+    documents = parse_documents([(name, raw) for name, raw, _ in pending], workers=workers)
+    for (name, _, record), doc in zip(pending, documents):
+        if not doc.ok:
+            # 不写清单，修复后下次重新解析
+            report.errors.append(f"{name}: {doc.error}")
+            continue
+        if not doc.data:
+            report.warnings.append(f"跳过空文件: {name}")
+            continue
+        try:
+            row = entry_row(doc.data, report.warnings, name)
+        except (ValueError, TypeError) as e:
+            report.errors.append(f"{name}: {e}")
+            continue
+
+        if row['id'] in parsed:
+            report.errors.append(f"{name}: 条目 ID 与 {sources[row['id']]} 重复: {row['id']}")
+            continue
+        parsed[row['id']] = row
+        sources[row['id']] = name
+        record["entry_id"] = row['id']
+        records.append(record)
+
+    if parsed:
+        existing = set(db.execute(select(Entry.id).where(Entry.id.in_(list(parsed)))).scalars())
+        for entry_id in parsed:
+            (report.updated if entry_id in existing else report.new).append(entry_id)
+        upsert_entries(db, list(parsed.values()))
+
+    if records:
+        _upsert_manifest(db, records)
+    if report.removed:
+        db.execute(delete(EntrySource).where(EntrySource.path.in_(report.removed)))
+
+    db.commit()
+    return report
@@ -0,0 +1,354 @@
+"""
+后台任务（部署、重新加载等耗时操作）
+
+请求处理器只负责入队并立即返回任务 ID，任务在事件循环之外执行：
+外部命令使用 asyncio 子进程（逐行采集输出，见 run_command），
+同步函数由调用方通过 asyncio.to_thread 放到线程池执行。
+任务状态、进度与输出可通过 /api/jobs/{id} 查询。
+
+相同 key 的任务串行执行；已有同 key 任务在排队时，新的提交合并到该任务
+（例如部署进行中连续推送多次，只会再部署一次，且拉取的是最新代码）。
+
+多 worker 部署时指定共享目录（JOBS_DIR）：
+- 任务状态定期写入 <目录>/<任务 ID>.json，查询落到其他 worker 时从文件读取
+  （进度与输出最多延迟一个刷新周期；所属进程已退出的未结束任务视为失败）；
+- 同 key 任务另外持有 <目录>/<key>.lock 文件锁，跨进程串行（合并只在进程内进行）。
+"""
+import asyncio
+import enum
+import itertools
+import json
+import logging
+import os
+import secrets
+import time
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows 上没有 fcntl，只做进程内串行
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# 等待其他进程释放文件锁时的轮询间隔（秒）
+LOCK_POLL_INTERVAL = 0.5
+
+# 共享目录中已结束任务文件的保留时间（秒）
+FILE_RETENTION = 7 * 86400
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobStatus(str, enum.Enum):
+    """任务状态"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class Job:
+    """单个后台任务"""
+
+    def __init__(self, job_id: str, kind: str, key: Optional[str], max_output_lines: int):
+        self.id = job_id
+        self.kind = kind
+        self.key = key
+        self.status = JobStatus.QUEUED
+        self.progress: Optional[str] = None
+        self.output: deque = deque(maxlen=max_output_lines)
+        self.return_code: Optional[int] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.params: Dict[str, Any] = {}  # 任务参数（合并提交时可由调用方更新）
+        self.coalesced = 0  # 合并到本任务的重复提交次数
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JobStatus.SUCCEEDED, JobStatus.FAILED)
+
+    def log(self, line: str) -> None:
+        """追加一行输出（超过上限时丢弃最早的行）"""
+        self.output.append(line)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status.value,
+            "params": self.params,
+            "progress": self.progress,
+            "return_code": self.return_code,
+            "result": self.result,
+            "error": self.error,
+            "coalesced": self.coalesced,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "output": "\n".join(self.output),
+        }
+
+
+class JobRunner:
+    """任务队列（进程内执行，可选通过共享目录跨进程查询与串行）"""
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        max_history: int = 100,
+        max_output_lines: int = 2000,
+        flush_interval: float = 1.0
+    ):
+        """
+        Args:
+            directory: 共享目录（None 表示任务状态只保存在进程内）
+            max_history: 保留的已结束任务数
+            max_output_lines: 每个任务保留的输出行数
+            flush_interval: 运行中任务写入共享目录的间隔（秒）
+        """
+        self.directory = Path(directory) if directory else None
+        self.max_history = max_history
+        self.max_output_lines = max_output_lines
+        self.flush_interval = flush_interval
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._ids = itertools.count(1)
+        # pid 可能在重启后复用，加随机后缀避免与共享目录中的旧任务重名
+        self._prefix = f"{os.getpid():x}-{secrets.token_hex(2)}"
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+    # ==================== 提交与查询 ====================
+
+    def submit(
+        self,
+        kind: str,
+        func: Callable[[Job], Awaitable[Any]],
+        key: Optional[str] = None
+    ) -> Tuple[Job, bool]:
+        """
+        提交任务
+
+        Args:
+            kind: 任务类型（如 "deploy"、"reload"）
+            func: 异步任务函数，参数为 Job，返回值写入 job.result
+            key: 串行 / 合并键（None 表示不限制）
+
+        Returns:
+            (任务, 是否新建)；合并到已排队任务时返回该任务与 False
+        """
+        if key is not None:
+            for job in self._jobs.values():
+                if job.key == key and job.status == JobStatus.QUEUED:
+                    job.coalesced += 1
+                    return job, False
+
+        job = Job(f"{self._prefix}-{next(self._ids)}", kind, key, self.max_output_lines)
+        self._jobs[job.id] = job
+        self._save(job)
+        job.task = asyncio.create_task(self._run(job, func))
+        self._prune()
+        return job, True
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """
+        查询任务（本进程没有时读取共享目录）
+
+        Returns:
+            任务信息（同 Job.to_dict()），不存在时返回 None
+        """
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        return self._load(job_id)
+
+    def _prune(self) -> None:
+        """只保留最近 max_history 个已结束任务，并清理共享目录中过期的任务文件"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.max_history)]:
+            del self._jobs[job_id]
+            self._remove(job_id)
+
+        if self.directory is None:
+            return
+        cutoff = time.time() - FILE_RETENTION
+        for path in self.directory.glob("*.json"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+            except OSError:
+                pass
+
+    # ==================== 共享目录 ====================
+
+    def _path(self, job_id: str) -> Optional[Path]:
+        # 任务 ID 只含十六进制数字与连字符，拒绝其他输入（防止路径穿越）
+        if self.directory is None or not job_id or job_id.strip("0123456789abcdef-"):
+            return None
+        return self.directory / f"{job_id}.json"
+
+    def _save(self, job: Job) -> None:
+        """把任务状态写入共享目录（先写临时文件再替换）"""
+        path = self._path(job.id)
+        if path is None:
+            return
+        data = dict(job.to_dict(), pid=os.getpid())
+        tmp = path.with_suffix(".tmp")
+        try:
+            tmp.write_text(json.dumps(data, ensure_ascii=False, default=str), encoding="utf-8")
+            os.replace(tmp, path)
+        except OSError:
+            logger.exception("Failed to write job file %s", path)
+
+    def _load(self, job_id: str) -> Optional[dict]:
+        path = self._path(job_id)
+        if path is None:
+            return None
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        pid = data.pop("pid", None)
+        if data["status"] in (JobStatus.QUEUED.value, JobStatus.RUNNING.value) and pid and not _pid_alive(pid):
+            data["status"] = JobStatus.FAILED.value
+            data["error"] = "Worker exited before the job finished"
+        return data
+
+    def _remove(self, job_id: str) -> None:
+        path = self._path(job_id)
+        if path is not None:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    async def _save_periodically(self, job: Job) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self._save(job)
+
+    async def _lock_file(self, key: str) -> Optional[int]:
+        """
+        获取跨进程文件锁（等待期间可取消）
+
+        Returns:
+            文件描述符（未启用共享目录时返回 None）
+        """
+        if self.directory is None or fcntl is None:
+            return None
+        fd = os.open(self.directory / f"{key}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    return fd
+                except BlockingIOError:
+                    await asyncio.sleep(LOCK_POLL_INTERVAL)
+        except BaseException:
+            os.close(fd)
+            raise
+
+    # ==================== 执行 ====================
+
+    async def _run(self, job: Job, func: Callable[[Job], Awaitable[Any]]) -> None:
+        lock = self._locks.setdefault(job.key, asyncio.Lock()) if job.key is not None else None
+        acquired = False
+        lock_fd = None
+        saver = None
+        try:
+            if lock is not None:
+                await lock.acquire()
+                acquired = True
+                # 进程内排到后再与其他进程的同 key 任务串行
+                lock_fd = await self._lock_file(job.key)
+            job.status = JobStatus.RUNNING
+            job.started_at = time.time()
+            self._save(job)
+            if self.directory is not None:
+                saver = asyncio.create_task(self._save_periodically(job))
+            job.result = await func(job)
+            job.status = JobStatus.FAILED if job.return_code else JobStatus.SUCCEEDED
+        except asyncio.CancelledError:
+            job.status = JobStatus.FAILED
+            job.error = "Cancelled"
+            raise
+        except Exception as e:
+            logger.exception("Job %s (%s) failed", job.id, job.kind)
+            job.status = JobStatus.FAILED
+            job.error = str(e) or type(e).__name__
+        finally:
+            job.finished_at = time.time()
+            if saver is not None:
+                saver.cancel()
+            self._save(job)
+            if lock_fd is not None:
+                os.close(lock_fd)  # 关闭即释放 flock
+            if acquired:
+                lock.release()
+
+    async def stop(self) -> None:
+        """取消未结束的任务（应用关闭时调用）"""
+        tasks = [job.task for job in self._jobs.values() if job.task and not job.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def run_command(job: Job, args: Sequence[str], timeout: float) -> int:
+    """
+    以 asyncio 子进程执行外部命令，逐行采集输出（stderr 合并到 stdout）
+
+    Args:
+        job: 当前任务（输出写入 job.output，退出码写入 job.return_code）
+        args: 命令及参数
+        timeout: 超时秒数，超时后终止进程
+
+    Returns:
+        退出码
+
+    Raises:
+        TimeoutError: 超时（进程已被终止）
+    """
+    proc = await asyncio.create_subprocess_exec(
+        *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT
+    )
+
+    async def pump():
+        async for raw in proc.stdout:
+            line = raw.decode("utf-8", errors="replace").rstrip("\n")
+            job.log(line)
+            if line.strip():
+                job.progress = line.strip()
+        await proc.wait()
+
+    try:
+        await asyncio.wait_for(pump(), timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        raise TimeoutError(f"Command timed out after {timeout:g}s")
+    except asyncio.CancelledError:
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+        raise
+    job.return_code = proc.returncode
+    return proc.returncode
+
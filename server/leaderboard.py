@@ -0,0 +1,261 @@
+"""
+排行榜查询
+
+已批准条目的评分与排名读取 leaderboard_snapshot 快照（见 server/snapshot.py），
+投票数、点赞数读取 entries 上的计数字段，整个排行榜为一次带索引排序的查询；
+并提供基于游标（keyset）的分页、排序与筛选。
+"""
+import base64
+import json
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, literal, or_
+from sqlalchemy.orm import Session
+
+from server.models import Entry, LeaderboardSnapshot, ApprovalStatus
+from server.scoring import score_many
+from server.snapshot import ensure_snapshot
+
+# 排序字段 -> 响应字典中的键
+SORT_KEYS = ('score', 'votes', 'likes', 'last_commit', 'submitted_at')
+
+# 排序字段 -> 数据库列
+SORT_COLUMNS = {
+    'score': LeaderboardSnapshot.score,
+    'votes': Entry.vote_count,
+    'likes': Entry.like_count,
+    'last_commit': Entry.last_commit,
+    'submitted_at': Entry.submitted_at,
+}
+
+
+class InvalidCursor(ValueError):
+    """分页游标无法解析"""
+
+
+@dataclass
+class EntryQuery:
+    """/api/entries 查询参数"""
+    sort: str = 'score'
+    order: str = 'desc'
+    limit: Optional[int] = None
+    after: Optional[str] = None
+    tag: Optional[str] = None
+    owner: Optional[str] = None
+    min_score: Optional[int] = None
+    max_score: Optional[int] = None
+    include_pending: bool = False
+
+    @property
+    def is_default(self) -> bool:
+        """是否为前端默认请求（完整的已批准排行榜），可直接使用缓存"""
+        return (
+            self.sort == 'score' and self.order == 'desc'
+            and self.limit is None and self.after is None
+            and not self.has_filters and not self.include_pending
+        )
+
+    @property
+    def has_filters(self) -> bool:
+        return any(v is not None for v in (self.tag, self.owner, self.min_score, self.max_score))
+
+    @property
+    def statuses(self) -> List[ApprovalStatus]:
+        if self.include_pending:
+            return [ApprovalStatus.APPROVED, ApprovalStatus.PENDING]
+        return [ApprovalStatus.APPROVED]
+
+
+def entry_response(entry: Entry, days_stale: int, score: int) -> dict:
+    """组装单个条目的 API 响应"""
+    return {
+        "id": entry.id,
+        "title": entry.title,
+        "owner": entry.owner,
+        "repo_url": entry.repo_url,
+        "last_commit": entry.last_commit,
+        "summary": entry.summary,
+        "tags": entry.tags,
+        "status": entry.status.value,
+        "days_stale": days_stale,
+        "votes": entry.vote_count,
+        "likes": entry.like_count,
+        "score": score,
+        "submitted_at": entry.submitted_at
+    }
+
+
+def build_entry_responses(entries: Sequence[Entry], as_of: Optional[date] = None) -> List[dict]:
+    """
+    批量组装条目 API 响应并实时评分（用于不在快照中的条目，如待审核条目）
+
+    Args:
+        entries: 条目列表
+        as_of: 评分基准日期（默认今天）
+
+    Returns:
+        与 EntryResponse 对应的字典列表
+    """
+    scores = score_many(
+        [entry.vote_count for entry in entries],
+        [entry.last_commit for entry in entries],
+        as_of=as_of
+    )
+    return [
+        entry_response(entry, days_stale, total_score)
+        for entry, days_stale, total_score in zip(entries, scores['days_stale'], scores['total_score'])
+    ]
+
+
+def sort_entries(items: List[dict], sort: str = 'score', order: str = 'desc') -> List[dict]:
+    """按指定字段排序，相同值按 id 升序（保证分页顺序稳定）"""
+    items = sorted(items, key=lambda x: x['id'])
+    items.sort(key=lambda x: x[sort], reverse=(order == 'desc'))
+    return items
+
+
+def build_leaderboard(db: Session) -> List[dict]:
+    """
+    构建按烂尾指数降序排列的完整排行榜
+
+    Args:
+        db: 数据库会话
+
+    Returns:
+        条目响应字典列表
+    """
+    items, _ = _page_ranked(db, EntryQuery())
+    return items
+
+
+# ==================== 分页游标 ====================
+
+def encode_cursor(value, entry_id: str) -> str:
+    """将 (排序值, 条目 ID) 编码为不透明游标"""
+    if isinstance(value, (date, datetime)):
+        value = value.isoformat()
+    raw = json.dumps([value, entry_id], ensure_ascii=False, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, sort: str) -> Tuple[object, str]:
+    """
+    解析游标
+
+    Raises:
+        InvalidCursor: 游标格式错误
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value, entry_id = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        if sort == 'last_commit':
+            value = date.fromisoformat(value)
+        elif sort == 'submitted_at':
+            value = datetime.fromisoformat(value)
+        else:
+            value = int(value)
+        return value, str(entry_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+
+
+def _after_cursor(value, cursor_value, entry_id: str, cursor_id: str, order: str) -> bool:
+    """判断某条目是否位于游标之后（与 sort_entries 的顺序一致）"""
+    if value == cursor_value:
+        return entry_id > cursor_id
+    return value < cursor_value if order == 'desc' else value > cursor_value
+
+
+# ==================== 分页查询 ====================
+
+def _filter_entries(query, q: EntryQuery):
+    """应用标签、所有者筛选（数据库侧）"""
+    if q.owner is not None:
+        query = query.filter(Entry.owner == q.owner)
+    if q.tag is not None:
+        # tags 为逗号分隔字符串，两端补逗号后做整词匹配
+        pattern = '%,' + q.tag.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + ',%'
+        query = query.filter((literal(',') + Entry.tags + literal(',')).like(pattern, escape='\\'))
+    return query
+
+
+def _paginate(items: List[dict], q: EntryQuery) -> Tuple[List[dict], Optional[str]]:
+    """截取一页（items 已按顺序取出 limit + 1 条），生成下一页游标"""
+    if q.limit is None or len(items) <= q.limit:
+        return items, None
+    page = items[:q.limit]
+    return page, encode_cursor(page[-1][q.sort], page[-1]['id'])
+
+
+def _page_ranked(db: Session, q: EntryQuery) -> Tuple[List[dict], Optional[str]]:
+    """已批准条目：关联快照，筛选、排序、keyset 条件与 LIMIT 全部在数据库完成"""
+    ensure_snapshot(db)
+
+    column = SORT_COLUMNS[q.sort]
+    query = _filter_entries(
+        db.query(Entry, LeaderboardSnapshot.days_stale, LeaderboardSnapshot.score)
+        .join(LeaderboardSnapshot, LeaderboardSnapshot.entry_id == Entry.id)
+        .filter(Entry.status == ApprovalStatus.APPROVED),
+        q
+    )
+    if q.min_score is not None:
+        query = query.filter(LeaderboardSnapshot.score >= q.min_score)
+    if q.max_score is not None:
+        query = query.filter(LeaderboardSnapshot.score <= q.max_score)
+
+    if q.after:
+        cursor_value, cursor_id = decode_cursor(q.after, q.sort)
+        beyond = column < cursor_value if q.order == 'desc' else column > cursor_value
+        query = query.filter(or_(beyond, and_(column == cursor_value, Entry.id > cursor_id)))
+
+    query = query.order_by(column.desc() if q.order == 'desc' else column.asc(), Entry.id.asc())
+    if q.limit is not None:
+        query = query.limit(q.limit + 1)
+
+    items = [entry_response(entry, days_stale, score) for entry, days_stale, score in query.all()]
+    return _paginate(items, q)
+
+
+def _page_with_pending(db: Session, q: EntryQuery) -> Tuple[List[dict], Optional[str]]:
+    """包含待审核条目（管理员，不在快照中）：数据库筛选后于内存评分、排序与分页"""
+    entries = _filter_entries(db.query(Entry).filter(Entry.status.in_(q.statuses)), q).all()
+    items = build_entry_responses(entries)
+
+    if q.min_score is not None:
+        items = [x for x in items if x['score'] >= q.min_score]
+    if q.max_score is not None:
+        items = [x for x in items if x['score'] <= q.max_score]
+
+    items = sort_entries(items, q.sort, q.order)
+
+    if q.after:
+        cursor_value, cursor_id = decode_cursor(q.after, q.sort)
+        items = [
+            x for x in items
+            if _after_cursor(x[q.sort], cursor_value, x['id'], cursor_id, q.order)
+        ]
+    return _paginate(items, q)
+
+
+def query_entries(db: Session, q: EntryQuery) -> Tuple[List[dict], Optional[str]]:
+    """
+    分页查询条目
+
+    已批准条目的所有排序与筛选都在数据库完成（分数来自快照）；
+    仅 include_pending 时在内存中评分排序。
+
+    Args:
+        db: 数据库会话
+        q: 查询参数
+
+    Returns:
+        (当前页条目, 下一页游标；没有更多时为 None)
+
+    Raises:
+        InvalidCursor: 游标格式错误
+    """
+    if q.include_pending:
+        return _page_with_pending(db, q)
+    return _page_ranked(db, q)
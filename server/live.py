@@ -0,0 +1,153 @@
+"""
+实时分数推送（Server-Sent Events）
+
+投票、点赞、审核后调用 publish() 登记条目的最新数值（绝对值而非增量，
+因此可以任意合并）。后台任务每 interval 秒把这段时间内的变更合并为
+一条消息分发给所有订阅者，突发流量下每个客户端每个周期至多收到一条消息。
+
+慢速客户端不会让服务端无限堆积：每个订阅者只保留「条目 -> 最新数值」，
+积压的条目数超过上限时改发 reset 事件，由客户端重新拉取完整列表。
+
+推送范围为本进程处理的写入；多 worker 部署时，其他进程的变更
+仍需客户端通过 /api/entries（ETag 缓存）获取。
+
+连接不会无限期保持：每个连接最长存活 max_lifetime 秒（带随机抖动）后由服务端结束，
+EventSource 按 retry 自动重连；stop() 会立即结束所有连接。uvicorn 优雅关闭时
+先等待进行中的响应结束才执行 lifespan 关闭，长连接必须能自行结束，否则重启会一直挂起。
+"""
+import asyncio
+import json
+import random
+import time
+from typing import Dict, Optional, Set
+
+
+class _Subscriber:
+    """单个 SSE 连接的待发送变更"""
+
+    def __init__(self):
+        self.pending: Dict[str, dict] = {}
+        self.overflow = False
+        self.event = asyncio.Event()
+
+
+class LiveHub:
+    """进程内变更广播"""
+
+    def __init__(self, interval: float = 1.0, heartbeat: float = 15.0,
+                 max_clients: int = 1000, max_pending: int = 500, max_lifetime: float = 300.0):
+        """
+        Args:
+            interval: 合并周期（秒）
+            heartbeat: 无变更时发送心跳注释的间隔（秒），防止代理断开空闲连接
+            max_clients: 最大连接数
+            max_pending: 单个客户端积压条目上限，超过后改发 reset
+            max_lifetime: 单个连接最长存活时间（秒），到期后结束响应由客户端重连
+        """
+        self.interval = interval
+        self.heartbeat = heartbeat
+        self.max_clients = max_clients
+        self.max_pending = max_pending
+        self.max_lifetime = max_lifetime
+        self._pending: Dict[str, dict] = {}
+        self._subscribers: Set[_Subscriber] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    @property
+    def client_count(self) -> int:
+        return len(self._subscribers)
+
+    @property
+    def full(self) -> bool:
+        return len(self._subscribers) >= self.max_clients
+
+    # ==================== 生命周期 ====================
+
+    async def start(self) -> None:
+        self._closing = False
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止分发并结束所有连接"""
+        self._closing = True
+        for sub in self._subscribers:
+            sub.event.set()
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    # ==================== 发布 ====================
+
+    def publish(self, entry_id: str, **fields) -> None:
+        """
+        登记条目最新数值，如 votes / likes / score / status
+
+        无订阅者时直接丢弃。
+        """
+        if not self._subscribers:
+            return
+        self._pending.setdefault(entry_id, {"id": entry_id}).update(fields)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            if not self._pending:
+                continue
+            batch, self._pending = self._pending, {}
+            for sub in self._subscribers:
+                if sub.overflow:
+                    continue
+                for entry_id, delta in batch.items():
+                    sub.pending.setdefault(entry_id, {}).update(delta)
+                if len(sub.pending) > self.max_pending:
+                    sub.pending.clear()
+                    sub.overflow = True
+                sub.event.set()
+
+    # ==================== 订阅 ====================
+
+    async def stream(self, request):
+        """
+        SSE 消息生成器（供 StreamingResponse 使用）
+
+        事件：
+        - entries：变更列表 [{id, votes?, likes?, score?, status?}, ...]
+        - reset：积压过多，客户端应重新拉取 /api/entries
+        """
+        sub = _Subscriber()
+        self._subscribers.add(sub)
+        # 随机抖动，避免同一时刻建立的连接同时重连
+        deadline = time.monotonic() + self.max_lifetime * random.uniform(0.9, 1.1)
+        try:
+            yield "retry: 5000\n\n"
+            while not self._closing and not await request.is_disconnected():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(sub.event.wait(), min(self.heartbeat, remaining))
+                except asyncio.TimeoutError:
+                    if time.monotonic() < deadline:
+                        yield ": ping\n\n"
+                    continue
+
+                sub.event.clear()
+                if self._closing:
+                    break
+                if sub.overflow:
+                    sub.overflow = False
+                    yield "event: reset\ndata: {}\n\n"
+                    continue
+
+                changes, sub.pending = list(sub.pending.values()), {}
+                data = json.dumps(changes, ensure_ascii=False, separators=(',', ':'))
+                yield f"event: entries\ndata: {data}\n\n"
+        finally:
+            self._subscribers.discard(sub)
@@ -0,0 +1,474 @@
+"""
+运行指标（/metrics，Prometheus 文本格式）
+
+- 每个路由的请求数与延迟直方图（路由模板作为标签，延迟为到响应头发出的时间）；
+- 每个请求的 SQL 语句数与数据库耗时（引擎事件 + contextvars 归属到当前请求）；
+- 连接池 checkout / 新建连接次数与当前占用、溢出；
+- 缓存命中、投票 / 点赞结果等业务计数（由调用方 inc / 采集函数提供）。
+
+多 worker 部署时，每个进程把自己的指标定期写入 METRICS_DIR 下的 <pid>.json，
+抓取时由处理请求的进程汇总目录中所有存活进程的文件：计数器与直方图求和，
+仪表（gauge）按 pid 分别输出。其他进程的数据最多延迟一个刷新周期。
+
+进程退出（正常关闭或被发现已不存活）时，其计数器与直方图并入 base.json 后再删除进程文件，
+汇总值不会因 worker 重启而回退（否则 Prometheus 的 rate() 会把它当作计数器重置）。
+"""
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+
+try:
+    import fcntl
+except ImportError:  # Windows 上没有 fcntl，并入 base.json 时不加锁
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# 已退出进程的累计值
+BASE_FILE = "base.json"
+
+# 请求延迟直方图分桶（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 单个请求 SQL 语句数分桶
+STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# 单个请求数据库耗时分桶（秒）
+DB_TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: dict) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    parts = [f'{key}="{_escape(value)}"' for key, value in labels]
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _encode(series_map: Dict[str, Dict[Labels, object]]) -> dict:
+    """{指标: {标签: 值}} -> 可 JSON 序列化的形式"""
+    return {name: [[list(map(list, k)), v] for k, v in s.items()] for name, s in series_map.items()}
+
+
+def _accumulate(snap: dict, counters: Dict[str, Dict[Labels, float]],
+                histograms: Dict[str, Dict[Labels, List[float]]]) -> None:
+    """把快照中的计数器与直方图累加到 counters / histograms"""
+    for name, series in snap.get("counters", {}).items():
+        target = counters.setdefault(name, {})
+        for labels, value in series:
+            key = tuple(map(tuple, labels))
+            target[key] = target.get(key, 0) + value
+    for name, series in snap.get("histograms", {}).items():
+        target = histograms.setdefault(name, {})
+        for labels, state in series:
+            key = tuple(map(tuple, labels))
+            if key in target and len(target[key]) == len(state):
+                target[key] = [a + b for a, b in zip(target[key], state)]
+            else:
+                target[key] = list(state)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class RequestStats:
+    """单个请求的数据库统计"""
+    __slots__ = ("statements", "db_time")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_time = 0.0
+
+
+# 当前请求的统计（由 MetricsMiddleware 设置，引擎事件读取）
+current_request: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar(
+    "current_request", default=None
+)
+
+
+class MetricsRegistry:
+    """进程内指标登记表"""
+
+    def __init__(self, directory: Optional[str] = None, flush_interval: float = 5.0):
+        """
+        Args:
+            directory: 多进程汇总目录（为空时只输出本进程指标）
+            flush_interval: 写入本进程指标文件的间隔（秒）
+        """
+        self.directory = Path(directory) if directory else None
+        self.flush_interval = flush_interval
+        self._types: Dict[str, Tuple[str, str, Tuple[float, ...]]] = {}
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, List[float]]] = {}
+        self._collectors: List[Callable[[], Iterable[Tuple[str, dict, float]]]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def pid(self) -> int:
+        # 每次读取：预加载后 fork 的 worker 与导入时的进程不同
+        return os.getpid()
+
+    # ==================== 定义与记录 ====================
+
+    def counter(self, name: str, help_text: str) -> None:
+        self._types[name] = ("counter", help_text, ())
+        self._counters.setdefault(name, {})
+
+    def gauge(self, name: str, help_text: str) -> None:
+        self._types[name] = ("gauge", help_text, ())
+
+    def histogram(self, name: str, help_text: str, buckets: Tuple[float, ...]) -> None:
+        self._types[name] = ("histogram", help_text, tuple(buckets))
+        self._histograms.setdefault(name, {})
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        """计数器加 value"""
+        series = self._counters[name]
+        key = _labels(labels)
+        series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        """直方图记录一次观测"""
+        buckets = self._types[name][2]
+        series = self._histograms[name]
+        key = _labels(labels)
+        state = series.get(key)
+        if state is None:
+            # 各桶计数（非累计）+ +Inf 桶 + sum
+            state = series[key] = [0] * (len(buckets) + 2)
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                state[i] += 1
+                break
+        else:
+            state[len(buckets)] += 1
+        state[-1] += value
+
+    def add_collector(self, collect: Callable[[], Iterable[Tuple[str, dict, float]]]):
+        """
+        注册采集函数：抓取 / 写文件时调用，返回 (指标名, 标签, 当前值)
+
+        指标类型为 counter 时值应为进程内累计值（跨进程求和），gauge 按 pid 分别输出。
+        """
+        self._collectors.append(collect)
+        return collect
+
+    # ==================== 进程快照 ====================
+
+    def snapshot(self) -> dict:
+        """本进程指标（可 JSON 序列化）"""
+        counters = {name: dict(series) for name, series in self._counters.items()}
+        gauges: Dict[str, Dict[Labels, float]] = {}
+        for collect in self._collectors:
+            try:
+                samples = list(collect())
+            except Exception:
+                logger.exception("Metrics collector failed")
+                continue
+            for name, labels, value in samples:
+                target = counters if self._types[name][0] == "counter" else gauges
+                target.setdefault(name, {})[_labels(labels)] = value
+        return {
+            "pid": self.pid,
+            "counters": _encode(counters),
+            "gauges": _encode(gauges),
+            "histograms": _encode({name: {k: list(v) for k, v in s.items()} for name, s in self._histograms.items()}),
+        }
+
+    def _path(self) -> Path:
+        return self.directory / f"{self.pid}.json"
+
+    def flush(self) -> None:
+        """原子写入本进程指标文件"""
+        if self.directory is None:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = self.directory / f".{self.pid}.tmp"
+        tmp.write_text(json.dumps(self.snapshot(), separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, self._path())
+
+    @contextmanager
+    def _lock(self, exclusive: bool) -> Iterator[None]:
+        """目录锁：并入 base.json 时独占，汇总读取时共享（避免读到并入一半的状态）"""
+        if fcntl is None:
+            yield
+            return
+        with open(self.directory / "base.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+
+    def _read(self, path: Path) -> Optional[dict]:
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def _fold(self, path: Path) -> None:
+        """把已结束进程的计数器与直方图并入 base.json，并删除其进程文件"""
+        with self._lock(exclusive=True):
+            if not path.exists():
+                return  # 已由其他进程并入
+            counters: Dict[str, Dict[Labels, float]] = {}
+            histograms: Dict[str, Dict[Labels, List[float]]] = {}
+            for snap in (self._read(self.directory / BASE_FILE), self._read(path)):
+                if snap:
+                    _accumulate(snap, counters, histograms)
+            tmp = self.directory / f".base.{self.pid}.tmp"
+            tmp.write_text(json.dumps(
+                {"counters": _encode(counters), "histograms": _encode(histograms)}, separators=(",", ":")
+            ), encoding="utf-8")
+            os.replace(tmp, self.directory / BASE_FILE)
+            path.unlink()
+
+    def _pid_files(self) -> Iterator[Tuple[int, Path]]:
+        for path in self.directory.glob("*.json"):
+            try:
+                yield int(path.stem), path
+            except ValueError:
+                continue
+
+    def _snapshots(self) -> List[dict]:
+        """本进程快照 + 已退出进程的累计值 + 其他存活进程的文件（已退出进程的文件先并入累计值）"""
+        own = self.snapshot()
+        if self.directory is None or not self.directory.exists():
+            return [own]
+        for pid, path in self._pid_files():
+            if pid != self.pid and not _pid_alive(pid):
+                try:
+                    self._fold(path)
+                except OSError:
+                    logger.exception("Failed to fold metrics file %s", path)
+
+        snapshots = [own]
+        with self._lock(exclusive=False):
+            base = self._read(self.directory / BASE_FILE)
+            if base:
+                snapshots.append(base)
+            for pid, path in self._pid_files():
+                if pid != self.pid:
+                    snap = self._read(path)
+                    if snap:
+                        snapshots.append(snap)
+        return snapshots
+
+    # ==================== 生命周期 ====================
+
+    async def start(self) -> None:
+        if self.directory is not None and self._task is None:
+            # 同 pid 的旧进程遗留的文件（pid 复用）先并入累计值，避免被本进程覆盖
+            if self._path().exists():
+                self._fold(self._path())
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        # 最终值并入累计值后删除本进程文件
+        try:
+            self.flush()
+            self._fold(self._path())
+        except OSError:
+            logger.exception("Failed to fold metrics file on shutdown")
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                self.flush()
+            except OSError:
+                logger.exception("Failed to write metrics file")
+            await asyncio.sleep(self.flush_interval)
+
+    # ==================== 输出 ====================
+
+    def render(self) -> str:
+        """汇总所有进程并输出 Prometheus 文本格式"""
+        counters: Dict[str, Dict[Labels, float]] = {}
+        gauges: Dict[str, Dict[Labels, float]] = {}
+        histograms: Dict[str, Dict[Labels, List[float]]] = {}
+
+        for snap in self._snapshots():
+            pid = str(snap.get("pid"))
+            _accumulate(snap, counters, histograms)
+            for name, series in snap.get("gauges", {}).items():
+                target = gauges.setdefault(name, {})
+                for labels, value in series:
+                    target[tuple(sorted(map(tuple, labels + [["pid", pid]])))] = value
+
+        lines: List[str] = []
+        for name, (kind, help_text, buckets) in sorted(self._types.items()):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "histogram":
+                for labels, state in sorted(histograms.get(name, {}).items()):
+                    cumulative = 0
+                    for bound, count in zip(buckets + (float("inf"),), state):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else _format_value(bound)
+                        lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(state[-1])}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+            else:
+                source = counters if kind == "counter" else gauges
+                for labels, value in sorted(source.get(name, {}).items()):
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# ==================== 请求与数据库埋点 ====================
+
+def route_label(scope: dict) -> str:
+    """路由模板（避免按实际路径产生大量标签）"""
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    if scope.get("path", "").startswith("/assets/"):
+        return "/assets"
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI 中间件：记录请求数、延迟与每个请求的数据库统计"""
+
+    def __init__(self, app, registry: MetricsRegistry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        start = time.perf_counter()
+        status = 500
+        elapsed = None
+
+        async def send_wrapper(message):
+            nonlocal status, elapsed
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                elapsed = time.perf_counter() - start
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_request.reset(token)
+            if elapsed is None:
+                elapsed = time.perf_counter() - start
+            route = route_label(scope)
+            method = scope["method"]
+            registry = self.registry
+            registry.inc("conch_http_requests_total", method=method, route=route, status=status)
+            registry.observe("conch_http_request_duration_seconds", elapsed, method=method, route=route)
+            registry.observe("conch_http_request_db_statements", stats.statements, route=route)
+            registry.observe("conch_http_request_db_seconds", stats.db_time, route=route)
+
+
+def instrument_engine(engine, registry: MetricsRegistry, name: str) -> None:
+    """
+    为引擎注册语句计时与连接池事件
+
+    Args:
+        engine: 同步引擎（异步引擎传入 engine.sync_engine）
+        registry: 指标登记表
+        name: 引擎标签（如 "async"、"sync"）
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["metrics_start"].pop()
+        registry.inc("conch_db_statements_total", engine=name)
+        registry.inc("conch_db_statement_seconds_total", elapsed, engine=name)
+        stats = current_request.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.db_time += elapsed
+
+    @event.listens_for(engine, "handle_error")
+    def on_error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("metrics_start"):
+            conn.info["metrics_start"].pop()
+        registry.inc("conch_db_errors_total", engine=name)
+
+    @event.listens_for(engine.pool, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        registry.inc("conch_db_pool_checkouts_total", engine=name)
+
+    @event.listens_for(engine.pool, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        registry.inc("conch_db_pool_connections_created_total", engine=name)
+
+    def collect():
+        pool = engine.pool
+        # NullPool / StaticPool 没有容量统计
+        for stat in ("size", "checkedout", "overflow"):
+            method = getattr(pool, stat, None)
+            if callable(method):
+                yield f"conch_db_pool_{stat}", {"engine": name}, method()
+
+    registry.add_collector(collect)
+
+
+def define_metrics(registry: MetricsRegistry) -> None:
+    """定义应用使用的全部指标"""
+    registry.counter("conch_http_requests_total", "HTTP requests by route and status")
+    registry.histogram("conch_http_request_duration_seconds",
+                       "Time until response headers are sent", LATENCY_BUCKETS)
+    registry.histogram("conch_http_request_db_statements",
+                       "SQL statements executed per request", STATEMENT_BUCKETS)
+    registry.histogram("conch_http_request_db_seconds",
+                       "Database time per request", DB_TIME_BUCKETS)
+    registry.counter("conch_db_statements_total", "SQL statements executed")
+    registry.counter("conch_db_statement_seconds_total", "Time spent executing SQL statements")
+    registry.counter("conch_db_errors_total", "SQL statement errors")
+    registry.counter("conch_db_pool_checkouts_total", "Connection pool checkouts")
+    registry.counter("conch_db_pool_connections_created_total", "New DB connections opened by the pool")
+    registry.gauge("conch_db_pool_size", "Connection pool size")
+    registry.gauge("conch_db_pool_checkedout", "Connections currently checked out")
+    registry.gauge("conch_db_pool_overflow", "Connections currently in overflow")
+    registry.counter("conch_cache_requests_total", "In-process cache lookups by result")
+    registry.counter("conch_votes_total", "Vote requests by result")
+    registry.counter("conch_likes_total", "Like requests by result")
+    registry.gauge("conch_stream_clients", "Open /api/stream connections")
+    registry.counter("conch_rate_limited_total", "Requests rejected by the rate limiter (429)")
+    registry.gauge("conch_db_replica_healthy", "Read replica health (1 = in rotation)")
+    registry.gauge("conch_write_behind_queue", "Operations waiting in the write-behind buffer")
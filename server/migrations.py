@@ -0,0 +1,196 @@
+"""
+数据库迁移
+
+create_all 只创建缺失的表，不会为已存在的表补列或补索引。
+结构变更按版本号登记在 MIGRATIONS 中，启动时（create_tables）与 scripts/init_db.py
+依次执行尚未应用的迁移，并在 schema_version 表中记录版本。
+
+约定：
+- 迁移必须幂等（新库由 create_all 直接建好最新结构，迁移随后照常执行一遍）；
+- 模型中新增的列 / 索引同时在这里添加一个新版本，不修改已发布的迁移。
+
+多个 worker 同时启动时，建表与迁移在 schema_lock 内串行执行
+（PostgreSQL 使用 advisory lock，文件型 SQLite 使用数据库旁的 .migrate.lock 文件锁），
+拿到锁后重新读取版本，后启动的进程只会看到已完成的迁移。
+"""
+import logging
+import zlib
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Iterator, List
+
+from sqlalchemy import func, inspect, insert, select, text, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateIndex
+
+try:
+    import fcntl
+except ImportError:  # Windows 上没有 fcntl，SQLite 不加文件锁
+    fcntl = None
+
+from server.models import Entry, Vote, VoteDailyTotal, Like, SchemaVersion
+from server.snapshot import rebuild_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Migration:
+    """单个迁移"""
+    version: int
+    description: str
+    apply: Callable[[Connection], None]
+
+
+MIGRATIONS: List[Migration] = []
+
+
+def migration(version: int, description: str):
+    """登记迁移（版本号必须递增）"""
+    def decorator(func_):
+        if MIGRATIONS and version <= MIGRATIONS[-1].version:
+            raise ValueError(f"Migration version must increase: {version}")
+        MIGRATIONS.append(Migration(version, description, func_))
+        return func_
+    return decorator
+
+
+def create_index(conn: Connection, table, name: str) -> None:
+    """按模型中的定义创建索引（已存在时跳过）"""
+    index = next(index for index in table.indexes if index.name == name)
+    conn.execute(CreateIndex(index, if_not_exists=True))
+
+
+def drop_index(conn: Connection, name: str) -> None:
+    """删除索引（不存在时跳过）"""
+    conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+
+# ==================== 迁移 ====================
+
+@migration(1, "entries 计数字段 vote_count / like_count")
+def add_counter_columns(conn: Connection) -> None:
+    """
+    旧库补齐计数字段，并在同一事务内从 votes / likes 回填、重建排行榜快照
+
+    补列前不存在计数，也就不会有按日汇总的投票（压缩依赖计数字段），原始表即全部数据。
+    """
+    existing = {col["name"] for col in inspect(conn).get_columns(Entry.__tablename__)}
+    sources = {"vote_count": Vote, "like_count": Like}
+    added = {}
+    for name, model in sources.items():
+        if name not in existing:
+            conn.execute(text(
+                f"ALTER TABLE {Entry.__tablename__} ADD COLUMN {name} INTEGER NOT NULL DEFAULT 0"
+            ))
+            added[name] = model
+    if not added:
+        return
+
+    entries = Entry.__table__
+    conn.execute(update(entries).values({
+        entries.c[name]: select(func.count()).where(model.__table__.c.entry_id == entries.c.id).scalar_subquery()
+        for name, model in added.items()
+    }))
+    with Session(bind=conn) as db:
+        snapshot_count = rebuild_snapshot(db)
+    logger.warning("Added and backfilled entries.%s, rebuilt %d snapshot rows", ", ".join(added), snapshot_count)
+
+
+@migration(2, "按查询形状调整索引")
+def add_query_indexes(conn: Connection) -> None:
+    """
+    - entries (status, submitted_at)：待审核列表按提交时间倒序；
+    - entries (status, owner)：排行榜按作者筛选；
+    - votes (vote_date, entry_id)：按日汇总，无需回表；
+    - 删除 votes / likes 的单列 entry_id 索引：唯一索引以 entry_id 开头，
+      已能服务按条目查询，多一个索引只会拖慢每次写入。
+    """
+    create_index(conn, Entry.__table__, "idx_entry_status_submitted")
+    create_index(conn, Entry.__table__, "idx_entry_status_owner")
+    create_index(conn, Vote.__table__, "idx_vote_date_entry")
+    drop_index(conn, f"ix_{Vote.__tablename__}_entry_id")
+    drop_index(conn, f"ix_{Like.__tablename__}_entry_id")
+
+
+@migration(3, "投票按日汇总表 vote_daily_totals")
+def add_vote_daily_totals(conn: Connection) -> None:
+    """新库由 create_all 创建；这里兜底只执行迁移的场景"""
+    VoteDailyTotal.__table__.create(conn, checkfirst=True)
+
+
+# ==================== 执行 ====================
+
+def current_version(conn: Connection) -> int:
+    """已应用的最高版本（未执行过迁移时为 0）"""
+    return conn.execute(select(func.max(SchemaVersion.version))).scalar() or 0
+
+
+def latest_version() -> int:
+    """代码中的最新版本"""
+    return MIGRATIONS[-1].version if MIGRATIONS else 0
+
+
+# PostgreSQL advisory lock 的键（同一数据库上的所有进程一致）
+ADVISORY_LOCK_KEY = zlib.crc32(b"magic-conch:schema")
+
+
+@contextmanager
+def schema_lock(engine) -> Iterator[None]:
+    """
+    跨进程串行建表与迁移
+
+    PostgreSQL 在单独的连接上持有 advisory lock；文件型 SQLite 对 <数据库>.migrate.lock
+    加 flock（同一主机上的进程）；内存库与其他数据库不加锁。
+    """
+    dialect = engine.dialect.name
+    if dialect == "postgresql":
+        with engine.connect() as conn:
+            conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+            conn.commit()
+            try:
+                yield
+            finally:
+                conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": ADVISORY_LOCK_KEY})
+                conn.commit()
+        return
+
+    database = engine.url.database
+    if dialect != "sqlite" or fcntl is None or not database or database == ":memory:":
+        yield
+        return
+    with open(f"{database}.migrate.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)  # 关闭文件即释放
+        yield
+
+
+def run_migrations(engine) -> List[Migration]:
+    """
+    执行尚未应用的迁移（每个迁移一个事务，与版本记录一起提交）
+
+    调用方需持有 schema_lock（见 create_tables）；未持锁时并发写入同一版本号
+    会被唯一约束拦下，视为其他进程已完成该迁移。
+
+    Args:
+        engine: 同步引擎（schema_version 表需已创建）
+
+    Returns:
+        本次执行的迁移列表
+    """
+    applied = []
+    for item in MIGRATIONS:
+        try:
+            with engine.begin() as conn:
+                # 每个迁移前重新读取版本（持锁期间其他进程不会再推进）
+                if item.version <= current_version(conn):
+                    continue
+                item.apply(conn)
+                conn.execute(insert(SchemaVersion).values(version=item.version, description=item.description))
+        except IntegrityError:
+            logger.info("Migration %d already applied by another process", item.version)
+            continue
+        logger.info("Applied migration %d: %s", item.version, item.description)
+        applied.append(item)
+    return applied
@@ -1,10 +1,15 @@
 """
 数据库模型定义
 """
-from sqlalchemy import Column, Integer, String, Date, DateTime, Enum, Index, create_engine, Text
+from sqlalchemy import Column, Integer, Float, String, Date, DateTime, Enum, Index, create_engine, Text, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.dialects import postgresql, sqlite
+from dataclasses import dataclass
 from datetime import datetime
+from typing import List, Optional
 import enum
 
 Base = declarative_base()
@@ -36,6 +41,16 @@ class Entry(Base):
     reviewed_at = Column(DateTime, nullable=True)
     review_note = Column(Text, nullable=True)  # 审核备注
 
+    # 计数冗余字段（随投票/点赞在同一事务内维护，可用 scripts/reconcile_counts.py 重建）
+    vote_count = Column(Integer, default=0, server_default='0', nullable=False)
+    like_count = Column(Integer, default=0, server_default='0', nullable=False)
+
+    # 索引变更需同时在 server/migrations.py 中添加迁移（create_all 不会修改已存在的表）
+    __table_args__ = (
+        Index('idx_entry_status_submitted', 'status', 'submitted_at'),  # 待审核列表
+        Index('idx_entry_status_owner', 'status', 'owner'),  # 排行榜按作者筛选
+    )
+
     def __repr__(self):
         return f"<Entry(id={self.id}, title={self.title}, status={self.status.value})>"
 
@@ -45,25 +60,38 @@ class Vote(Base):
     __tablename__ = "votes"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    entry_id = Column(String(100), nullable=False, index=True)
+    entry_id = Column(String(100), nullable=False)  # 按条目查询使用唯一索引的前缀
     vote_date = Column(Date, nullable=False)
     ip_hash = Column(String(64), nullable=False)
 
     # 唯一约束：同一条目、同一天、同一 IP 只能投一次
     __table_args__ = (
         Index('idx_unique_vote', 'entry_id', 'vote_date', 'ip_hash', unique=True),
+        Index('idx_vote_date_entry', 'vote_date', 'entry_id'),  # 按日汇总（覆盖索引）
     )
 
     def __repr__(self):
         return f"<Vote(entry_id={self.entry_id}, date={self.vote_date})>"
 
 
+class VoteDailyTotal(Base):
+    """投票按日汇总（超过保留期的原始投票压缩到这里，见 server/rollup.py）"""
+    __tablename__ = "vote_daily_totals"
+
+    entry_id = Column(String(100), primary_key=True)
+    vote_date = Column(Date, primary_key=True)
+    count = Column(Integer, nullable=False)
+
+    def __repr__(self):
+        return f"<VoteDailyTotal(entry_id={self.entry_id}, date={self.vote_date}, count={self.count})>"
+
+
 class Like(Base):
     """点赞记录表"""
     __tablename__ = "likes"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    entry_id = Column(String(100), nullable=False, index=True)
+    entry_id = Column(String(100), nullable=False)  # 按条目查询使用唯一索引的前缀
     ip_hash = Column(String(64), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
@@ -76,19 +104,209 @@ class Like(Base):
         return f"<Like(entry_id={self.entry_id})>"
 
 
-def get_engine(db_url: str):
-    """创建数据库引擎"""
+@dataclass(frozen=True)
+class SQLiteProfile:
+    """
+    SQLite 生产配置：每个新连接执行的 PRAGMA 与读连接池大小
+
+    WAL 模式下读不阻塞写、写不阻塞读；synchronous=NORMAL 在 WAL 下只在检查点时 fsync，
+    断电最多丢失最后几个事务但不会损坏数据库。
+    """
+    synchronous: str = "NORMAL"
+    mmap_size: int = 256 * 1024 * 1024
+    cache_size: int = -64 * 1024  # 负数表示 KiB
+    busy_timeout: int = 5000  # 毫秒
+    temp_store: str = "MEMORY"
+    read_pool_size: int = 8
+
+    def pragmas(self, read_only: bool = False) -> List[str]:
+        """连接初始化语句"""
+        statements = [
+            "PRAGMA journal_mode=WAL",
+            f"PRAGMA synchronous={self.synchronous}",
+            f"PRAGMA mmap_size={int(self.mmap_size)}",
+            f"PRAGMA cache_size={int(self.cache_size)}",
+            f"PRAGMA busy_timeout={int(self.busy_timeout)}",
+            f"PRAGMA temp_store={self.temp_store}",
+        ]
+        if read_only:
+            statements.append("PRAGMA query_only=ON")
+        return statements
+
+
+def _is_sqlite_file(db_url: str) -> bool:
+    """文件型 SQLite（内存库不支持 WAL）"""
+    return db_url.startswith("sqlite") and ":memory:" not in db_url and not db_url.rstrip("/").endswith(":")
+
+
+def configure_sqlite(engine, profile: SQLiteProfile, read_only: bool = False) -> None:
+    """
+    为引擎的每个新连接执行 PRAGMA
+
+    Args:
+        engine: 同步引擎（异步引擎传 engine.sync_engine）
+        profile: SQLite 配置
+        read_only: 只读连接（query_only，写入会报错）
+    """
+    statements = profile.pragmas(read_only)
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+
+def get_engine(db_url: str, sqlite_profile: Optional[SQLiteProfile] = None):
+    """
+    创建数据库引擎
+
+    Args:
+        db_url: 数据库 URL
+        sqlite_profile: SQLite 生产配置（None 时使用驱动默认设置）
+    """
     if db_url.startswith("sqlite"):
-        return create_engine(db_url, connect_args={"check_same_thread": False})
+        engine = create_engine(db_url, connect_args={"check_same_thread": False})
+        if sqlite_profile is not None and _is_sqlite_file(db_url):
+            configure_sqlite(engine, sqlite_profile)
+        return engine
     else:
         return create_engine(db_url, pool_pre_ping=True, pool_recycle=3600)
 
 
+class LeaderboardSnapshot(Base):
+    """排行榜快照表（已批准条目的当日评分，按 score 降序 + entry_id 升序即为名次）"""
+    __tablename__ = "leaderboard_snapshot"
+
+    entry_id = Column(String(100), primary_key=True)
+    score = Column(Integer, nullable=False)
+    days_stale = Column(Integer, nullable=False)
+    as_of = Column(Date, nullable=False)  # 评分基准日期，早于今天即需重建
+
+    __table_args__ = (
+        Index('idx_snapshot_rank', 'score', 'entry_id'),
+    )
+
+    def __repr__(self):
+        return f"<LeaderboardSnapshot(entry_id={self.entry_id}, score={self.score})>"
+
+
+class EntrySource(Base):
+    """YAML 条目文件清单（增量导入用：未变化的文件不再解析）"""
+    __tablename__ = "entry_sources"
+
+    path = Column(String(255), primary_key=True)  # 相对 data/entries 的文件名
+    mtime = Column(Float, nullable=False)
+    size = Column(Integer, nullable=False)
+    sha256 = Column(String(64), nullable=False)
+    entry_id = Column(String(100), nullable=True)  # 文件中的条目 ID
+    imported_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<EntrySource(path={self.path}, entry_id={self.entry_id})>"
+
+
+class SchemaVersion(Base):
+    """已执行的数据库迁移（见 server/migrations.py）"""
+    __tablename__ = "schema_version"
+
+    version = Column(Integer, primary_key=True)
+    description = Column(String(200), nullable=False)
+    applied_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<SchemaVersion(version={self.version})>"
+
+
+def dialect_insert(dialect_name: str, model):
+    """
+    返回支持 ON CONFLICT 的 INSERT 构造（SQLite / PostgreSQL）
+
+    Args:
+        dialect_name: 方言名（engine.dialect.name）
+        model: ORM 模型
+
+    Returns:
+        带 on_conflict_do_nothing / on_conflict_do_update 的 Insert
+    """
+    if dialect_name == "postgresql":
+        return postgresql.insert(model)
+    if dialect_name == "sqlite":
+        return sqlite.insert(model)
+    raise NotImplementedError(f"ON CONFLICT is not supported for dialect: {dialect_name}")
+
+
+def to_async_url(db_url: str) -> str:
+    """
+    将同步数据库 URL 转换为异步驱动 URL
+
+    sqlite:///... -> sqlite+aiosqlite:///...
+    postgresql[+psycopg2]://... -> postgresql+asyncpg://...
+    """
+    scheme, sep, rest = db_url.partition("://")
+    if not sep:
+        return db_url
+    dialect = scheme.split("+")[0]
+    if dialect == "sqlite":
+        return f"sqlite+aiosqlite://{rest}"
+    if dialect in ("postgresql", "postgres"):
+        return f"postgresql+asyncpg://{rest}"
+    return db_url
+
+
+def get_async_engine(db_url: str, sqlite_profile: Optional[SQLiteProfile] = None, read_only: bool = False):
+    """
+    创建异步数据库引擎（供 API 路由使用）
+
+    指定 sqlite_profile 时，SQLite 使用连接池代替默认的每会话新建连接：
+    - 写引擎只有一个连接，写事务在连接池排队，互相之间不再争抢数据库锁；
+    - 读引擎（read_only=True）为 read_pool_size 个只读连接，WAL 下不被写入阻塞。
+
+    Args:
+        db_url: 数据库 URL（同步或异步驱动均可）
+        sqlite_profile: SQLite 生产配置
+        read_only: 是否为只读引擎
+    """
+    async_url = to_async_url(db_url)
+    if async_url.startswith("sqlite"):
+        if sqlite_profile is None or not _is_sqlite_file(db_url):
+            return create_async_engine(async_url)
+        pool_size = sqlite_profile.read_pool_size if read_only else 1
+        engine = create_async_engine(
+            async_url,
+            poolclass=AsyncAdaptedQueuePool,
+            pool_size=pool_size,
+            max_overflow=0
+        )
+        configure_sqlite(engine.sync_engine, sqlite_profile, read_only)
+        return engine
+    else:
+        return create_async_engine(async_url, pool_pre_ping=True, pool_recycle=3600)
+
+
 def create_tables(engine):
-    """创建所有表"""
-    Base.metadata.create_all(bind=engine)
+    """
+    创建所有表并执行未应用的迁移
+
+    Returns:
+        本次执行的迁移列表
+    """
+    from server.migrations import run_migrations, schema_lock
+
+    # 多个 worker 同时启动时串行执行，避免重复建表 / 重复登记版本
+    with schema_lock(engine):
+        Base.metadata.create_all(bind=engine)
+        return run_migrations(engine)
 
 
 def get_session_factory(engine):
     """创建会话工厂"""
     return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def get_async_session_factory(engine):
+    """创建异步会话工厂（提交后不过期对象，避免隐式懒加载）"""
+    return async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
@@ -0,0 +1,215 @@
+"""
+SQL 查询剖析（可选，PROFILE_QUERIES=true 开启）
+
+通过引擎事件记录每个 HTTP 请求执行的全部语句及耗时：
+- 同一语句形状（指纹：参数与字面量替换为 ?，IN / VALUES 列表折叠）在一个请求内
+  重复超过 N_PLUS_ONE 次时视为疑似 N+1，记录警告；
+- 总耗时超过阈值或疑似 N+1 的请求写入滚动日志（每行一个 JSON），附语句指纹统计；
+- 响应头 X-DB-Queries / X-DB-Time 给出语句数与数据库耗时（毫秒），便于压测时观察。
+
+开销集中在请求结束后的指纹计算，关闭时不注册任何事件。
+"""
+import contextvars
+import json
+import logging
+import re
+import time
+from collections import defaultdict
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+
+from server.metrics import route_label
+
+logger = logging.getLogger(__name__)
+
+# 单个请求最多记录的语句数（超出后只计数，避免异常请求占用大量内存）
+MAX_RECORDED_STATEMENTS = 10_000
+
+# 慢请求日志中列出的指纹数
+TOP_FINGERPRINTS = 20
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM = re.compile(r"\$\d+|%\(\w+\)s|%s|:\w+|\?")
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_ROWS = re.compile(r"\(\?\)(?:\s*,\s*\(\?\))+")
+_SPACE = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """
+    语句形状：去掉参数值、字面量与列表长度差异
+
+    例如 "SELECT ... WHERE id IN (?, ?, ?)" 与 "... IN (?)" 得到相同指纹。
+    """
+    text = _SPACE.sub(" ", statement).strip()
+    text = _STRING.sub("?", text)
+    text = _PARAM.sub("?", text)
+    text = _NUMBER.sub("?", text)
+    text = _LIST.sub("(?)", text)
+    return _ROWS.sub("(?)", text)
+
+
+class QueryLog:
+    """单个请求的语句记录"""
+    __slots__ = ("count", "db_time", "statements")
+
+    def __init__(self):
+        self.count = 0
+        self.db_time = 0.0
+        self.statements: List[Tuple[str, float]] = []
+
+    def add(self, statement: str, elapsed: float) -> None:
+        self.count += 1
+        self.db_time += elapsed
+        if len(self.statements) < MAX_RECORDED_STATEMENTS:
+            self.statements.append((statement, elapsed))
+
+    def fingerprints(self) -> List[dict]:
+        """按指纹汇总（按总耗时降序）"""
+        stats: Dict[str, List[float]] = defaultdict(lambda: [0, 0.0])
+        for statement, elapsed in self.statements:
+            entry = stats[fingerprint(statement)]
+            entry[0] += 1
+            entry[1] += elapsed
+        return sorted(
+            ({"fingerprint": fp, "count": int(count), "total_ms": round(total * 1000, 3)}
+             for fp, (count, total) in stats.items()),
+            key=lambda x: x["total_ms"],
+            reverse=True
+        )
+
+
+# 当前请求的语句记录（由 ProfilingMiddleware 设置）
+current_queries: contextvars.ContextVar[Optional[QueryLog]] = contextvars.ContextVar(
+    "current_queries", default=None
+)
+
+
+class QueryProfiler:
+    """查询剖析配置、引擎埋点与慢请求日志"""
+
+    def __init__(
+        self,
+        n_plus_one: int = 10,
+        slow_ms: float = 500,
+        log_path: Optional[str] = None,
+        max_bytes: int = 10 * 1024 * 1024,
+        backups: int = 5,
+        header: bool = True
+    ):
+        """
+        Args:
+            n_plus_one: 同一指纹在一个请求内超过该次数时视为疑似 N+1
+            slow_ms: 请求总耗时超过该值（毫秒）时写入慢请求日志
+            log_path: 慢请求日志路径（为空时写入应用日志）
+            max_bytes: 单个日志文件大小上限
+            backups: 保留的滚动日志数
+            header: 是否添加 X-DB-Queries / X-DB-Time 响应头
+        """
+        self.n_plus_one = n_plus_one
+        self.slow_ms = slow_ms
+        self.header = header
+        self._log = logging.getLogger(f"{__name__}.slow")
+        if log_path:
+            Path(log_path).parent.mkdir(parents=True, exist_ok=True)
+            handler = RotatingFileHandler(log_path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._log.addHandler(handler)
+            self._log.setLevel(logging.INFO)
+            self._log.propagate = False
+
+    def instrument(self, engine) -> None:
+        """为同步引擎（异步引擎传 engine.sync_engine）注册语句计时"""
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def before_execute(conn, cursor, statement, parameters, context, executemany):
+            if current_queries.get() is not None:
+                conn.info.setdefault("profile_start", []).append(time.perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def after_execute(conn, cursor, statement, parameters, context, executemany):
+            queries = current_queries.get()
+            starts = conn.info.get("profile_start")
+            if queries is not None and starts:
+                queries.add(statement, time.perf_counter() - starts.pop())
+
+        @event.listens_for(engine, "handle_error")
+        def on_error(exception_context):
+            conn = exception_context.connection
+            if conn is not None and conn.info.get("profile_start"):
+                conn.info["profile_start"].pop()
+
+    def report(self, scope: dict, status: int, duration: float, queries: QueryLog) -> None:
+        """请求结束：检测 N+1，慢请求或疑似 N+1 时写日志"""
+        duration_ms = duration * 1000
+        fingerprints = queries.fingerprints() if queries.count else []
+        repeated = [fp for fp in fingerprints if fp["count"] > self.n_plus_one]
+        if repeated:
+            logger.warning(
+                "Possible N+1 in %s %s: %s",
+                scope["method"], scope["path"],
+                "; ".join(f'{fp["count"]}x {fp["fingerprint"][:120]}' for fp in repeated)
+            )
+        if duration_ms < self.slow_ms and not repeated:
+            return
+
+        self._log.info(json.dumps({
+            "time": datetime.now().isoformat(timespec="milliseconds"),
+            "method": scope["method"],
+            "path": scope["path"],
+            "route": route_label(scope),
+            "status": status,
+            "duration_ms": round(duration_ms, 3),
+            "db_ms": round(queries.db_time * 1000, 3),
+            "statements": queries.count,
+            "n_plus_one": [fp["fingerprint"] for fp in repeated],
+            "fingerprints": fingerprints[:TOP_FINGERPRINTS],
+        }, ensure_ascii=False))
+
+
+class ProfilingMiddleware:
+    """ASGI 中间件：为每个请求收集语句记录并在结束时汇报"""
+
+    def __init__(self, app, profiler: QueryProfiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        queries = QueryLog()
+        token = current_queries.set(queries)
+        start = time.perf_counter()
+        status = 500
+        elapsed = None
+
+        async def send_wrapper(message):
+            nonlocal status, elapsed
+            if message["type"] == "http.response.start":
+                # 与 /metrics 一致，按响应头发出的时间计（SSE 等长连接不算慢请求）
+                status = message["status"]
+                elapsed = time.perf_counter() - start
+                if self.profiler.header:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-db-queries", str(queries.count).encode()))
+                    headers.append((b"x-db-time", f"{queries.db_time * 1000:.1f}".encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_queries.reset(token)
+            if elapsed is None:
+                elapsed = time.perf_counter() - start
+            try:
+                self.profiler.report(scope, status, elapsed, queries)
+            except Exception:
+                logger.exception("Query profiler report failed")
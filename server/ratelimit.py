@@ -0,0 +1,252 @@
+"""
+进程内限流（令牌桶）
+
+在路由与数据库会话之前按 IP 与全局两级令牌桶拦截写接口，超限直接返回 429 + Retry-After，
+不打开数据库会话、不解析请求体，机器人刷票时把数据库留给正常用户。
+
+- 每个桶只保存一个浮点数（GCRA 的理论到达时间，与令牌桶等价）；
+- 按 IP 的桶放在固定容量的表中，满时淘汰最久未出现的 IP（被淘汰的 IP 重新获得满桶）；
+- 多 worker 部署时每个进程各自计数，实际上限约为配置值乘以 worker 数。
+
+限额格式为 "次数/周期"（周期：second / minute / hour / day），如 "20/minute"；
+路由配置为 "按 IP[,全局]"，如 "20/minute,500/second"，任一部分可省略（为空表示不限）。
+
+按 IP 计数的键不取 X-Forwarded-For（最左侧的值由客户端任意填写，轮换即可绕过限流并挤掉
+正常用户的桶），只信任受信代理（TRUSTED_PROXIES）设置的 X-Real-IP，否则使用直连对端地址，见 client_address。
+"""
+import hashlib
+import ipaddress
+import json
+import math
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+PERIODS = {"second": 1, "s": 1, "minute": 60, "m": 60, "hour": 3600, "h": 3600, "day": 86400, "d": 86400}
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """限额：period 秒内最多 count 次（允许 count 次突发）"""
+    count: int
+    period: float
+
+    @property
+    def interval(self) -> float:
+        """两次请求的平均间隔（秒）"""
+        return self.period / self.count
+
+
+def parse_limit(text: str) -> Optional[RateLimit]:
+    """
+    解析 "次数/周期"
+
+    Returns:
+        RateLimit，空字符串返回 None
+
+    Raises:
+        ValueError: 格式错误
+    """
+    text = text.strip()
+    if not text:
+        return None
+    count, sep, period = text.partition("/")
+    try:
+        limit = RateLimit(int(count), PERIODS[period.strip().lower()])
+    except (ValueError, KeyError):
+        raise ValueError(f"Invalid rate limit: {text!r} (expected e.g. '20/minute')")
+    if not sep or limit.count <= 0:
+        raise ValueError(f"Invalid rate limit: {text!r} (expected e.g. '20/minute')")
+    return limit
+
+
+def parse_rule(text: str) -> Tuple[Optional[RateLimit], Optional[RateLimit]]:
+    """解析路由配置 "按 IP[,全局]" """
+    per_ip, _, global_ = text.partition(",")
+    return parse_limit(per_ip), parse_limit(global_)
+
+
+class TokenBuckets:
+    """一组共享限额的令牌桶（GCRA），固定容量，LRU 淘汰"""
+
+    def __init__(self, limit: RateLimit, max_keys: int):
+        self.interval = limit.interval
+        self.tolerance = limit.period  # 满桶时可连续通过 count 次
+        self.max_keys = max_keys
+        self._tat: "OrderedDict[int, float]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._tat)
+
+    def take(self, key: int, now: float) -> float:
+        """
+        取一个令牌
+
+        Returns:
+            0 表示放行，否则为需要等待的秒数
+        """
+        tat = self._tat.get(key)
+        if tat is None:
+            if len(self._tat) >= self.max_keys:
+                self._tat.popitem(last=False)
+            tat = now
+        else:
+            self._tat.move_to_end(key)
+            tat = max(tat, now)
+
+        new_tat = tat + self.interval
+        wait = new_tat - now - self.tolerance
+        if wait > 0:
+            self._tat[key] = tat
+            return wait
+        self._tat[key] = new_tat
+        return 0.0
+
+    def refund(self, key: int) -> None:
+        """归还刚取的令牌（后续检查未通过时调用）"""
+        if key in self._tat:
+            self._tat[key] -= self.interval
+
+
+@dataclass
+class RouteRule:
+    """单个路由的限流规则"""
+    name: str
+    per_ip: Optional[TokenBuckets]
+    global_: Optional[TokenBuckets]
+
+
+def parse_networks(text: str) -> Tuple:
+    """解析逗号分隔的 IP / 网段，如 "127.0.0.1,::1,172.17.0.0/16"
+
+    Raises:
+        ValueError: 格式错误
+    """
+    return tuple(ipaddress.ip_network(part.strip(), strict=False) for part in text.split(",") if part.strip())
+
+
+def client_address(scope: dict, trusted_proxies: Sequence) -> str:
+    """
+    限流使用的客户端地址
+
+    直连对端属于受信代理时取代理设置的 X-Real-IP（Nginx 以 $remote_addr 覆盖，客户端无法伪造），
+    否则取直连对端；不使用 X-Forwarded-For。
+
+    Args:
+        scope: ASGI scope
+        trusted_proxies: 受信代理网段（parse_networks 的结果）
+    """
+    peer = scope["client"][0] if scope.get("client") else ""
+    try:
+        trusted = any(ipaddress.ip_address(peer) in network for network in trusted_proxies)
+    except ValueError:
+        trusted = False
+    if trusted:
+        for name, value in scope["headers"]:
+            if name == b"x-real-ip":
+                return value.decode("latin-1").strip() or peer
+    return peer
+
+
+def ip_key(ip: str) -> int:
+    """IP 的 64 位摘要（表中不保存原始 IP）"""
+    return int.from_bytes(hashlib.blake2b(ip.encode(), digest_size=8).digest(), "big")
+
+
+class RateLimiter:
+    """按 (方法, 路径) 匹配的限流规则集合"""
+
+    def __init__(self, max_keys: int = 50_000):
+        """
+        Args:
+            max_keys: 每个路由按 IP 计数的最大 IP 数
+        """
+        self.max_keys = max_keys
+        self.rules: Dict[Tuple[str, str], RouteRule] = {}
+        self.rejected: Counter = Counter()  # (路由名, "ip" / "global") -> 次数
+
+    def add_rule(self, method: str, path: str, name: str, spec: str) -> None:
+        """
+        添加路由规则
+
+        Args:
+            method: HTTP 方法
+            path: 精确路径
+            name: 规则名（用于指标）
+            spec: "按 IP[,全局]" 限额，为空表示不限
+        """
+        per_ip, global_ = parse_rule(spec)
+        if per_ip is None and global_ is None:
+            return
+        self.rules[(method, path)] = RouteRule(
+            name,
+            TokenBuckets(per_ip, self.max_keys) if per_ip else None,
+            TokenBuckets(global_, 1) if global_ else None
+        )
+
+    def check(self, method: str, path: str, ip: Callable[[], str], now: Optional[float] = None) -> float:
+        """
+        检查请求
+
+        Args:
+            method: HTTP 方法
+            path: 请求路径
+            ip: 返回客户端 IP 的函数（只在命中规则时调用）
+            now: 当前单调时间（默认 time.monotonic()）
+
+        Returns:
+            0 表示放行，否则为建议的重试秒数
+        """
+        rule = self.rules.get((method, path))
+        if rule is None:
+            return 0.0
+        now = time.monotonic() if now is None else now
+
+        key = None
+        if rule.per_ip is not None:
+            key = ip_key(ip())
+            wait = rule.per_ip.take(key, now)
+            if wait:
+                self.rejected[(rule.name, "ip")] += 1
+                return wait
+        if rule.global_ is not None:
+            wait = rule.global_.take(0, now)
+            if wait:
+                if key is not None:
+                    rule.per_ip.refund(key)
+                self.rejected[(rule.name, "global")] += 1
+                return wait
+        return 0.0
+
+
+class RateLimitMiddleware:
+    """ASGI 中间件：超限请求直接返回 429"""
+
+    def __init__(self, app, limiter: RateLimiter, client_ip: Callable[[dict], str]):
+        """
+        Args:
+            limiter: 限流规则
+            client_ip: 从 ASGI scope 取客户端 IP
+        """
+        self.app = app
+        self.limiter = limiter
+        self.client_ip = client_ip
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            wait = self.limiter.check(scope["method"], scope["path"], lambda: self.client_ip(scope))
+            if wait:
+                body = json.dumps({"ok": False, "error": "Too many requests, please slow down"}).encode()
+                await send({
+                    "type": "http.response.start",
+                    "status": 429,
+                    "headers": [
+                        (b"content-type", b"application/json"),
+                        (b"content-length", str(len(body)).encode()),
+                        (b"retry-after", str(max(1, math.ceil(wait))).encode()),
+                    ],
+                })
+                await send({"type": "http.response.body", "body": body})
+                return
+        await self.app(scope, receive, send)
@@ -0,0 +1,146 @@
+"""
+只读副本路由（DB_READ_URLS）
+
+只读接口的会话按轮询分配到健康的副本；没有健康副本时回退到主库的读引擎。
+- 后台任务每隔 check_interval 秒对每个副本执行 SELECT 1，失败或超时即剔除，恢复后重新加入；
+- 请求中取连接失败（或超过 check_interval）、连接断开时立即剔除该副本
+  （取连接失败会改用下一个副本，不影响本次请求）；
+- 写操作以及需要读到自身写入的响应（如投票后返回的票数）始终使用主库会话，不经过这里。
+
+副本存在复制延迟，读接口的结果可能比主库落后（排行榜缓存 TTL 之外的额外延迟）。
+"""
+import asyncio
+import itertools
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from server.models import get_async_session_factory
+
+logger = logging.getLogger(__name__)
+
+
+class Replica:
+    """单个只读副本"""
+
+    def __init__(self, name: str, engine):
+        self.name = name
+        self.engine = engine
+        self.session_factory = get_async_session_factory(engine)
+        self.healthy = True
+        self.failures = 0  # 累计被剔除次数
+
+    def __repr__(self):
+        return f"<Replica(name={self.name}, healthy={self.healthy})>"
+
+
+class ReplicaSet:
+    """副本集合：轮询选择、健康检查与故障剔除"""
+
+    def __init__(self, engines: Sequence, fallback, check_interval: float = 5.0):
+        """
+        Args:
+            engines: 副本异步引擎列表（可为空）
+            fallback: 无可用副本时使用的异步引擎（主库读引擎）
+            check_interval: 健康检查间隔（秒），同时作为探测超时
+        """
+        self.replicas: List[Replica] = [Replica(f"replica{i}", engine) for i, engine in enumerate(engines)]
+        self.fallback_factory = get_async_session_factory(fallback)
+        self.check_interval = check_interval
+        self._counter = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def healthy_count(self) -> int:
+        return sum(1 for replica in self.replicas if replica.healthy)
+
+    def _candidates(self) -> List[Replica]:
+        """从轮询位置开始的健康副本"""
+        if not self.replicas:
+            return []
+        start = next(self._counter) % len(self.replicas)
+        rotated = self.replicas[start:] + self.replicas[:start]
+        return [replica for replica in rotated if replica.healthy]
+
+    def eject(self, replica: Replica, error: BaseException) -> None:
+        """剔除副本，等待健康检查恢复"""
+        if replica.healthy:
+            replica.healthy = False
+            replica.failures += 1
+            logger.warning("Read replica %s ejected: %s", replica.name, error)
+
+    # ==================== 会话 ====================
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[AsyncSession]:
+        """获取只读会话（优先副本，全部不可用时回退主库）"""
+        for replica in self._candidates():
+            db = replica.session_factory()
+            try:
+                await asyncio.wait_for(db.connection(), self.check_interval)
+            except (DBAPIError, OSError, asyncio.TimeoutError) as e:
+                await db.close()
+                self.eject(replica, e)
+                continue
+
+            try:
+                yield db
+            except DBAPIError as e:
+                if e.connection_invalidated:
+                    self.eject(replica, e)
+                raise
+            finally:
+                await db.close()
+            return
+
+        async with self.fallback_factory() as db:
+            yield db
+
+    # ==================== 健康检查 ====================
+
+    @staticmethod
+    async def _ping(replica: Replica) -> None:
+        async with replica.engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    async def check(self) -> None:
+        """探测所有副本（超时即视为故障），更新健康状态"""
+        for replica in self.replicas:
+            try:
+                await asyncio.wait_for(self._ping(replica), self.check_interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.eject(replica, e)
+                continue
+            if not replica.healthy:
+                replica.healthy = True
+                logger.info("Read replica %s restored", replica.name)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.check_interval)
+            try:
+                await self.check()
+            except Exception:
+                logger.exception("Read replica health check failed")
+
+    async def start(self) -> None:
+        if self.replicas and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止健康检查并关闭副本连接"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for replica in self.replicas:
+            await replica.engine.dispose()
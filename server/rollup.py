@@ -0,0 +1,139 @@
+"""
+投票汇总与原始记录压缩
+
+votes 表每个 IP 每天每条目一行，只有当天的记录用于去重（唯一索引 idx_unique_vote），
+评分与计数只需要总数。维护任务把超过保留期的原始投票按 (entry_id, vote_date)
+汇总进 vote_daily_totals 并删除原始行（可选先归档为 CSV），
+使 votes 表与其唯一索引的大小只取决于保留天数，而不是站点运行了多久。
+
+某条目的投票总数 = vote_daily_totals 中的 count 之和 + votes 中的原始行数
+（见 server/counters.py 的 reconcile_counts；entries.vote_count 不受压缩影响）。
+"""
+import csv
+import gzip
+import io
+import logging
+from collections import Counter
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from server.models import Vote, VoteDailyTotal, dialect_insert
+
+logger = logging.getLogger(__name__)
+
+
+def compaction_cutoff(retention_days: int, today: Optional[date] = None) -> date:
+    """
+    压缩截止日期：早于该日期的原始投票会被汇总并删除
+
+    Args:
+        retention_days: 原始投票保留天数（不含今天，0 表示只保留今天）
+        today: 当前日期（默认今天）
+    """
+    if retention_days < 0:
+        raise ValueError("retention_days must be >= 0")
+    return (today or date.today()) - timedelta(days=retention_days)
+
+
+def _archive(archive_dir: Path, day: date, rows: List[tuple]) -> None:
+    """把一天的原始投票追加到 votes-YYYY-MM-DD.csv.gz（gzip 支持多成员追加）"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows((entry_id, day.isoformat(), ip_hash) for entry_id, ip_hash in rows)
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    with gzip.open(archive_dir / f"votes-{day.isoformat()}.csv.gz", "at", encoding="utf-8", newline="") as f:
+        f.write(buffer.getvalue())
+
+
+def compact_day(db: Session, day: date, archive_dir: Optional[Path] = None) -> int:
+    """
+    汇总并删除某一天的原始投票（单个事务）
+
+    先 DELETE ... RETURNING 取回被删除的行再累加到汇总表：并发执行时同一行只会被一个
+    事务删除，不会重复计数；汇总使用 count = count + excluded.count，
+    因此压缩后迟到写入的同日投票会在下次压缩时累加进去。
+
+    Args:
+        db: 数据库会话
+        day: 投票日期
+        archive_dir: 归档目录（None 表示直接删除）
+
+    Returns:
+        压缩的原始投票行数
+    """
+    rows = db.execute(
+        delete(Vote).where(Vote.vote_date == day).returning(Vote.entry_id, Vote.ip_hash)
+    ).all()
+    if not rows:
+        db.rollback()
+        return 0
+
+    counts = Counter(entry_id for entry_id, _ in rows)
+    stmt = dialect_insert(db.bind.dialect.name, VoteDailyTotal).values([
+        {"entry_id": entry_id, "vote_date": day, "count": count}
+        for entry_id, count in counts.items()
+    ])
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=["entry_id", "vote_date"],
+        set_={"count": VoteDailyTotal.count + stmt.excluded.count}
+    ))
+    if archive_dir is not None:
+        # 提交前写归档：提交失败时归档可能多出一份，但不会丢数据
+        _archive(archive_dir, day, [tuple(row) for row in rows])
+    db.commit()
+    return len(rows)
+
+
+def compact_votes(
+    db: Session,
+    retention_days: int,
+    archive_dir: Optional[Path] = None,
+    today: Optional[date] = None,
+    progress: Optional[Callable[[date, int], None]] = None
+) -> dict:
+    """
+    压缩超过保留期的原始投票（逐天提交，可重复执行）
+
+    Args:
+        db: 数据库会话
+        retention_days: 原始投票保留天数（不含今天）
+        archive_dir: 归档目录（None 表示直接删除）
+        today: 当前日期（默认今天）
+        progress: 进度回调 (投票日期, 该日压缩行数)
+
+    Returns:
+        {'cutoff': 截止日期, 'days': 压缩天数, 'votes': 压缩行数}
+    """
+    cutoff = compaction_cutoff(retention_days, today)
+    days = db.execute(
+        select(Vote.vote_date).where(Vote.vote_date < cutoff).distinct().order_by(Vote.vote_date)
+    ).scalars().all()
+    db.rollback()
+
+    total = 0
+    compacted_days = 0
+    for day in days:
+        compacted = compact_day(db, day, archive_dir)
+        if compacted:
+            compacted_days += 1
+            total += compacted
+        if progress:
+            progress(day, compacted)
+
+    if total:
+        logger.info("Compacted %d votes from %d days before %s", total, compacted_days, cutoff)
+    return {"cutoff": cutoff.isoformat(), "days": compacted_days, "votes": total}
+
+
+def rolled_up_votes(db: Session, entry_ids: list) -> dict:
+    """一批条目在汇总表中的投票数"""
+    rows = db.execute(
+        select(VoteDailyTotal.entry_id, func.sum(VoteDailyTotal.count))
+        .where(VoteDailyTotal.entry_id.in_(entry_ids))
+        .group_by(VoteDailyTotal.entry_id)
+    ).all()
+    return {entry_id: int(count) for entry_id, count in rows}
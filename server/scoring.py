@@ -3,15 +3,25 @@
 """
 import math
 from datetime import date, datetime
+from typing import Dict, List, Optional, Sequence
 
+try:
+    import numpy as np
+except ImportError:  # NumPy 为可选依赖
+    np = None
 
-def calculate_score(votes: int, last_commit_date: date) -> dict:
+# 条目数达到该值时才使用 NumPy（小数组的转换开销高于收益）
+NUMPY_MIN_SIZE = 64
+
+
+def calculate_score(votes: int, last_commit_date: date, as_of: Optional[date] = None) -> dict:
     """
     计算烂尾指数
 
     Args:
         votes: 投票数
         last_commit_date: 最后提交日期
+        as_of: 计算基准日期（默认今天）
 
     Returns:
         {
@@ -23,7 +33,7 @@ def calculate_score(votes: int, last_commit_date: date) -> dict:
         }
     """
     # 计算停更天数
-    today = date.today()
+    today = as_of or date.today()
     days_stale = (today - last_commit_date).days
 
     # 投票分数：V = min(60, round(20 * log2(1 + votes)))
@@ -56,3 +66,67 @@ def score(votes: int, last_commit_date: date) -> int:
         总分 (0-100)
     """
     return calculate_score(votes, last_commit_date)['total_score']
+
+
+def score_many(
+    votes: Sequence[int],
+    last_commit_dates: Sequence[date],
+    as_of: Optional[date] = None
+) -> Dict[str, List[int]]:
+    """
+    批量计算烂尾指数（与 calculate_score 结果一致）
+
+    安装了 NumPy 且条目较多时向量化计算，否则逐个计算。
+
+    Args:
+        votes: 各条目投票数
+        last_commit_dates: 各条目最后提交日期（与 votes 等长）
+        as_of: 计算基准日期（默认今天，整批只取一次）
+
+    Returns:
+        {
+            'days_stale': [...],
+            'vote_score': [...],
+            'stale_score': [...],
+            'total_score': [...]
+        }
+    """
+    if len(votes) != len(last_commit_dates):
+        raise ValueError("votes and last_commit_dates must have the same length")
+
+    today = as_of or date.today()
+
+    if np is not None and len(votes) >= NUMPY_MIN_SIZE:
+        return _score_many_numpy(votes, last_commit_dates, today)
+
+    days_stale = [(today - d).days for d in last_commit_dates]
+    vote_score = [min(60, round(20 * math.log2(1 + v))) for v in votes]
+    stale_score = [min(40, d // 7) for d in days_stale]
+    total_score = [min(100, v + s) for v, s in zip(vote_score, stale_score)]
+
+    return {
+        'days_stale': days_stale,
+        'vote_score': vote_score,
+        'stale_score': stale_score,
+        'total_score': total_score
+    }
+
+
+def _score_many_numpy(votes, last_commit_dates, today: date) -> Dict[str, List[int]]:
+    """score_many 的 NumPy 实现"""
+    vote_arr = np.asarray(votes, dtype=np.int64)
+    commit_ordinals = np.fromiter((d.toordinal() for d in last_commit_dates),
+                                  dtype=np.int64, count=len(last_commit_dates))
+
+    days_stale = today.toordinal() - commit_ordinals
+    # np.rint 与内置 round 一样采用银行家舍入
+    vote_score = np.minimum(60, np.rint(20 * np.log2(1 + vote_arr)).astype(np.int64))
+    stale_score = np.minimum(40, days_stale // 7)
+    total_score = np.minimum(100, vote_score + stale_score)
+
+    return {
+        'days_stale': days_stale.tolist(),
+        'vote_score': vote_score.tolist(),
+        'stale_score': stale_score.tolist(),
+        'total_score': total_score.tolist()
+    }
@@ -18,6 +18,83 @@ class Settings(BaseSettings):
     # 数据库配置（支持 SQLite 和 MySQL）
     DB_URL: str = "sqlite:///./storage/app.db"
 
+    # 只读副本（逗号分隔，为空表示不使用）：只读接口轮询使用，健康检查间隔（秒）
+    DB_READ_URLS: str = ""
+    DB_REPLICA_CHECK_INTERVAL: float = 5
+
+    # SQLite 生产配置：WAL、连接 PRAGMA，GET 路由使用只读连接池、写操作使用单个写连接
+    SQLITE_PRODUCTION: bool = True
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    SQLITE_CACHE_SIZE: int = -64 * 1024  # 负数表示 KiB
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_TEMP_STORE: str = "MEMORY"
+    SQLITE_READ_POOL_SIZE: int = 8
+
+    # 排行榜缓存（秒）：多 worker 时为其他进程写入可见的最长延迟，0 表示禁用
+    LEADERBOARD_CACHE_TTL: float = 5
+
+    # 响应校验：false 时 /api/entries 由内部数据直接编码（orjson 可用时使用 orjson），
+    # 跳过 response_model 二次校验；调试数据结构时可设为 true
+    VALIDATE_RESPONSES: bool = False
+
+    # 投票拦截：已批准条目索引刷新间隔（秒）、当天去重集合容量
+    APPROVED_INDEX_TTL: float = 30
+    VOTE_DEDUPE_MAX: int = 100_000
+
+    # 限流（令牌桶，按 IP[,全局]，格式 "次数/周期"，为空表示不限）：超限返回 429 + Retry-After
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_TABLE_SIZE: int = 50_000  # 每个路由按 IP 计数的最大 IP 数
+    RATE_LIMIT_VOTE: str = "20/minute,500/second"
+    RATE_LIMIT_LIKE: str = "20/minute,500/second"
+    RATE_LIMIT_SUBMIT: str = "5/hour,60/minute"
+    # 受信代理（逗号分隔的 IP / 网段）：直连对端属于其中时，限流按其设置的 X-Real-IP 计数，否则按直连地址
+    TRUSTED_PROXIES: str = "127.0.0.1,::1"
+
+    # 投票压缩：超过保留天数（不含今天）的原始投票汇总进 vote_daily_totals 后删除；
+    # 压缩间隔（秒，0 表示不自动压缩）、归档目录（为空则不归档）
+    VOTE_RETENTION_DAYS: int = 7
+    VOTE_COMPACT_INTERVAL: float = 6 * 3600
+    VOTE_ARCHIVE_DIR: str = ""
+
+    # 投票 / 点赞写缓冲（group commit）：开启后按间隔或条数批量提交
+    WRITE_BEHIND: bool = False
+    WRITE_BEHIND_FLUSH_MS: int = 200
+    WRITE_BEHIND_BATCH_SIZE: int = 500
+    WRITE_BEHIND_QUEUE_SIZE: int = 10_000
+    WRITE_BEHIND_DURABILITY: str = "buffered"  # buffered: 入队即返回；group: 等待批次提交后返回
+
+    # 实时推送（/api/stream）：合并周期（秒）、最大连接数、单个连接最长存活时间（秒，到期后客户端自动重连）
+    STREAM_INTERVAL: float = 1.0
+    STREAM_MAX_CLIENTS: int = 1000
+    STREAM_MAX_LIFETIME: float = 300
+
+    # YAML 导入解析进程数（0 = CPU 核数，1 = 串行；文件较少时始终串行）
+    YAML_WORKERS: int = 0
+
+    # 后台任务（/api/jobs）：多 worker 时任务状态写入 JOBS_DIR 供各进程查询，部署等同类任务跨进程串行；
+    # 为空表示只保存在进程内（仅适用于单 worker）
+    JOBS_DIR: str = "./storage/jobs"
+
+    # 运行指标（/metrics）：多 worker 时各进程定期把指标写入 METRICS_DIR，抓取时汇总
+    METRICS_ENABLED: bool = True
+    METRICS_DIR: str = "./storage/metrics"
+    METRICS_FLUSH_INTERVAL: float = 5
+
+    # SQL 查询剖析（调试 / 压测用）：N+1 检测阈值、慢请求阈值（毫秒）与滚动日志
+    PROFILE_QUERIES: bool = False
+    PROFILE_N_PLUS_ONE: int = 10
+    PROFILE_SLOW_MS: float = 500
+    PROFILE_LOG: str = "./storage/slow_requests.log"
+    PROFILE_LOG_MAX_BYTES: int = 10 * 1024 * 1024
+    PROFILE_LOG_BACKUPS: int = 5
+    PROFILE_HEADERS: bool = True  # 响应头 X-DB-Queries / X-DB-Time
+
+    # 静态资源流水线：启动时指纹化 main.js / styles.css 并预压缩（开发前端时可关闭，直接读取 public/）；
+    # ASSETS_DIR 为带哈希的资源及 .gz / .br 的输出目录（为空则只保存在内存）
+    ASSET_PIPELINE: bool = True
+    ASSETS_DIR: str = "./storage/assets"
+
     # 可选：hCaptcha 配置
     HCAPTCHA_SECRET: str = ""
     HCAPTCHA_SITEKEY: str = ""
@@ -36,6 +113,11 @@ class Settings(BaseSettings):
             return ["*"]
         return [origin.strip() for origin in self.ALLOWED_ORIGINS.split(",")]
 
+    @property
+    def read_urls(self) -> list:
+        """解析只读副本 URL"""
+        return [url.strip() for url in self.DB_READ_URLS.split(",") if url.strip()]
+
     @property
     def hcaptcha_enabled(self) -> bool:
         """检查 hCaptcha 是否启用"""
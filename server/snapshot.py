@@ -0,0 +1,118 @@
+"""
+排行榜快照维护
+
+leaderboard_snapshot 保存每个已批准条目的当日评分：
+- 跨日（as_of 早于今天）或批量导入后整体重建；
+- 投票、审核只更新涉及的单个条目（与业务写入同一事务）。
+排名读取即为 (score DESC, entry_id ASC) 的索引扫描，无需逐请求聚合排序。
+名次由扫描顺序给出而不落库：单条目分数变化会连带改变其后所有条目的名次，
+若存储名次，每次投票都要改写大量行。
+"""
+from datetime import date
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from server.models import Entry, LeaderboardSnapshot, ApprovalStatus, dialect_insert
+from server.scoring import score_many
+
+# 本进程已确认快照为最新的日期
+_fresh_on: Optional[date] = None
+
+
+def snapshot_rows(
+    rows: Iterable[Tuple[str, int, date]],
+    as_of: Optional[date] = None
+) -> List[dict]:
+    """
+    计算快照行
+
+    Args:
+        rows: [(entry_id, vote_count, last_commit), ...]
+        as_of: 评分基准日期（默认今天）
+
+    Returns:
+        可直接用于 snapshot_upsert 的字典列表
+    """
+    rows = list(rows)
+    as_of = as_of or date.today()
+    scores = score_many([r[1] for r in rows], [r[2] for r in rows], as_of=as_of)
+    return [
+        {"entry_id": entry_id, "score": score, "days_stale": days_stale, "as_of": as_of}
+        for (entry_id, _, _), score, days_stale
+        in zip(rows, scores['total_score'], scores['days_stale'])
+    ]
+
+
+def snapshot_upsert(dialect_name: str, rows: List[dict]):
+    """
+    构造快照行的批量 upsert 语句
+
+    Args:
+        dialect_name: 方言名
+        rows: snapshot_rows 的返回值（非空）
+    """
+    stmt = dialect_insert(dialect_name, LeaderboardSnapshot).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=['entry_id'],
+        set_={
+            "score": stmt.excluded.score,
+            "days_stale": stmt.excluded.days_stale,
+            "as_of": stmt.excluded.as_of,
+        }
+    )
+
+
+def snapshot_delete(entry_id: str):
+    """构造删除单个条目快照的语句（撤销批准时使用）"""
+    return delete(LeaderboardSnapshot).where(LeaderboardSnapshot.entry_id == entry_id)
+
+
+def rebuild_snapshot(db: Session, as_of: Optional[date] = None, chunk_size: int = 1000) -> int:
+    """
+    重建整个快照（可并发执行：逐块 upsert，再删除已不再批准的条目）
+
+    Args:
+        db: 数据库会话
+        as_of: 评分基准日期（默认今天）
+        chunk_size: 每条 upsert 语句的行数
+
+    Returns:
+        快照条目数
+    """
+    global _fresh_on
+    as_of = as_of or date.today()
+    dialect_name = db.get_bind().dialect.name
+
+    rows = db.execute(
+        select(Entry.id, Entry.vote_count, Entry.last_commit)
+        .where(Entry.status == ApprovalStatus.APPROVED)
+    ).all()
+
+    for start in range(0, len(rows), chunk_size):
+        db.execute(snapshot_upsert(dialect_name, snapshot_rows(rows[start:start + chunk_size], as_of)))
+
+    approved = select(Entry.id).where(Entry.status == ApprovalStatus.APPROVED)
+    db.execute(delete(LeaderboardSnapshot).where(LeaderboardSnapshot.entry_id.not_in(approved)))
+    db.commit()
+
+    _fresh_on = as_of
+    return len(rows)
+
+
+def snapshot_checked_today() -> bool:
+    """本进程今天是否已确认快照为最新（为 False 时 ensure_snapshot 可能需要写库）"""
+    return _fresh_on == date.today()
+
+
+def ensure_snapshot(db: Session) -> None:
+    """跨日后首次读取时重建快照（每进程每天至多检查一次数据库）"""
+    global _fresh_on
+    today = date.today()
+    if _fresh_on == today:
+        return
+    oldest = db.execute(select(func.min(LeaderboardSnapshot.as_of))).scalar()
+    if oldest is None or oldest < today:
+        rebuild_snapshot(db, today)
+    _fresh_on = today
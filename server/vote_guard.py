@@ -0,0 +1,96 @@
+"""
+投票前置拦截（进程内）
+
+- DailyVoteSet：当天已投票的 (entry_id, ip_hash)，重复点击无需访问数据库即可拒绝；
+- ApprovedEntryIndex：已批准条目 ID -> last_commit，用于存在性检查和评分。
+
+两者都只是加速用的缓存：数据库唯一索引 idx_unique_vote 仍是去重的最终依据，
+计数更新时也会再次确认条目存在。多 worker 部署时，其他进程的审核结果
+最迟在 ttl 秒后可见。
+"""
+import time
+from datetime import date
+from typing import Dict, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from server.models import Entry, ApprovalStatus
+
+
+class DailyVoteSet:
+    """当天已投票记录（跨日自动清空，超出容量时整体清空）"""
+
+    def __init__(self, max_size: int = 100_000):
+        self.max_size = max_size
+        self._day: Optional[date] = None
+        self._seen = set()
+
+    def _roll(self, today: date) -> None:
+        if self._day != today:
+            self._day = today
+            self._seen.clear()
+
+    def contains(self, entry_id: str, ip_hash: str, today: date) -> bool:
+        self._roll(today)
+        return (entry_id, ip_hash) in self._seen
+
+    def add(self, entry_id: str, ip_hash: str, today: date) -> None:
+        self._roll(today)
+        if len(self._seen) >= self.max_size:
+            # 只是缓存，清空后由数据库唯一索引兜底
+            self._seen.clear()
+        self._seen.add((entry_id, ip_hash))
+
+    def discard(self, entry_id: str, ip_hash: str, today: date) -> None:
+        """撤销 add()（投票最终未保存时调用，允许重试）"""
+        if self._day == today:
+            self._seen.discard((entry_id, ip_hash))
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+
+class ApprovedEntryIndex:
+    """已批准条目索引（按需从数据库整体加载）"""
+
+    def __init__(self, ttl: float = 30):
+        self.ttl = ttl
+        self._entries: Dict[str, date] = {}
+        self._loaded_at: Optional[float] = None
+        self.hits = 0
+        self.misses = 0  # 索引过期、需要查询数据库的次数
+
+    def invalidate(self) -> None:
+        """审核 / 重新加载后调用，下次访问时重新加载"""
+        self._loaded_at = None
+
+    def is_stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at >= self.ttl
+
+    async def refresh(self, db: AsyncSession) -> None:
+        """从数据库加载全部已批准条目 ID 与 last_commit"""
+        rows = (await db.execute(
+            select(Entry.id, Entry.last_commit).where(Entry.status == ApprovalStatus.APPROVED)
+        )).all()
+        self._entries = {entry_id: last_commit for entry_id, last_commit in rows}
+        self._loaded_at = time.monotonic()
+
+    async def get(self, db: AsyncSession, entry_id: str) -> Optional[date]:
+        """
+        返回已批准条目的 last_commit；条目不存在或未批准时返回 None
+
+        Args:
+            db: 数据库会话（仅在索引过期时使用）
+            entry_id: 条目 ID
+        """
+        if self.is_stale():
+            self.misses += 1
+            await self.refresh(db)
+        else:
+            self.hits += 1
+        return self._entries.get(entry_id)
+
+    def discard(self, entry_id: str) -> None:
+        """移除单个条目（计数更新发现条目已不存在时调用）"""
+        self._entries.pop(entry_id, None)
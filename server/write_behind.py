@@ -0,0 +1,302 @@
+"""
+投票 / 点赞写缓冲（write-behind，可选）
+
+开启后，已通过校验的投票、点赞不再各自提交事务，而是进入有界队列，
+由单个后台写入任务按「每 N 毫秒或每 M 条」合并为一个事务批量写入（group commit），
+SQLite 下由每次点击一次 fsync 变为每批一次，也避免突发流量时的 "database is locked"。
+
+持久性由 WRITE_BEHIND_DURABILITY 控制：
+- "buffered"：入队即返回，进程崩溃时最多丢失一个刷新周期内的写入；
+- "group"：请求等待所在批次提交后返回，不丢数据，但仍享受批量提交。
+应用关闭时（FastAPI lifespan）会刷新队列中剩余的写入。
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, delete, select, tuple_, update
+
+from server.models import Entry, Vote, Like, ApprovalStatus, dialect_insert
+from server.snapshot import snapshot_rows, snapshot_upsert
+
+logger = logging.getLogger(__name__)
+
+# 单条 INSERT / DELETE 语句的最大行数（控制绑定参数数量）
+STATEMENT_CHUNK = 500
+
+
+@dataclass(eq=False)
+class VoteOp:
+    """待写入的投票"""
+    entry_id: str
+    ip_hash: str
+    vote_date: date
+    done: Optional[asyncio.Future] = field(default=None, repr=False)
+
+
+@dataclass(eq=False)
+class LikeOp:
+    """待写入的点赞（liked=False 表示取消点赞）"""
+    entry_id: str
+    ip_hash: str
+    liked: bool
+    done: Optional[asyncio.Future] = field(default=None, repr=False)
+
+
+class WriteBehindError(RuntimeError):
+    """批次写入失败（仅 group 模式下返回给请求方）"""
+
+
+class WriteBehindBuffer:
+    """有界写缓冲与单写入者批量提交"""
+
+    def __init__(
+        self,
+        session_factory,
+        flush_interval_ms: int = 200,
+        batch_size: int = 500,
+        max_queue: int = 10_000,
+        durability: str = "buffered",
+        on_flush: Optional[Callable[[], None]] = None
+    ):
+        """
+        Args:
+            session_factory: 异步会话工厂
+            flush_interval_ms: 最长攒批时间（毫秒）
+            batch_size: 每批最多条数
+            max_queue: 队列容量，满时请求等待（背压）
+            durability: "buffered" 或 "group"
+            on_flush: 每批提交成功后的回调（如使排行榜缓存失效）
+        """
+        if durability not in ("buffered", "group"):
+            raise ValueError(f"Unknown write-behind durability: {durability}")
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval_ms / 1000
+        self.batch_size = batch_size
+        self.durability = durability
+        self.on_flush = on_flush
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._task: Optional[asyncio.Task] = None
+
+        # 已入队但尚未提交的增量，用于返回乐观计数
+        self._vote_delta: Dict[str, int] = defaultdict(int)
+        self._like_delta: Dict[str, int] = defaultdict(int)
+        # (entry_id, ip_hash) -> 最近一次尚未提交的点赞操作
+        self._pending_likes: Dict[Tuple[str, str], LikeOp] = {}
+
+        self.flushed_batches = 0
+        self.flushed_ops = 0
+        self.failed_ops = 0
+
+    # ==================== 生命周期 ====================
+
+    async def start(self) -> None:
+        """启动后台写入任务"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """刷新剩余写入并停止后台任务"""
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    # ==================== 请求侧 ====================
+
+    async def submit(self, op) -> None:
+        """
+        入队一个写操作（队列满时等待）
+
+        Raises:
+            WriteBehindError: group 模式下所在批次写入失败
+        """
+        if isinstance(op, VoteOp):
+            self._vote_delta[op.entry_id] += 1
+        else:
+            self._like_delta[op.entry_id] += 1 if op.liked else -1
+            self._pending_likes[(op.entry_id, op.ip_hash)] = op
+
+        if self.durability == "group":
+            op.done = asyncio.get_running_loop().create_future()
+        await self._queue.put(op)
+        if op.done is not None and not await op.done:
+            raise WriteBehindError("Write-behind batch failed")
+
+    def pending_votes(self, entry_id: str) -> int:
+        """尚未提交的投票数"""
+        return self._vote_delta.get(entry_id, 0)
+
+    def pending_likes(self, entry_id: str) -> int:
+        """尚未提交的点赞净增量"""
+        return self._like_delta.get(entry_id, 0)
+
+    def pending_like_state(self, entry_id: str, ip_hash: str) -> Optional[bool]:
+        """尚未提交的点赞状态（无待写入时返回 None，需查询数据库）"""
+        op = self._pending_likes.get((entry_id, ip_hash))
+        return None if op is None else op.liked
+
+    def __len__(self) -> int:
+        return self._queue.qsize()
+
+    # ==================== 写入侧 ====================
+
+    async def _run(self) -> None:
+        """单写入者：攒批后提交，收到 None 时刷新剩余并退出"""
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            op = await self._queue.get()
+            if op is None:
+                break
+            batch = [op]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    op = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if op is None:
+                    stopping = True
+                    break
+                batch.append(op)
+            await self._flush(batch)
+
+        # 关闭时刷新剩余
+        remaining = []
+        while not self._queue.empty():
+            op = self._queue.get_nowait()
+            if op is not None:
+                remaining.append(op)
+        for start in range(0, len(remaining), self.batch_size):
+            await self._flush(remaining[start:start + self.batch_size])
+
+    async def _flush(self, batch: List) -> None:
+        """在一个事务内写入一批操作"""
+        votes = [op for op in batch if isinstance(op, VoteOp)]
+        # 同一 (entry_id, ip_hash) 的多次切换只保留最后一次
+        likes: Dict[Tuple[str, str], LikeOp] = {}
+        for op in batch:
+            if isinstance(op, LikeOp):
+                likes[(op.entry_id, op.ip_hash)] = op
+
+        ok = True
+        try:
+            async with self.session_factory() as db:
+                vote_counts = await self._write_votes(db, votes)
+                like_counts = await self._write_likes(db, list(likes.values()))
+                await self._apply_counters(db, Entry.vote_count, vote_counts)
+                await self._apply_counters(db, Entry.like_count, like_counts)
+                await self._refresh_snapshot(db, vote_counts)
+                await db.commit()
+            self.flushed_batches += 1
+            self.flushed_ops += len(batch)
+        except Exception:
+            ok = False
+            self.failed_ops += len(batch)
+            logger.exception("Write-behind flush failed, %d operations dropped", len(batch))
+
+        self._release(batch)
+        if ok and self.on_flush:
+            self.on_flush()
+        for op in batch:
+            if op.done is not None and not op.done.done():
+                op.done.set_result(ok)
+
+    def _release(self, batch: List) -> None:
+        """批次处理完毕，撤销其乐观增量"""
+        for op in batch:
+            if isinstance(op, VoteOp):
+                delta, counts = 1, self._vote_delta
+            else:
+                delta, counts = (1 if op.liked else -1), self._like_delta
+                key = (op.entry_id, op.ip_hash)
+                if self._pending_likes.get(key) is op:
+                    del self._pending_likes[key]
+            counts[op.entry_id] -= delta
+            if counts[op.entry_id] == 0:
+                del counts[op.entry_id]
+
+    async def _write_votes(self, db, votes: List[VoteOp]) -> Dict[str, int]:
+        """批量插入投票（冲突忽略），返回每个条目实际新增数"""
+        counts: Dict[str, int] = defaultdict(int)
+        dialect_name = db.bind.dialect.name
+        for start in range(0, len(votes), STATEMENT_CHUNK):
+            chunk = votes[start:start + STATEMENT_CHUNK]
+            result = await db.execute(
+                dialect_insert(dialect_name, Vote)
+                .values([
+                    {"entry_id": op.entry_id, "vote_date": op.vote_date, "ip_hash": op.ip_hash}
+                    for op in chunk
+                ])
+                .on_conflict_do_nothing(index_elements=['entry_id', 'vote_date', 'ip_hash'])
+                .returning(Vote.entry_id)
+            )
+            for entry_id in result.scalars():
+                counts[entry_id] += 1
+        return counts
+
+    async def _write_likes(self, db, likes: List[LikeOp]) -> Dict[str, int]:
+        """批量点赞 / 取消点赞，返回每个条目的实际净增量"""
+        counts: Dict[str, int] = defaultdict(int)
+        dialect_name = db.bind.dialect.name
+        added = [op for op in likes if op.liked]
+        removed = [op for op in likes if not op.liked]
+
+        for start in range(0, len(added), STATEMENT_CHUNK):
+            chunk = added[start:start + STATEMENT_CHUNK]
+            result = await db.execute(
+                dialect_insert(dialect_name, Like)
+                .values([{"entry_id": op.entry_id, "ip_hash": op.ip_hash} for op in chunk])
+                .on_conflict_do_nothing(index_elements=['entry_id', 'ip_hash'])
+                .returning(Like.entry_id)
+            )
+            for entry_id in result.scalars():
+                counts[entry_id] += 1
+
+        for start in range(0, len(removed), STATEMENT_CHUNK):
+            chunk = removed[start:start + STATEMENT_CHUNK]
+            result = await db.execute(
+                delete(Like)
+                .where(tuple_(Like.entry_id, Like.ip_hash).in_([(op.entry_id, op.ip_hash) for op in chunk]))
+                .returning(Like.entry_id)
+            )
+            for entry_id in result.scalars():
+                counts[entry_id] -= 1
+
+        return counts
+
+    @staticmethod
+    async def _apply_counters(db, column, counts: Dict[str, int]) -> None:
+        """按条目批量更新计数字段（executemany）"""
+        params = [{"b_id": entry_id, "b_delta": delta} for entry_id, delta in counts.items() if delta]
+        if not params:
+            return
+        table = Entry.__table__
+        col = table.c[column.key]
+        await db.execute(
+            update(table)
+            .where(table.c.id == bindparam("b_id"))
+            .values({col: col + bindparam("b_delta")}),
+            params
+        )
+
+    @staticmethod
+    async def _refresh_snapshot(db, vote_counts: Dict[str, int]) -> None:
+        """刷新本批有新增投票的条目的排行榜快照"""
+        entry_ids = [entry_id for entry_id, delta in vote_counts.items() if delta]
+        if not entry_ids:
+            return
+        rows = (await db.execute(
+            select(Entry.id, Entry.vote_count, Entry.last_commit)
+            .where(Entry.id.in_(entry_ids), Entry.status == ApprovalStatus.APPROVED)
+        )).all()
+        if rows:
+            await db.execute(snapshot_upsert(db.bind.dialect.name, snapshot_rows(rows)))
@@ -0,0 +1,94 @@
+"""
+YAML 条目解析
+
+优先使用 libyaml 的 CSafeLoader（未编译 libyaml 时回退到纯 Python 的 SafeLoader）；
+文件数达到 PARALLEL_MIN_FILES 时用进程池并行解析。
+解析错误按文件收集，不会中断整批解析。
+
+本模块只依赖 PyYAML，进程池子进程导入它的开销很小。
+"""
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Any, List, Optional, Sequence, Tuple
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+# 安全加载器：优先 C 实现
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# 启用进程池的最少文件数：进程启动约需数百毫秒，而 C 加载器解析一个条目文件
+# 仅约 0.1 毫秒，纯 Python 加载器约慢 15 倍，因此两者的阈值不同
+PARALLEL_MIN_FILES = 5000 if SafeLoader is not yaml.SafeLoader else 500
+
+# 每个子任务的文件数
+PARALLEL_CHUNK = 32
+
+
+@dataclass
+class ParsedDocument:
+    """单个文件的解析结果"""
+    name: str
+    data: Any = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def safe_load(raw) -> Any:
+    """解析 YAML 文本或字节（等价于 yaml.safe_load）"""
+    if isinstance(raw, bytes):
+        raw = raw.decode("utf-8")
+    return yaml.load(raw, Loader=SafeLoader)
+
+
+def _parse(raw: bytes) -> Tuple[Any, Optional[str]]:
+    """解析单个文件，返回 (数据, 错误信息)"""
+    try:
+        return safe_load(raw), None
+    except (yaml.YAMLError, UnicodeDecodeError) as e:
+        return None, str(e)
+
+
+def resolve_workers(workers: int = 0) -> int:
+    """解析进程数配置：0 表示按 CPU 核数"""
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+
+def parse_documents(documents: Sequence[Tuple[str, bytes]], workers: int = 0) -> List[ParsedDocument]:
+    """
+    批量解析 YAML 文件内容
+
+    Args:
+        documents: (文件名, 原始字节) 列表
+        workers: 进程数（0 = CPU 核数，1 = 不使用进程池）
+
+    Returns:
+        与输入顺序一致的解析结果
+    """
+    workers = min(resolve_workers(workers), max(1, len(documents) // PARALLEL_CHUNK))
+    raws = [raw for _, raw in documents]
+
+    results = None
+    if workers > 1 and len(documents) >= PARALLEL_MIN_FILES:
+        try:
+            # spawn：调用方可能是带事件循环与数据库线程的服务进程，fork 不安全
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                results = list(pool.map(_parse, raws, chunksize=PARALLEL_CHUNK))
+        except (BrokenProcessPool, OSError):
+            logger.warning("YAML process pool unavailable, parsing serially", exc_info=True)
+    if results is None:
+        results = [_parse(raw) for raw in raws]
+
+    return [
+        ParsedDocument(name=name, data=data, error=error)
+        for (name, _), (data, error) in zip(documents, results)
+    ]
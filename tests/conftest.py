@@ -0,0 +1,58 @@
+"""
+测试公共配置
+
+应用在导入时读取配置，这里先把数据库、运行时目录指向临时目录再导入 server.app：
+写缓冲使用 group 模式（请求等待批次提交，能暴露写连接被占用等问题），限流关闭
+（限流有单独的测试）。各测试共用同一个应用与数据库，按需选择不同的条目或客户端 IP。
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+WORKDIR = Path(tempfile.mkdtemp(prefix="conch-test-"))
+ADMIN_TOKEN = "test-token"
+
+os.environ["DB_URL"] = f"sqlite:///{WORKDIR}/app.db"
+os.environ["ADMIN_TOKEN"] = ADMIN_TOKEN
+os.environ["WRITE_BEHIND"] = "true"
+os.environ["WRITE_BEHIND_DURABILITY"] = "group"
+os.environ["WRITE_BEHIND_FLUSH_MS"] = "10"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ["ASSETS_DIR"] = str(WORKDIR / "assets")
+os.environ["METRICS_DIR"] = str(WORKDIR / "metrics")
+os.environ["JOBS_DIR"] = str(WORKDIR / "jobs")
+
+
+def wait_for_job(client, job_id: str, timeout: float = 10) -> dict:
+    """轮询后台任务直到结束"""
+    deadline = time.monotonic() + timeout
+    while True:
+        job = client.get(f"/api/jobs/{job_id}", headers={"X-Admin-Token": ADMIN_TOKEN}).json()["data"]
+        if job["status"] in ("succeeded", "failed") or time.monotonic() > deadline:
+            return job
+        time.sleep(0.05)
+
+
+@pytest.fixture(scope="session")
+def app_module():
+    os.chdir(ROOT)
+    from server import app as module
+    return module
+
+
+@pytest.fixture(scope="session")
+def client(app_module):
+    """已导入 data/entries 的测试客户端"""
+    from fastapi.testclient import TestClient
+
+    with TestClient(app_module.app, headers={"X-Forwarded-For": "203.0.113.7"}) as c:
+        job_id = c.post("/api/reload", headers={"X-Admin-Token": ADMIN_TOKEN}).json()["data"]["job_id"]
+        assert wait_for_job(c, job_id)["status"] == "succeeded"
+        yield c
@@ -0,0 +1,36 @@
+"""
+静态资源流水线
+"""
+import os
+import re
+import stat
+
+from server.assets import AssetPipeline
+from conftest import ROOT
+
+
+def test_written_assets_are_world_readable(tmp_path):
+    AssetPipeline(ROOT / "public", tmp_path).build()
+    files = list(tmp_path.iterdir())
+    assert files
+    for path in files:
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o644, path
+
+
+def test_fingerprinted_asset_get_and_head(client):
+    html = client.get("/").text
+    url = re.search(r"/assets/main\.\w+\.js", html).group(0)
+
+    r = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert r.status_code == 200
+    assert r.headers["cache-control"] == "public, max-age=31536000, immutable"
+    assert r.headers["vary"] == "Accept-Encoding"
+
+    r = client.head(url)
+    assert r.status_code == 200
+    assert r.headers["etag"]
+
+    r = client.get(url, headers={"If-None-Match": r.headers["etag"]})
+    assert r.status_code == 304
+
+    assert client.head("/assets/missing.js").status_code == 404
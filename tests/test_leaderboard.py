@@ -0,0 +1,101 @@
+"""
+排行榜 keyset 分页
+
+按游标逐页取完应与一次取全部的顺序完全一致（排序值相同的条目按 ID 决定先后，不重不漏）。
+"""
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from server.leaderboard import EntryQuery, InvalidCursor, query_entries
+from server.models import ApprovalStatus, Entry, create_tables, get_engine, get_session_factory
+from server.snapshot import rebuild_snapshot
+
+SORTS = ("score", "votes", "likes", "last_commit", "submitted_at")
+
+
+@pytest.fixture(scope="module")
+def db(tmp_path_factory):
+    engine = get_engine(f"sqlite:///{tmp_path_factory.mktemp('leaderboard')}/app.db")
+    create_tables(engine)
+    session = get_session_factory(engine)()
+    base = datetime(2024, 6, 1, 12, 0, 0, 123456)
+    for i in range(23):
+        session.add(Entry(
+            id=f"e{i:02d}", title=f"Entry {i}", owner="alice" if i % 2 else "bob",
+            repo_url="https://example.com", summary="s", tags="cli,web" if i % 3 else "ml",
+            # 大量相同的票数 / 点赞数 / 日期，检验并列时的顺序
+            last_commit=date(2023, 1, 1) + timedelta(days=30 * (i % 4)),
+            vote_count=i % 5, like_count=i % 3,
+            submitted_at=base + timedelta(minutes=i % 6),
+            status=ApprovalStatus.PENDING if i % 7 == 0 else ApprovalStatus.APPROVED,
+        ))
+    session.commit()
+    rebuild_snapshot(session)
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def collect_pages(db, limit, **params):
+    pages, cursor = [], None
+    while True:
+        page, cursor = query_entries(db, EntryQuery(limit=limit, after=cursor, **params))
+        pages.append(page)
+        if cursor is None:
+            return pages
+        assert len(page) == limit
+
+
+@pytest.mark.parametrize("include_pending", [False, True])
+@pytest.mark.parametrize("order", ["desc", "asc"])
+@pytest.mark.parametrize("sort", SORTS)
+def test_pages_concatenate_to_full_listing(db, sort, order, include_pending):
+    params = {"sort": sort, "order": order, "include_pending": include_pending}
+    full, cursor = query_entries(db, EntryQuery(**params))
+    assert cursor is None
+    assert len(full) == (23 if include_pending else 19)
+
+    pages = collect_pages(db, 4, **params)
+    ids = [item["id"] for page in pages for item in page]
+    assert ids == [item["id"] for item in full]
+
+    # 顺序：排序值按方向单调，并列时 ID 升序
+    keys = [(item[sort], item["id"]) for item in full]
+    for (value, entry_id), (next_value, next_id) in zip(keys, keys[1:]):
+        if value == next_value:
+            assert entry_id < next_id
+        else:
+            assert (value > next_value) if order == "desc" else (value < next_value)
+
+
+def test_pages_with_filters(db):
+    full, _ = query_entries(db, EntryQuery(sort="votes", tag="web", owner="alice", min_score=0))
+    pages = collect_pages(db, 3, sort="votes", tag="web", owner="alice", min_score=0)
+    assert [item["id"] for page in pages for item in page] == [item["id"] for item in full]
+    assert all(item["owner"] == "alice" and "web" in item["tags"].split(",") for item in full)
+
+
+def test_exact_multiple_has_no_empty_trailing_page(db):
+    full, _ = query_entries(db, EntryQuery(sort="votes"))
+    page, cursor = query_entries(db, EntryQuery(sort="votes", limit=len(full)))
+    assert len(page) == len(full) and cursor is None
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", "W10", "WyJ4IiwiZTAxIl0"])
+def test_invalid_cursor(db, cursor):
+    with pytest.raises(InvalidCursor):
+        query_entries(db, EntryQuery(sort="votes", limit=5, after=cursor))
+
+
+def test_cursor_over_api(client):
+    """API：X-Next-Cursor 作为 after 传回，非法游标返回 400"""
+    full = client.get("/api/entries", params={"sort": "votes"}).json()
+    r = client.get("/api/entries", params={"sort": "votes", "limit": 1})
+    ids = [item["id"] for item in r.json()]
+    while "x-next-cursor" in r.headers:
+        r = client.get("/api/entries", params={"sort": "votes", "limit": 1, "after": r.headers["x-next-cursor"]})
+        ids += [item["id"] for item in r.json()]
+    assert ids == [item["id"] for item in full]
+
+    assert client.get("/api/entries", params={"limit": 1, "after": "garbage"}).status_code == 400
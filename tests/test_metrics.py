@@ -0,0 +1,64 @@
+"""
+多进程指标汇总
+
+已退出 worker 的计数并入 base.json，汇总的计数器不会因重启而回退。
+"""
+import asyncio
+import json
+import re
+
+from server.metrics import MetricsRegistry
+
+DEAD_PID = 2 ** 22 + 12345  # 超过默认 pid_max，不会是存活进程
+
+
+def make_registry(directory) -> MetricsRegistry:
+    registry = MetricsRegistry(str(directory))
+    registry.counter("conch_votes_total", "Votes")
+    registry.histogram("conch_latency_seconds", "Latency", (0.1, 1.0))
+    return registry
+
+
+def total(text: str, series: str) -> float:
+    match = re.search(rf"^{re.escape(series)} (\S+)$", text, re.MULTILINE)
+    return float(match.group(1)) if match else 0.0
+
+
+def test_counters_survive_worker_exit(tmp_path):
+    # 另一个 worker 写过文件后退出（未正常关闭）
+    worker = make_registry(tmp_path)
+    worker.inc("conch_votes_total", 3, result="accepted")
+    worker.observe("conch_latency_seconds", 0.05)
+    snapshot = worker.snapshot()
+    snapshot["pid"] = DEAD_PID
+    (tmp_path / f"{DEAD_PID}.json").write_text(json.dumps(snapshot), encoding="utf-8")
+
+    registry = make_registry(tmp_path)
+    registry.inc("conch_votes_total", 2, result="accepted")
+
+    first = registry.render()
+    assert total(first, 'conch_votes_total{result="accepted"}') == 5
+    assert total(first, "conch_latency_seconds_count") == 1
+    assert not (tmp_path / f"{DEAD_PID}.json").exists()
+
+    # 再次抓取：已并入的计数仍在，且不会重复计算
+    second = registry.render()
+    assert total(second, 'conch_votes_total{result="accepted"}') == 5
+    assert total(second, 'conch_latency_seconds_bucket{le="0.1"}') == 1
+
+
+def test_graceful_stop_folds_own_counters(tmp_path):
+    registry = make_registry(tmp_path)
+
+    async def run():
+        await registry.start()
+        registry.inc("conch_votes_total", 4, result="accepted")
+        await registry.stop()
+
+    asyncio.run(run())
+    assert not (tmp_path / f"{registry.pid}.json").exists()
+
+    # 重启后的新进程仍能看到之前的累计值
+    restarted = make_registry(tmp_path)
+    restarted.inc("conch_votes_total", 1, result="accepted")
+    assert total(restarted.render(), 'conch_votes_total{result="accepted"}') == 5
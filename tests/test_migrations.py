@@ -0,0 +1,129 @@
+"""
+迁移：在旧结构的数据库上执行
+
+旧库（补计数字段之前）的条目没有 vote_count / like_count，启动后应自动补列、
+从原始表回填计数、重建排行榜快照，并补齐 / 调整索引。
+"""
+import multiprocessing
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import (Column, Date, DateTime, Enum, Index, Integer, MetaData, String, Table, Text,
+                        inspect, select)
+
+from server.migrations import current_version, latest_version
+from server.models import ApprovalStatus, Entry, LeaderboardSnapshot, create_tables, get_engine
+from server.scoring import calculate_score
+
+
+def legacy_metadata() -> MetaData:
+    """最初发布版本的表结构"""
+    metadata = MetaData()
+    Table(
+        "entries", metadata,
+        Column("id", String(100), primary_key=True),
+        Column("title", String(200), nullable=False),
+        Column("owner", String(100), nullable=False),
+        Column("repo_url", String(500), nullable=False),
+        Column("last_commit", Date, nullable=False),
+        Column("summary", Text, nullable=False),
+        Column("tags", String(200)),
+        Column("status", Enum(ApprovalStatus, name="approval_status", create_constraint=True), nullable=False),
+        Column("submitted_at", DateTime, nullable=False),
+        Column("reviewed_at", DateTime),
+        Column("review_note", Text),
+    )
+    Table(
+        "votes", metadata,
+        Column("id", Integer, primary_key=True, autoincrement=True),
+        Column("entry_id", String(100), nullable=False, index=True),
+        Column("vote_date", Date, nullable=False),
+        Column("ip_hash", String(64), nullable=False),
+        Index("idx_unique_vote", "entry_id", "vote_date", "ip_hash", unique=True),
+    )
+    Table(
+        "likes", metadata,
+        Column("id", Integer, primary_key=True, autoincrement=True),
+        Column("entry_id", String(100), nullable=False, index=True),
+        Column("ip_hash", String(64), nullable=False),
+        Column("created_at", DateTime, nullable=False),
+        Index("idx_unique_like", "entry_id", "ip_hash", unique=True),
+    )
+    return metadata
+
+
+def make_legacy_db(path) -> str:
+    url = f"sqlite:///{path}"
+    engine = get_engine(url)
+    metadata = legacy_metadata()
+    metadata.create_all(engine)
+    entries, votes, likes = (metadata.tables[name] for name in ("entries", "votes", "likes"))
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(entries.insert(), [
+            {"id": entry_id, "title": entry_id, "owner": "o", "repo_url": "http://x", "summary": "s",
+             "last_commit": date(2024, 1, 1), "status": ApprovalStatus.APPROVED, "submitted_at": now}
+            for entry_id in ("a", "b", "c")
+        ])
+        conn.execute(votes.insert(), [
+            {"entry_id": "a", "vote_date": date.today() - timedelta(days=i), "ip_hash": "h"} for i in range(3)
+        ] + [{"entry_id": "b", "vote_date": date.today(), "ip_hash": "h"}])
+        conn.execute(likes.insert(), [
+            {"entry_id": "b", "ip_hash": f"h{i}", "created_at": now} for i in range(2)
+        ])
+    engine.dispose()
+    return url
+
+
+def test_migrate_legacy_database(tmp_path):
+    engine = get_engine(make_legacy_db(tmp_path / "legacy.db"))
+
+    applied = create_tables(engine)
+    assert [m.version for m in applied] == list(range(1, latest_version() + 1))
+
+    with engine.connect() as conn:
+        assert current_version(conn) == latest_version()
+        counts = dict(conn.execute(select(Entry.id, Entry.vote_count)).all())
+        likes = dict(conn.execute(select(Entry.id, Entry.like_count)).all())
+        snapshot = dict(conn.execute(select(LeaderboardSnapshot.entry_id, LeaderboardSnapshot.score)).all())
+    assert counts == {"a": 3, "b": 1, "c": 0}
+    assert likes == {"a": 0, "b": 2, "c": 0}
+    # 快照按回填后的票数评分
+    assert snapshot == {
+        entry_id: calculate_score(count, date(2024, 1, 1))["total_score"] for entry_id, count in counts.items()
+    }
+
+    indexes = {index["name"] for index in inspect(engine).get_indexes("votes")}
+    assert "idx_vote_date_entry" in indexes
+    assert "ix_votes_entry_id" not in indexes
+
+    # 再次执行不做任何事
+    assert create_tables(engine) == []
+    engine.dispose()
+
+
+
+
+
+def _migrate(url, results):
+    engine = get_engine(url)
+    try:
+        results.put([m.version for m in create_tables(engine)])
+    except Exception as e:  # pragma: no cover - 失败时把异常带回主进程
+        results.put(repr(e))
+    finally:
+        engine.dispose()
+
+
+def test_concurrent_startup_migrates_once(tmp_path):
+    url = make_legacy_db(tmp_path / "race.db")
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    workers = [ctx.Process(target=_migrate, args=(url, results)) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    outcomes = [results.get(timeout=60) for _ in workers]
+    for worker in workers:
+        worker.join()
+
+    assert all(isinstance(outcome, list) for outcome in outcomes), outcomes
+    assert sorted(outcomes, key=len) == [[], [], list(range(1, latest_version() + 1))]
@@ -0,0 +1,84 @@
+"""
+限流：令牌桶与客户端键
+
+按 IP 计数的键不能取自客户端可任意填写的 X-Forwarded-For。
+"""
+import asyncio
+
+from server.ratelimit import RateLimiter, RateLimitMiddleware, client_address, parse_networks
+
+TRUSTED = parse_networks("127.0.0.1,::1,172.17.0.0/16")
+
+
+def make_scope(peer, headers=(), path="/api/vote"):
+    return {
+        "type": "http",
+        "method": "POST",
+        "path": path,
+        "client": (peer, 50000) if peer else None,
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers],
+    }
+
+
+def call(middleware, scope) -> int:
+    """执行一次请求，返回状态码"""
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(middleware(scope, receive, send))
+    return sent[0]["status"]
+
+
+async def ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+def test_client_address_ignores_forwarded_for():
+    scope = make_scope("203.0.113.9", [("X-Forwarded-For", "10.0.0.1")])
+    assert client_address(scope, TRUSTED) == "203.0.113.9"
+
+
+def test_client_address_trusts_real_ip_from_proxy():
+    scope = make_scope("127.0.0.1", [("X-Forwarded-For", "10.0.0.1, 203.0.113.9"), ("X-Real-IP", "203.0.113.9")])
+    assert client_address(scope, TRUSTED) == "203.0.113.9"
+    assert client_address(make_scope("172.17.0.1", [("X-Real-IP", "203.0.113.9")]), TRUSTED) == "203.0.113.9"
+
+
+def test_client_address_ignores_real_ip_from_untrusted_peer():
+    scope = make_scope("198.51.100.4", [("X-Real-IP", "203.0.113.9")])
+    assert client_address(scope, TRUSTED) == "198.51.100.4"
+
+
+def test_rotating_forwarded_for_is_still_limited():
+    limiter = RateLimiter(max_keys=100)
+    limiter.add_rule("POST", "/api/vote", "vote", "3/minute")
+    middleware = RateLimitMiddleware(ok_app, limiter, lambda scope: client_address(scope, TRUSTED))
+
+    codes = [
+        call(middleware, make_scope("127.0.0.1", [("X-Forwarded-For", f"10.0.{i}.1"), ("X-Real-IP", "203.0.113.9")]))
+        for i in range(5)
+    ]
+    assert codes == [200, 200, 200, 429, 429]
+    # 伪造的头不会占用桶表
+    assert len(limiter.rules[("POST", "/api/vote")].per_ip) == 1
+
+    # 其他客户端不受影响
+    assert call(middleware, make_scope("127.0.0.1", [("X-Real-IP", "203.0.113.10")])) == 200
+
+
+def test_global_limit_refunds_per_ip_token():
+    limiter = RateLimiter()
+    limiter.add_rule("POST", "/api/vote", "vote", "2/minute,1/minute")
+    assert limiter.check("POST", "/api/vote", lambda: "a", now=0) == 0
+    assert limiter.check("POST", "/api/vote", lambda: "a", now=0) > 0  # 全局额度用尽
+    assert limiter.rejected[("vote", "global")] == 1
+    # 被全局拒绝的请求不消耗按 IP 额度：全局恢复后仍可再通过一次
+    assert limiter.check("POST", "/api/vote", lambda: "a", now=60) == 0
+    assert limiter.check("POST", "/api/vote", lambda: "a", now=60) > 0
+    assert limiter.rejected[("vote", "global")] == 2
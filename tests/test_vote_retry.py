@@ -0,0 +1,30 @@
+"""
+投票失败后重试（写缓冲 group 模式）
+
+批次写入失败返回 503 后，同一投票者重试应能成功，而不是被去重集合拒绝。
+"""
+
+
+def test_vote_retry_after_failed_batch(client, app_module, monkeypatch):
+    entry = client.get("/api/entries").json()[0]
+    headers = {"X-Forwarded-For": "198.51.100.1"}
+    buffer = app_module.write_buffer
+    write_votes = buffer._write_votes
+    failures = iter([True])
+
+    async def flaky_write_votes(db, votes):
+        if next(failures, False):
+            raise RuntimeError("database unavailable")
+        return await write_votes(db, votes)
+
+    monkeypatch.setattr(buffer, "_write_votes", flaky_write_votes)
+
+    r = client.post("/api/vote", json={"entry_id": entry["id"]}, headers=headers)
+    assert r.status_code == 503
+
+    r = client.post("/api/vote", json={"entry_id": entry["id"]}, headers=headers)
+    assert r.status_code == 200, r.json()
+    assert r.json()["data"]["votes"] == entry["votes"] + 1
+
+    r = client.post("/api/vote", json={"entry_id": entry["id"]}, headers=headers)
+    assert r.status_code == 400
@@ -0,0 +1,28 @@
+"""
+写缓冲（group 模式）与已批准条目索引
+
+索引过期时请求会话先查询数据库刷新索引；等待批次提交期间若仍占着唯一的 SQLite 写连接，
+写缓冲取不到连接，请求会卡到连接池超时并返回 503。
+"""
+import time
+
+
+def test_vote_with_stale_approved_index(client, app_module):
+    entry_id = client.get("/api/entries").json()[0]["id"]
+    app_module.approved_entries.invalidate()
+
+    started = time.monotonic()
+    r = client.post("/api/vote", json={"entry_id": entry_id}, headers={"X-Forwarded-For": "198.51.100.2"})
+    assert r.status_code == 200, r.json()
+    assert time.monotonic() - started < 5
+
+
+def test_like_with_stale_approved_index(client, app_module):
+    entry = client.get("/api/entries").json()[0]
+    app_module.approved_entries.invalidate()
+
+    started = time.monotonic()
+    r = client.post("/api/like", json={"entry_id": entry["id"]}, headers={"X-Forwarded-For": "198.51.100.3"})
+    assert r.status_code == 200, r.json()
+    assert r.json()["data"] == {"entry_id": entry["id"], "action": "liked", "likes": entry["likes"] + 1}
+    assert time.monotonic() - started < 5